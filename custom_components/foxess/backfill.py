@@ -0,0 +1,210 @@
+"""Backfill of the report energy sensors' long-term statistics after HA or cloud outages."""
+from __future__ import annotations
+
+from collections.abc import Awaitable, Callable
+from datetime import date, datetime, timedelta
+import logging
+
+from homeassistant.components.recorder import get_instance
+from homeassistant.components.recorder.models import StatisticData, StatisticMetaData
+from homeassistant.components.recorder.statistics import (
+    async_import_statistics,
+    get_last_statistics,
+    statistics_during_period,
+)
+from homeassistant.const import UnitOfEnergy
+from homeassistant.core import callback
+from homeassistant.helpers import entity_registry as er
+from homeassistant.util import dt as dt_util
+
+try:
+    from homeassistant.components.recorder.models import StatisticMeanType
+except ImportError:  # Home Assistant before 2025.4 only knows has_mean
+    StatisticMeanType = None
+
+from .const import DOMAIN
+from .quota import get_quota
+
+_LOGGER = logging.getLogger(__name__)
+
+MAX_DAYS = 7  # longest gap filled, older hours are left as they are
+QUOTA_RESERVE = 100  # calls kept back for polling, no backfill when fewer are left today
+HOUR = timedelta(hours=1)
+
+
+def _hour(moment: datetime) -> datetime:
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+class StatisticsBackfill:
+    """Import the hourly statistics the recorder missed, from the day report.
+
+    After a restart or a cloud outage, the rows hold the last value read
+    before it: the recorder compiles the hours HA was down from the last
+    state it recorded, so the whole gap lands in the first hour after it.
+    The time of the last good report is kept in the snapshot, so the rows
+    from then on are replaced after a restart too. A report/query call with
+    the day dimension returns the hourly values of every report variable,
+    so each missing day costs one call. The rows continue the sum of the
+    last good row, the recorder carries on from the last one imported.
+    """
+
+    def __init__(
+        self,
+        hass,
+        apiKey: str,
+        devicesn: str,
+        fetch_day: Callable[[date, list], Awaitable[dict | None]],
+        unique_ids: dict[str, str],
+        reports_until: datetime | None = None,
+    ) -> None:
+        self.hass = hass
+        self.apiKey = apiKey
+        self.devicesn = devicesn
+        self.fetch_day = fetch_day
+        self.unique_ids = unique_ids  # report variable -> sensor unique id
+        self.last_report: datetime | None = None
+        # when the report last succeeded before the current run of failures or the restart
+        self.stale_since: datetime | None = reports_until
+        self.imported = 0
+        self._task = None
+
+    @callback
+    def report_failed(self) -> None:
+        if self.stale_since is None and self.last_report is not None:
+            self.stale_since = self.last_report
+
+    @callback
+    def report_ok(self) -> None:
+        """Start a backfill in the background if the statistics may have a hole."""
+        self.last_report = dt_util.utcnow()
+        if self.stale_since is None or self._task is not None:
+            return
+        if "recorder" not in self.hass.config.components:
+            self.stale_since = None
+            return
+        self._task = self.hass.async_create_background_task(
+            self._async_run(), f"{DOMAIN} {self.devicesn} statistics backfill"
+        )
+
+    @property
+    def reports_until(self) -> datetime | None:
+        """Statistics are good up to here, a backfill still to run starts from it."""
+        return self.stale_since or self.last_report
+
+    async def _async_run(self) -> None:
+        try:
+            if await self.async_backfill(self.stale_since):
+                self.stale_since = None
+        finally:
+            self._task = None
+
+    async def async_backfill(self, stale_since: datetime | None) -> bool:
+        """Fill the hours up to the last complete one, False to try again after the next report."""
+        registry = er.async_get(self.hass)
+        recorder = get_instance(self.hass)
+        end = _hour(dt_util.utcnow())
+        oldest = end - timedelta(days=MAX_DAYS)
+        plans = {}
+        for variable, unique_id in self.unique_ids.items():
+            statistic_id = registry.async_get_entity_id("sensor", DOMAIN, unique_id)
+            if statistic_id is None:
+                continue
+            last = await recorder.async_add_executor_job(
+                get_last_statistics, self.hass, 1, statistic_id, False, {"state", "sum"}
+            )
+            if not last.get(statistic_id):
+                continue  # nothing recorded yet to continue from
+            base = last[statistic_id][0]
+            start = dt_util.utc_from_timestamp(base["start"]) + HOUR
+            if stale_since is not None and _hour(stale_since) < start:
+                # the rows from the last good report on hold a stale value
+                start = _hour(stale_since)
+            start = max(start, oldest)
+            if start >= end:
+                continue
+            if dt_util.utc_from_timestamp(base["start"]) != start - HOUR:
+                rows = await recorder.async_add_executor_job(
+                    statistics_during_period,
+                    self.hass,
+                    start - HOUR,
+                    start,
+                    {statistic_id},
+                    "hour",
+                    None,
+                    {"state", "sum"},
+                )
+                if not rows.get(statistic_id):
+                    continue
+                base = rows[statistic_id][0]
+            plans[statistic_id] = (variable, start, base)
+        if not plans:
+            _LOGGER.debug("No statistics gaps for SN: %s", self.devicesn)
+            return True
+
+        first = min(start for _, start, _ in plans.values())
+        days = sorted({dt_util.as_local(first + HOUR * n).date() for n in range((end - first) // HOUR)})
+        quota = get_quota(self.hass, self.apiKey)
+        if quota.remaining - len(days) < QUOTA_RESERVE:
+            _LOGGER.warning(
+                "Not enough API calls left today to backfill %s days of statistics for SN: %s",
+                len(days),
+                self.devicesn,
+            )
+            return False
+        variables = sorted({variable for variable, _, _ in plans.values()})
+        hourly: dict[str, dict[datetime, float]] = {variable: {} for variable in variables}
+        for day in days:
+            values = await self.fetch_day(day, variables)
+            if values is None:
+                return False
+            midnight = dt_util.as_utc(dt_util.start_of_local_day(day))
+            for variable in variables:
+                for index, value in enumerate(values.get(variable) or ()):
+                    hourly[variable][midnight + HOUR * index] = value or 0.0
+
+        for statistic_id, (variable, start, base) in plans.items():
+            statistics = self._rows(hourly[variable], start, end, base["sum"] or 0.0)
+            async_import_statistics(self.hass, self._metadata(statistic_id), statistics)
+            self.imported += len(statistics)
+            _LOGGER.debug(
+                "Backfilled %s hours of %s from %s for SN: %s",
+                len(statistics),
+                statistic_id,
+                start,
+                self.devicesn,
+            )
+        return True
+
+    @staticmethod
+    def _rows(hourly: dict, start: datetime, end: datetime, total: float) -> list[StatisticData]:
+        """Hourly rows, state is the day's total so far like the sensor, sum runs on from total."""
+        rows = []
+        day = None
+        today = 0.0
+        for hour in sorted(hourly):
+            if hour >= end:
+                break
+            if dt_util.as_local(hour).date() != day:
+                day = dt_util.as_local(hour).date()
+                today = 0.0
+            today += hourly[hour]
+            if hour < start:
+                continue
+            total += hourly[hour]
+            rows.append(StatisticData(start=hour, state=round(today, 3), sum=round(total, 3)))
+        return rows
+
+    @staticmethod
+    def _metadata(statistic_id: str) -> StatisticMetaData:
+        metadata = StatisticMetaData(
+            has_mean=False,
+            has_sum=True,
+            name=None,
+            source="recorder",
+            statistic_id=statistic_id,
+            unit_of_measurement=UnitOfEnergy.KILO_WATT_HOUR,
+        )
+        if StatisticMeanType is not None:
+            metadata["mean_type"] = StatisticMeanType.NONE
+        return metadata
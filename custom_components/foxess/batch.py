@@ -0,0 +1,83 @@
+"""Batched realtime fetches for inverters sharing an API key."""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+
+from .const import DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+BATCH_MAX_AGE = 150  # seconds a batched result is kept for the other inverters
+BATCH_MAX_SNS = 50  # serial numbers sent in one v1 real/query call
+
+
+class RealtimeBatcher:
+    """Fetch realtime data for every registered inverter in one v1 call.
+
+    The first inverter to poll triggers a fetch for all registered serial numbers,
+    the others are served their element of result[] from that fetch. Each element
+    is handed out once, so an inverter never sees the same sample twice.
+    """
+
+    def __init__(self, fetch) -> None:
+        # fetch(inverters) returns (geterror, result list, response time)
+        self._fetch = fetch
+        self.inverters: list = []
+        self._results: dict[str, tuple[float, dict, int]] = {}
+        self._inflight: asyncio.Task | None = None
+        self.calls = 0
+        self.served = 0
+
+    @property
+    def sns(self) -> list[str]:
+        return [inverter.devicesn for inverter in self.inverters]
+
+    def register(self, inverter) -> None:
+        if inverter.devicesn not in self.sns:
+            self.inverters.append(inverter)
+            _LOGGER.debug("Batched realtime SNs: %s", self.sns)
+
+    async def _async_refresh(self):
+        geterror = False
+        try:
+            for start in range(0, len(self.inverters), BATCH_MAX_SNS):
+                inverters = self.inverters[start : start + BATCH_MAX_SNS]
+                self.calls += 1
+                error, result, ResponseTime = await self._fetch(inverters)
+                if error:
+                    geterror = error
+                    continue
+                fetched = time.monotonic()
+                for item in result:
+                    self._results[item.get("deviceSN")] = (fetched, item, ResponseTime)
+        finally:
+            self._inflight = None
+        return geterror
+
+    async def async_fetch(self, devicesn: str):
+        """Return (geterror, result element, response time) for one inverter."""
+        cached = self._results.pop(devicesn, None)
+        if cached is not None and time.monotonic() - cached[0] < BATCH_MAX_AGE:
+            self.served += 1
+            _LOGGER.debug("Realtime data for %s served from batch", devicesn)
+            return False, cached[1], cached[2]
+        if self._inflight is None:
+            self._inflight = asyncio.create_task(self._async_refresh())
+        # shield so a cancelled poll doesn't abort the fetch the other inverters wait on
+        geterror = await asyncio.shield(self._inflight)
+        cached = self._results.pop(devicesn, None)
+        if cached is None:
+            _LOGGER.debug("Batched realtime fetch returned no data for %s", devicesn)
+            return geterror or True, None, 0
+        return False, cached[1], cached[2]
+
+
+def get_batcher(hass, apiKey: str, fetch) -> RealtimeBatcher:
+    """Return the realtime batcher for an API key, creating it on first use."""
+    batchers = hass.data.setdefault(DOMAIN, {}).setdefault("batchers", {})
+    batcher = batchers.get(apiKey)
+    if batcher is None:
+        batcher = batchers[apiKey] = RealtimeBatcher(fetch)
+    return batcher
@@ -0,0 +1,371 @@
+"""Shared HTTP client for the FoxESS OpenAPI."""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from types import SimpleNamespace
+from typing import Any
+import asyncio
+import hashlib
+import json
+import logging
+import socket
+import time
+
+import aiohttp
+import yarl
+
+try:
+    import orjson
+except ImportError:  # orjson ships with Home Assistant, but fall back to stdlib json
+    orjson = None
+
+from homeassistant.const import EVENT_HOMEASSISTANT_CLOSE
+from homeassistant.core import callback
+
+from .const import DOMAIN
+from .metrics import OUTCOME_ERROR, OUTCOME_SUCCESS, OUTCOME_TIMEOUT, EndpointMetrics
+from .quota import get_quota
+from .ratelimit import get_limiter
+from .resilience import STATE_HALF_OPEN, CircuitOpenError, get_health
+from .resolver import CachingResolver
+
+_LOGGER = logging.getLogger(__name__)
+
+_ENDPOINT_OA_DOMAIN = "https://www.foxesscloud.com"
+
+METHOD_POST = "POST"
+METHOD_GET = "GET"
+DEFAULT_TIMEOUT = 75  # increase the size of inherited timeout, the API is a bit slow
+DEFAULT_VERIFY_SSL = False  # True
+
+POOL_LIMIT_PER_HOST = 4  # concurrent keep-alive connections to the cloud host
+KEEPALIVE_TIMEOUT = 90  # seconds an idle connection is kept, covers the 1 minute poll
+
+SUCCESS_MSGS = ("success", "Operation successful")
+
+
+def json_loads(data):
+    """Parse a JSON document, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class GetAuth:
+    def get_signature(self, token, path, lang="en"):
+        """
+        This function is used to generate a signature consisting of URL, token, and timestamp, and return a dictionary containing the signature and other information.
+            :param token: your key
+            :param path:  your request path
+            :param lang: language, default is English.
+            :return: with authentication header
+        """
+        timestamp = round(time.time() * 1000)
+        signature = rf"{path}\r\n{token}\r\n{timestamp}"
+        # or use user_agent_rotator.get_random_user_agent() for user-agent
+        result = {
+            "token": token,
+            "lang": lang,
+            "timestamp": str(timestamp),
+            "Content-Type": "application/json",
+            "signature": self.md5c(text=signature),
+            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) "
+            "Chrome/117.0.0.0 Safari/537.36",
+        }
+
+        return result
+
+    @staticmethod
+    def md5c(text="", _type="lower"):
+        res = hashlib.md5(text.encode(encoding="UTF-8")).hexdigest()
+        if _type.__eq__("lower"):
+            return res
+        else:
+            return res.upper()
+
+
+@dataclass
+class FoxESSResponse:
+    """Outcome of one OpenAPI call, the body is decoded exactly once."""
+
+    data: bytes | None = None
+    payload: dict | None = None
+    errno: int | None = None
+    msg: str | None = None
+    result: Any = None
+    exception: Exception | None = None
+    dns_error: bool = False
+    # timed out on the caller's shorter timeout, e.g. the poll cycle deadline, not a cloud failure
+    cut_short: bool = False
+    # connect is the dns/tcp/tls handshake (0 when a pooled connection was reused), request the whole call
+    timing: dict = field(default_factory=dict)
+
+    @property
+    def ok(self) -> bool:
+        """True when the cloud answered errno 0 with a success message."""
+        return self.errno == 0 and self.msg in SUCCESS_MSGS
+
+    @property
+    def timed_out(self) -> bool:
+        return isinstance(self.exception, asyncio.TimeoutError)
+
+    def decode(self, data: bytes) -> None:
+        """Parse the body and pick out errno, msg and result."""
+        self.data = data
+        if not data:
+            return
+        try:
+            payload = json_loads(data)
+        except ValueError as err:
+            _LOGGER.debug("FoxESS Cloud response is not JSON: %s %s", err, data[:200])
+            self.exception = err
+            return
+        if not isinstance(payload, dict):
+            _LOGGER.debug("FoxESS Cloud response is not an object: %s", data[:200])
+            return
+        self.payload = payload
+        self.errno = payload.get("errno")
+        self.msg = payload.get("msg")
+        self.result = payload.get("result")
+
+
+class FoxESSClient:
+    """Keep-alive connection pool to the FoxESS cloud, one per host."""
+
+    def __init__(self, hass, domain: str = _ENDPOINT_OA_DOMAIN) -> None:
+        # the limiter, breakers and quota of each apiKey are kept in hass.data
+        self.hass = hass
+        self.domain = domain
+        trace = aiohttp.TraceConfig()
+        trace.on_request_start.append(self._on_request_start)
+        trace.on_connection_create_start.append(self._on_connection_create_start)
+        trace.on_connection_create_end.append(self._on_connection_create_end)
+        trace.on_connection_reuseconn.append(self._on_connection_reuseconn)
+        # cached DNS answers are refreshed in the background and served stale if DNS fails
+        self.resolver = CachingResolver()
+        connector = aiohttp.TCPConnector(
+            limit_per_host=POOL_LIMIT_PER_HOST,
+            keepalive_timeout=KEEPALIVE_TIMEOUT,
+            ssl=None if DEFAULT_VERIFY_SSL else False,
+            resolver=self.resolver,
+            use_dns_cache=False,
+        )
+        self._session = aiohttp.ClientSession(
+            connector=connector,
+            trace_configs=[trace],
+            timeout=aiohttp.ClientTimeout(total=DEFAULT_TIMEOUT),
+        )
+        self.connections = 0
+        self.reused = 0
+        self.metrics = EndpointMetrics(DEFAULT_TIMEOUT)
+        # apiKeys whose GET calls are sent again when slower than usual
+        self.hedge_keys: set[str] = set()
+        self.hedged = 0
+
+    async def _on_request_start(self, session, ctx, params):
+        ctx.trace_request_ctx.start = time.monotonic()
+
+    async def _on_connection_create_start(self, session, ctx, params):
+        ctx.trace_request_ctx.connect_start = time.monotonic()
+
+    async def _on_connection_create_end(self, session, ctx, params):
+        timing = ctx.trace_request_ctx
+        timing.connect = time.monotonic() - timing.connect_start
+        self.connections += 1
+
+    async def _on_connection_reuseconn(self, session, ctx, params):
+        ctx.trace_request_ctx.reused = True
+        self.reused += 1
+
+    def as_dict(self) -> dict:
+        """Connection pool, DNS cache and per endpoint call metrics, for diagnostics."""
+        return {
+            "connections": self.connections,
+            "reused": self.reused,
+            "hedged": self.hedged,
+            "dns": self.resolver.as_dict(),
+            "endpoints": self.metrics.as_dict(),
+        }
+
+    async def async_close(self) -> None:
+        await self._session.close()
+        await self.resolver.close()
+
+    async def async_prefetch(self) -> None:
+        """Resolve the cloud host before the first request needs it."""
+        url = yarl.URL(self.domain)
+        await self.resolver.async_prefetch(url.host, url.port)
+
+    async def async_request(
+        self, method, path, apiKey, params=None, data=None, scope=None, timeout=None
+    ) -> FoxESSResponse:
+        """Make one signed call, paced by the apiKey rate limiter.
+
+        scope is the inverter serial number the call is about, it picks the
+        circuit breaker, calls for several inverters use the apiKey wide one.
+        The timeout adapts to the endpoint's recent latency, a timeout (seconds)
+        given by the caller, e.g. to keep a poll cycle to its deadline, can
+        only shorten it. A call timed out on that shorter timeout comes back
+        cut_short, it isn't held against the endpoint's latency or circuit.
+        """
+        breaker = get_health(self.hass, apiKey).breaker(path, scope)
+        if not breaker.allow():
+            _LOGGER.debug("FoxESS Cloud circuit %s open, call skipped", breaker.name)
+            return FoxESSResponse(exception=CircuitOpenError(breaker.name))
+        probe = breaker.state == STATE_HALF_OPEN
+        try:
+            await get_limiter(self.hass, apiKey).acquire()  # check for api delay
+            adaptive = self.metrics.timeout(path)
+            shortened = timeout is not None and timeout < adaptive
+            timeout = adaptive if timeout is None else min(timeout, adaptive)
+            if method == METHOD_GET and apiKey in self.hedge_keys:
+                response = await self._async_hedged(
+                    method, path, apiKey, params, data, timeout, shortened
+                )
+            else:
+                response = await self._async_call(
+                    method, path, apiKey, params, data, timeout, shortened
+                )
+            if (
+                isinstance(response.exception, aiohttp.ServerDisconnectedError)
+                and response.timing.get("reused")
+            ):
+                # the cloud dropped an idle pooled connection, retry once on a fresh one
+                _LOGGER.debug("Pooled connection closed by server, retrying %s", path)
+                await get_limiter(self.hass, apiKey).acquire()
+                response = await self._async_call(
+                    method, path, apiKey, params, data, timeout, shortened
+                )
+        except BaseException:
+            if probe:
+                # a cancelled probe records nothing, the circuit would stay half-open for good
+                breaker.abandon_probe()
+            raise
+        if response.cut_short:
+            if probe:
+                breaker.abandon_probe()
+        elif response.ok:
+            breaker.record_success()
+        else:
+            breaker.record_failure(response.errno)
+        return response
+
+    async def _async_call(
+        self, method, path, apiKey, params, data, timeout, shortened=False
+    ) -> FoxESSResponse:
+        """One call, counted against the daily quota and its latency recorded."""
+        response = await self._async_request(method, path, apiKey, params, data, timeout)
+        self._count(apiKey, response)
+        if response.timed_out and shortened:
+            # the caller ran out of time, it says nothing about the endpoint
+            response.cut_short = True
+        elif response.timed_out:
+            # recorded at the full adaptive timeout, a hedge's shorter one would
+            # pull the p99 down and the timeout would keep shrinking after itself
+            self.metrics.record(path, OUTCOME_TIMEOUT, self.metrics.timeout(path))
+        else:
+            # a call that failed before the cloud answered has no latency
+            answered = not isinstance(response.exception, aiohttp.ClientError)
+            self.metrics.record(
+                path,
+                OUTCOME_SUCCESS if response.ok else OUTCOME_ERROR,
+                response.timing["request"] / 1000 if answered else None,
+                len(response.data or b""),
+            )
+        return response
+
+    async def _async_hedged(
+        self, method, path, apiKey, params, data, timeout, shortened=False
+    ) -> FoxESSResponse:
+        """Send a GET again when it is slower than usual, the first good answer wins."""
+        delay = self.metrics.hedge_delay(path)
+        first = asyncio.ensure_future(
+            self._async_call(method, path, apiKey, params, data, timeout, shortened)
+        )
+        if delay is None or delay >= timeout:
+            return await first
+        await asyncio.wait({first}, timeout=delay)
+        if first.done():
+            return first.result()
+        await get_limiter(self.hass, apiKey).acquire()
+        if first.done():
+            # answered while the hedge waited for its turn, nothing is sent
+            return first.result()
+        _LOGGER.debug("FoxESS Cloud %s slower than %.1f seconds, sending it again", path, delay)
+        self.hedged += 1
+        second = asyncio.ensure_future(
+            self._async_call(
+                method, path, apiKey, params, data, max(timeout - delay, 1), shortened
+            )
+        )
+        tasks = (first, second)
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                response = await next_done
+                if response.ok:
+                    break
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+                    # the cloud has most likely counted the call already
+                    get_quota(self.hass, apiKey).count()
+        return response
+
+    def _count(self, apiKey, response: FoxESSResponse) -> None:
+        # a call that never connected can't have reached the cloud's counter
+        if not isinstance(response.exception, aiohttp.ClientConnectorError):
+            get_quota(self.hass, apiKey).count(response.errno)
+
+    async def _async_request(
+        self, method, path, apiKey, params, data, timeout=None
+    ) -> FoxESSResponse:
+        headerData = GetAuth().get_signature(token=apiKey, path=path)
+        timing = SimpleNamespace(start=time.monotonic(), connect=0.0, reused=False)
+        response = FoxESSResponse()
+        try:
+            async with self._session.request(
+                method,
+                self.domain + path,
+                params=params,
+                data=data,
+                headers=headerData,
+                trace_request_ctx=timing,
+                timeout=self._session.timeout if timeout is None else aiohttp.ClientTimeout(total=timeout),
+            ) as resp:
+                body = await resp.read()
+                if resp.status >= 400:
+                    _LOGGER.debug("FoxESS Cloud HTTP %s for %s: %s", resp.status, path, body[:200])
+                else:
+                    response.decode(body)
+        except aiohttp.ClientConnectorError as err:
+            response.exception = err
+            response.dns_error = isinstance(err.os_error, socket.gaierror)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as err:
+            response.exception = err
+        if response.exception is not None:
+            _LOGGER.debug("FoxESS Cloud request %s failed: %r", path, response.exception)
+        response.timing = {
+            "connect": round(timing.connect * 1000),
+            "request": round((time.monotonic() - timing.start) * 1000),
+            "reused": timing.reused,
+        }
+        _LOGGER.debug("FoxESS Cloud %s timing: %s", path, response.timing)
+        return response
+
+
+@callback
+def get_client(hass, domain: str = _ENDPOINT_OA_DOMAIN) -> FoxESSClient:
+    """Return the shared client for a cloud host, closed when Home Assistant stops."""
+    clients = hass.data.setdefault(DOMAIN, {}).setdefault("clients", {})
+    client = clients.get(domain)
+    if client is None:
+        client = FoxESSClient(hass, domain)
+        clients[domain] = client
+        hass.async_create_background_task(client.async_prefetch(), "foxess dns prefetch")
+
+        async def _async_close(event):
+            await client.async_close()
+
+        hass.bus.async_listen_once(EVENT_HOMEASSISTANT_CLOSE, _async_close)
+    return client
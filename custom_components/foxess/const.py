@@ -0,0 +1,3 @@
+"""Constants shared by the FoxESS cloud integration modules."""
+
+DOMAIN = "foxess"
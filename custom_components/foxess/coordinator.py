@@ -0,0 +1,72 @@
+"""Data update coordinator for the FoxESS cloud integration."""
+from __future__ import annotations
+
+import logging
+
+from homeassistant.core import callback
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
+
+from .derived import DerivedStage
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def _flatten(data: dict) -> dict:
+    """Map (bucket, key) to value for every value in the allData snapshot."""
+    flat = {}
+    for bucket, values in data.items():
+        if isinstance(values, dict):
+            for key, value in values.items():
+                flat[(bucket, key)] = value
+        else:
+            flat[(bucket, None)] = values
+    return flat
+
+
+class FoxESSCoordinator(DataUpdateCoordinator):
+    """Coordinator that tells entities which source keys changed since the last update."""
+
+    def __init__(self, *args, derived: DerivedStage | None = None, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.derived = derived
+        self._snapshot: dict = {}
+        self._last_success: bool | None = None
+        # None means everything changed, entities must write their state
+        self.changed: set | None = None
+        self.suppressed_writes = 0
+
+    @callback
+    def derive(self) -> None:
+        """Work out the derived values of the current data, once for every entity."""
+        if self.data is not None and self.derived is not None:
+            self.derived.compute(self.data)
+
+    @callback
+    def async_update_listeners(self) -> None:
+        """Work out the derived values and the changed keys, then notify the listeners."""
+        if self.data is None:
+            self.changed = None
+        else:
+            self.derive()
+            snapshot = _flatten(self.data)
+            if self._last_success != self.last_update_success or not self._snapshot:
+                self.changed = None
+            else:
+                previous = self._snapshot
+                self.changed = {
+                    key
+                    for key, value in snapshot.items()
+                    if key not in previous or previous[key] != value
+                }
+                self.changed.update(previous.keys() - snapshot.keys())
+            self._snapshot = snapshot
+        self._last_success = self.last_update_success
+        suppressed = self.suppressed_writes
+        super().async_update_listeners()
+        _LOGGER.debug(
+            "%s changed keys: %s, entity writes suppressed: %s (total %s)",
+            self.name,
+            "all" if self.changed is None else len(self.changed),
+            self.suppressed_writes - suppressed,
+            self.suppressed_writes,
+        )
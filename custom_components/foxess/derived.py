@@ -0,0 +1,157 @@
+"""Values combined from several allData variables, worked out once per update.
+
+The coordinator runs the stage before it notifies the entities, the results
+go in the "derived" bucket and the entities only read them from there.
+Besides the built in metrics, the derived platform option adds linear
+combinations of any variables, each shown as its own sensor.
+"""
+from __future__ import annotations
+
+from collections.abc import Callable
+import logging
+
+from homeassistant.components.sensor import DEVICE_CLASSES_SCHEMA, STATE_CLASSES_SCHEMA
+from homeassistant.const import CONF_DEVICE_CLASS, CONF_NAME, CONF_UNIT_OF_MEASUREMENT
+import homeassistant.helpers.config_validation as cv
+from homeassistant.util import slugify
+import voluptuous as vol
+
+_LOGGER = logging.getLogger(__name__)
+
+CONF_TERMS = "terms"
+CONF_STATE_CLASS = "state_class"
+CONF_MINIMUM = "minimum"
+CONF_ROUND = "round"
+
+# allData buckets a derived metric can read, "derived" for the metrics listed before it
+TERM_BUCKETS = ("raw", "report", "reportMonth", "reportDailyGeneration", "estimate", "derived")
+
+RUNNING_STATES = {
+    "160": "self-test",
+    "161": "waiting",
+    "162": "checking",
+    "163": "on-grid",
+    "164": "off-grid",
+    "165": "fault",
+    "166": "permanent-fault",
+    "167": "standby",
+    "168": "upgrading",
+    "169": "fct",
+    "170": "illegal",
+}
+
+
+def _term(value) -> tuple[str, str]:
+    """A "bucket.variable" term, e.g. raw.loadsPower."""
+    bucket, _, variable = cv.string(value).partition(".")
+    if bucket not in TERM_BUCKETS or not variable:
+        raise vol.Invalid(
+            f"{value} is not a bucket ({', '.join(TERM_BUCKETS)}) and variable, e.g. raw.loadsPower"
+        )
+    return bucket, variable
+
+
+DERIVED_SCHEMA = vol.Schema(
+    {
+        vol.Required(CONF_NAME): cv.string,
+        vol.Required(CONF_TERMS): vol.All({_term: vol.Coerce(float)}, vol.Length(min=1)),
+        vol.Optional(CONF_UNIT_OF_MEASUREMENT): cv.string,
+        vol.Optional(CONF_DEVICE_CLASS): DEVICE_CLASSES_SCHEMA,
+        vol.Optional(CONF_STATE_CLASS): STATE_CLASSES_SCHEMA,
+        vol.Optional(CONF_MINIMUM): vol.Coerce(float),
+        vol.Optional(CONF_ROUND, default=3): vol.All(vol.Coerce(int), vol.Range(min=0, max=6)),
+    }
+)
+
+
+class LinearMetric:
+    """Sum of variables times their factors, missing variables count as 0."""
+
+    def __init__(
+        self, terms: dict[tuple[str, str], float], minimum: float | None = None, ndigits: int = 3
+    ) -> None:
+        self.terms = tuple(terms.items())
+        self.minimum = minimum
+        self.ndigits = ndigits
+        self.inputs = frozenset(terms)
+
+    def __call__(self, data: dict) -> float:
+        total = 0.0
+        for (bucket, variable), factor in self.terms:
+            total += float(data[bucket].get(variable) or 0) * factor
+        if self.minimum is not None and total < self.minimum:
+            # the cloud sometimes returns readings that add up below 0
+            total = self.minimum
+        return round(total, self.ndigits)
+
+
+def _running_state(data: dict) -> str | None:
+    if data["raw"] and "runningState" in data["raw"]:
+        res = data["raw"]["runningState"]
+        if res not in RUNNING_STATES:
+            _LOGGER.debug("runcode %s", res)
+        return f"{res}: {RUNNING_STATES.get(res, 'unknown code')}"
+    return None
+
+
+_running_state.inputs = frozenset({("raw", "runningState")})
+
+BUILTIN_METRICS: dict[str, Callable[[dict], object]] = {
+    "solarPower": LinearMetric(
+        {
+            ("raw", "loadsPower"): 1,
+            ("raw", "batChargePower"): 1,
+            ("raw", "feedinPower"): 1,
+            ("raw", "gridConsumptionPower"): -1,
+            ("raw", "batDischargePower"): -1,
+        },
+        minimum=0,
+    ),
+    "solar": LinearMetric(
+        {
+            ("report", "loads"): 1,
+            ("report", "chargeEnergyToTal"): 1,
+            ("report", "feedin"): 1,
+            ("report", "gridConsumption"): -1,
+            ("report", "dischargeEnergyToTal"): -1,
+        },
+        minimum=0,
+    ),
+    "runningState": _running_state,
+}
+
+
+def derived_key(config: dict) -> str:
+    return slugify(config[CONF_NAME])
+
+
+class DerivedStage:
+    """The metrics of an inverter, computed in order into allData["derived"]."""
+
+    def __init__(self, configs: list[dict] = ()) -> None:
+        self.metrics = dict(BUILTIN_METRICS)
+        self.configs: list[dict] = []  # the user defined metrics kept, each gets a sensor
+        for config in configs:
+            key = derived_key(config)
+            if key in self.metrics:
+                _LOGGER.error("Derived sensor %s clashes with another derived value, ignored", config[CONF_NAME])
+                continue
+            self.configs.append(config)
+            self.metrics[key] = LinearMetric(
+                config[CONF_TERMS], config.get(CONF_MINIMUM), config[CONF_ROUND]
+            )
+
+    @property
+    def inputs(self) -> frozenset[tuple[str, str]]:
+        """Every (bucket, variable) the metrics read."""
+        return frozenset().union(*(metric.inputs for metric in self.metrics.values()))
+
+    def compute(self, data: dict) -> dict:
+        derived = data["derived"] = {}
+        for key, metric in self.metrics.items():
+            try:
+                derived[key] = metric(data)
+            except (TypeError, ValueError) as err:
+                _LOGGER.debug("Derived %s not worked out: %s", key, err)
+                derived[key] = None
+        return derived
@@ -0,0 +1,83 @@
+"""Energy estimates between report polls, integrated from the realtime power readings."""
+from __future__ import annotations
+
+from datetime import date
+import logging
+
+from homeassistant.util import dt as dt_util
+
+_LOGGER = logging.getLogger(__name__)
+
+# realtime power variable (kW) -> report energy variable (kWh) it adds up to
+POWER_TO_ENERGY = {
+    "feedinPower": "feedin",
+    "gridConsumptionPower": "gridConsumption",
+    "loadsPower": "loads",
+    "batChargePower": "chargeEnergyToTal",
+    "batDischargePower": "dischargeEnergyToTal",
+}
+MAX_GAP = 15 * 60  # seconds, samples further apart than this are not integrated across
+
+
+class EnergyIntegrator:
+    """Trapezoidal (Riemann) sum of the power samples, anchored to the report totals.
+
+    The estimate is the last report total plus the energy integrated since
+    it. A report re-anchors the estimate, but within a day the estimate
+    never goes down, a report below it holds it until the integration
+    catches up. At local midnight every total starts again from zero, as
+    the report does.
+    """
+
+    def __init__(self) -> None:
+        self.day: date | None = None
+        self.anchors: dict[str, float] = {}
+        self.integrated: dict[str, float] = {}
+        self.estimates: dict[str, float] = {}
+        self._last: tuple[float, dict[str, float]] | None = None
+
+    def _roll(self, now: float) -> None:
+        day = dt_util.as_local(dt_util.utc_from_timestamp(now)).date()
+        if day == self.day:
+            return
+        if self.day is not None:
+            _LOGGER.debug("Energy estimates reset for %s", day)
+            self.anchors = dict.fromkeys(POWER_TO_ENERGY.values(), 0.0)
+        self.day = day
+        self.integrated = {}
+        self.estimates = {}
+        self._last = None
+
+    def sample(self, raw: dict, now: float) -> None:
+        """Add the energy since the previous realtime sample."""
+        self._roll(now)
+        powers = {
+            key: float(raw[key])
+            for key in POWER_TO_ENERGY
+            if isinstance(raw.get(key), (int, float))
+        }
+        if self._last is not None:
+            then, previous = self._last
+            elapsed = now - then
+            if 0 < elapsed <= MAX_GAP:
+                for key, energy in POWER_TO_ENERGY.items():
+                    if key in powers and key in previous:
+                        # negative readings are noise, these totals only increase
+                        kw = max((powers[key] + previous[key]) / 2, 0.0)
+                        self.integrated[energy] = self.integrated.get(energy, 0.0) + kw * elapsed / 3600
+        self._last = (now, powers)
+        self._update()
+
+    def anchor(self, report: dict, now: float) -> None:
+        """Start again from the authoritative report totals."""
+        self._roll(now)
+        for energy in POWER_TO_ENERGY.values():
+            if isinstance(report.get(energy), (int, float)):
+                self.anchors[energy] = float(report[energy])
+                self.integrated[energy] = 0.0
+        self._update()
+
+    def _update(self) -> None:
+        for energy, total in self.anchors.items():
+            estimate = round(total + self.integrated.get(energy, 0.0), 3)
+            self.estimates[energy] = max(estimate, self.estimates.get(energy, 0.0))
@@ -0,0 +1,33 @@
+"""The inverter of one platform entry, handed to the fetch functions."""
+from __future__ import annotations
+
+from .batch import RealtimeBatcher
+from .options import InverterOptions
+from .reports import ReportHistory
+from .variables import VariableSet
+
+
+class FoxESSInverter:
+    """What the fetches of one inverter need besides hass and its allData.
+
+    async_setup_platform creates one per platform entry, so any number of
+    inverters with different options run side by side. The rate limiter,
+    circuit breakers, quota and batcher belong to the apiKey and are shared
+    with the other inverters using it, they are kept in hass.data.
+    """
+
+    def __init__(
+        self,
+        devicesn: str,
+        apiKey: str,
+        options: InverterOptions,
+        history: ReportHistory,
+        variables: VariableSet | None = None,
+        batcher: RealtimeBatcher | None = None,
+    ) -> None:
+        self.devicesn = devicesn
+        self.apiKey = apiKey
+        self.options = options
+        self.history = history
+        self.variables = variables  # the learned variable set in auto variable mode
+        self.batcher = batcher  # fetches real time data with the apiKey's other inverters
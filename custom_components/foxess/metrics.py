@@ -0,0 +1,145 @@
+"""Latency, outcome and size of the FoxESS cloud calls, per endpoint.
+
+The rolling latency window sizes the request timeouts, the histogram and
+counters are kept since startup for the diagnostic sensors and the
+get_diagnostics service.
+"""
+from __future__ import annotations
+
+from bisect import bisect_left
+from collections import deque
+import math
+
+WINDOW = 200  # latest latencies kept per endpoint
+MIN_SAMPLES = 20  # fewer samples than this and the default timeout is used
+TIMEOUT_FACTOR = 3  # timeout is this many times the p99 latency
+MIN_TIMEOUT = 10  # seconds, shortest adaptive timeout
+HEDGE_PERCENTILE = 95  # a GET still unanswered after this latency is sent again
+# histogram bucket upper bounds in seconds, the last bucket takes everything slower
+HISTOGRAM_BOUNDS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 75)
+PERCENTILES = (50, 95, 99)
+
+OUTCOME_SUCCESS = "success"
+OUTCOME_ERROR = "error"  # an answer with a non zero errno, an HTTP error or a failed connection
+OUTCOME_TIMEOUT = "timeout"
+
+
+class LatencyWindow:
+    """The latest request latencies of one endpoint, in seconds."""
+
+    def __init__(self) -> None:
+        self.samples: deque[float] = deque(maxlen=WINDOW)
+        self._sorted: list[float] | None = None
+
+    def __len__(self) -> int:
+        return len(self.samples)
+
+    def record(self, seconds: float) -> None:
+        self.samples.append(seconds)
+        self._sorted = None
+
+    def percentile(self, percent: float) -> float | None:
+        """Nearest rank percentile, None before the first sample."""
+        if not self.samples:
+            return None
+        if self._sorted is None:
+            self._sorted = sorted(self.samples)
+        return _nearest_rank(self._sorted, percent)
+
+
+def _nearest_rank(ordered: list[float], percent: float) -> float:
+    rank = math.ceil(percent / 100 * len(ordered))
+    return ordered[min(max(rank, 1), len(ordered)) - 1]
+
+
+class EndpointStats:
+    """Everything recorded about the calls to one endpoint."""
+
+    def __init__(self) -> None:
+        self.window = LatencyWindow()
+        self.histogram = [0] * (len(HISTOGRAM_BOUNDS) + 1)
+        self.outcomes = {OUTCOME_SUCCESS: 0, OUTCOME_ERROR: 0, OUTCOME_TIMEOUT: 0}
+        self.bytes_received = 0
+
+    def record(self, outcome: str, seconds: float | None, size: int) -> None:
+        self.outcomes[outcome] += 1
+        self.bytes_received += size
+        if seconds is not None:
+            self.window.record(seconds)
+            self.histogram[bisect_left(HISTOGRAM_BOUNDS, seconds)] += 1
+
+    def as_dict(self) -> dict:
+        return {
+            **{f"p{percent}": _ms(self.window.percentile(percent)) for percent in PERCENTILES},
+            **self.outcomes,
+            "bytes_received": self.bytes_received,
+            "histogram": {
+                f"le_{bound}s": count for bound, count in zip(HISTOGRAM_BOUNDS, self.histogram)
+            }
+            | {"slower": self.histogram[-1]},
+        }
+
+
+def _ms(seconds: float | None) -> int | None:
+    return None if seconds is None else round(seconds * 1000)
+
+
+class EndpointMetrics:
+    """Call metrics of a cloud host, one EndpointStats per endpoint path.
+
+    A call that times out is recorded at the endpoint's timeout, so when the
+    cloud slows down the p99, and with it the timeout, grows back towards the
+    default. A call that never got an answer has no latency.
+    """
+
+    def __init__(self, default_timeout: float) -> None:
+        self.default_timeout = default_timeout
+        self.endpoints: dict[str, EndpointStats] = {}
+
+    def stats(self, path: str) -> EndpointStats:
+        stats = self.endpoints.get(path)
+        if stats is None:
+            stats = self.endpoints[path] = EndpointStats()
+        return stats
+
+    def record(self, path: str, outcome: str, seconds: float | None = None, size: int = 0) -> None:
+        self.stats(path).record(outcome, seconds, size)
+
+    def timeout(self, path: str) -> float:
+        """p99 latency times TIMEOUT_FACTOR, kept between MIN_TIMEOUT and the default."""
+        stats = self.endpoints.get(path)
+        if stats is None or len(stats.window) < MIN_SAMPLES:
+            return self.default_timeout
+        timeout = stats.window.percentile(99) * TIMEOUT_FACTOR
+        return min(max(timeout, MIN_TIMEOUT), self.default_timeout)
+
+    def hedge_delay(self, path: str) -> float | None:
+        """Seconds to wait before hedging a call, None until there are enough samples."""
+        stats = self.endpoints.get(path)
+        if stats is None or len(stats.window) < MIN_SAMPLES:
+            return None
+        return stats.window.percentile(HEDGE_PERCENTILE)
+
+    def summary(self) -> dict:
+        """Percentiles over every endpoint's window and the failed call count, for the sensors."""
+        merged = sorted(
+            seconds for stats in self.endpoints.values() for seconds in stats.window.samples
+        )
+        return {
+            **{
+                f"p{percent}": _ms(_nearest_rank(merged, percent) if merged else None)
+                for percent in PERCENTILES
+            },
+            "errors": sum(stats.outcomes[OUTCOME_ERROR] for stats in self.endpoints.values()),
+            "timeouts": sum(stats.outcomes[OUTCOME_TIMEOUT] for stats in self.endpoints.values()),
+            "endpoints": {
+                path: {
+                    **{f"p{percent}": _ms(stats.window.percentile(percent)) for percent in PERCENTILES},
+                    **stats.outcomes,
+                }
+                for path, stats in self.endpoints.items()
+            },
+        }
+
+    def as_dict(self) -> dict:
+        return {path: stats.as_dict() for path, stats in self.endpoints.items()}
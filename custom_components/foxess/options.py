@@ -0,0 +1,16 @@
+"""Platform options of an inverter, each platform entry has its own."""
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class InverterOptions:
+    """How the cloud is asked about an inverter, read by the fetch functions."""
+
+    v1_api: bool = True  # device detail and real time data from the v1 endpoints
+    restrict: bool = False  # real time fetches only ask for RESTRICTED_VARIABLES
+    xtzone: bool = False  # apply the offset of the real time data timestamp
+    evo: bool = False  # device detail from the device list, EVO isn't in the detail call
+    batch: bool = False  # real time data in one call with the other inverters of the apiKey
+
@@ -0,0 +1,158 @@
+"""Daily OpenAPI call budget, counted per apiKey."""
+from __future__ import annotations
+
+from functools import partial
+import hashlib
+import logging
+
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util
+
+from .const import DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_DAILY_BUDGET = 1440  # FoxESS OpenAPI calls per inverter per day
+ERRNO_TOO_FREQUENT = 40400  # the cloud refuses calls that come too often
+
+STORAGE_KEY = f"{DOMAIN}.quota"
+STORAGE_VERSION = 1
+SAVE_DELAY = 60  # seconds, counts are written at most once a minute and at shutdown
+
+MIN_PROJECTION_WINDOW = 60 * 60  # seconds of usage needed before projecting the day
+MAX_STRETCH = 12.0  # longest stretch, 5 minute realtime polls become hourly
+
+
+def _key_id(apiKey: str) -> str:
+    """Store a digest of the apiKey, never the key itself."""
+    return hashlib.sha256(apiKey.encode("utf-8")).hexdigest()[:16]
+
+
+class QuotaAccountant:
+    """Count the calls made with one apiKey since local midnight."""
+
+    def __init__(self, apiKey: str, budget: int | None = None) -> None:
+        self.key_id = _key_id(apiKey)
+        # without an apiBudget the cloud's allowance, which grows with each inverter
+        self.configured = budget is not None
+        self.budget = budget or DEFAULT_DAILY_BUDGET
+        self.inverters: set[str] = set()
+        self.day = dt_util.now().date()
+        self.used = 0
+        self.refused = 0
+        self._store: Store | None = None
+        self._data_to_save = None  # every quota of the store, set with _store
+
+    def add_inverter(self, devicesn: str) -> None:
+        self.inverters.add(devicesn)
+        if not self.configured:
+            self.budget = DEFAULT_DAILY_BUDGET * len(self.inverters)
+
+    def _roll(self, now) -> None:
+        if now.date() != self.day:
+            _LOGGER.debug("API quota %s: %s calls used on %s", self.key_id, self.used, self.day)
+            self.day = now.date()
+            self.used = 0
+            self.refused = 0
+
+    def count(self, errno=None) -> None:
+        """Count one call, errno 40400 is also counted as refused.
+
+        40400 says calls came too often, which another client on the same
+        key can cause too. Pacing is left to the circuit breaker and the
+        retry backoff, the budget is not treated as spent.
+        """
+        self._roll(dt_util.now())
+        self.used += 1
+        if errno == ERRNO_TOO_FREQUENT:
+            self.refused += 1
+            _LOGGER.debug(
+                "FoxESS Cloud refused call %s of %s as too frequent", self.used, self.budget
+            )
+        if self._store is not None:
+            self._store.async_delay_save(self._data_to_save, SAVE_DELAY)
+
+    @property
+    def remaining(self) -> int:
+        return max(self.budget - self.used, 0)
+
+    def projected(self, now=None) -> int | None:
+        """Calls used by midnight at today's rate, None until there is enough history."""
+        now = now or dt_util.now()
+        self._roll(now)
+        elapsed = (now - dt_util.start_of_local_day(now)).total_seconds()
+        if elapsed < MIN_PROJECTION_WINDOW:
+            return None
+        return round(self.used * 86400 / elapsed)
+
+    def stretch(self, now=None) -> float:
+        """Factor to lengthen poll intervals by so the budget lasts until midnight."""
+        now = now or dt_util.now()
+        projected = self.projected(now)
+        if projected is None or projected <= self.budget:
+            return 1.0
+        elapsed = (now - dt_util.start_of_local_day(now)).total_seconds()
+        needed = self.used * (86400 - elapsed) / elapsed  # calls left today at the current rate
+        return round(min(max(needed / max(self.remaining, 1), 1.0), MAX_STRETCH), 2)
+
+    def as_dict(self) -> dict:
+        projected = self.projected()
+        return {
+            "used": self.used,
+            "remaining": self.remaining,
+            "budget": self.budget,
+            "projected": projected,
+            "stretch": self.stretch(),
+            "refused": self.refused,
+        }
+
+
+def get_quota(
+    hass, apiKey: str, budget: int | None = None, devicesn: str | None = None
+) -> QuotaAccountant:
+    """Return the shared quota accountant for an apiKey, counting devicesn as one of its inverters."""
+    quotas = hass.data.setdefault(DOMAIN, {}).setdefault("quotas", {})
+    quota = quotas.get(apiKey)
+    if quota is None:
+        quota = QuotaAccountant(apiKey, budget)
+        quotas[apiKey] = quota
+    elif budget is not None and not quota.configured:
+        quota.configured = True
+        quota.budget = budget
+    elif budget is not None and budget != quota.budget:
+        _LOGGER.warning(
+            "Daily API budget %s ignored, another inverter using this apiKey set %s",
+            budget,
+            quota.budget,
+        )
+    if devicesn is not None:
+        quota.add_inverter(devicesn)
+    return quota
+
+
+def _data_to_save(quotas: dict) -> dict:
+    return {
+        quota.key_id: {"day": quota.day.isoformat(), "used": quota.used, "refused": quota.refused}
+        for quota in quotas.values()
+    }
+
+
+async def async_load_quota(hass, quota: QuotaAccountant) -> None:
+    """Restore today's count after a restart and persist it from now on."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    load = domain_data.get("quota_load")
+    if load is None:
+        # one shared store, inverters set up at the same time wait on the same load
+        domain_data["quota_store"] = Store(hass, STORAGE_VERSION, STORAGE_KEY)
+        load = hass.async_create_task(domain_data["quota_store"].async_load())
+        domain_data["quota_load"] = load
+    saved = (await load or {}).get(quota.key_id)
+    if quota._store is not None:
+        return
+    if saved and saved.get("day") == quota.day.isoformat():
+        # calls made before the restart still count against today's budget
+        quota.used += saved.get("used", 0)
+        quota.refused += saved.get("refused", 0)
+        _LOGGER.debug("API quota %s restored: %s calls used today", quota.key_id, quota.used)
+    quota._data_to_save = partial(_data_to_save, domain_data["quotas"])
+    quota._store = domain_data["quota_store"]
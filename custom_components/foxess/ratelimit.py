@@ -0,0 +1,93 @@
+"""Per API key rate limiting for the FoxESS OpenAPI."""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+
+from .const import DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+# OpenAPI demands a minimum of 1 second between calls, keep a 0.2s safety margin
+DEFAULT_API_RATE = 1 / 1.2  # requests per second
+DEFAULT_API_BURST = 1  # requests allowed back to back after an idle period
+
+
+class TokenBucket:
+    """Async token bucket, waiters are served in FIFO order."""
+
+    def __init__(self, rate: float = DEFAULT_API_RATE, burst: int = DEFAULT_API_BURST) -> None:
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        # asyncio.Lock wakes its waiters in the order they queued, which gives fair FIFO ordering
+        self._lock = asyncio.Lock()
+        self.waiting = 0
+        self.calls = 0
+        self.delayed = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> float:
+        """Wait for a token, returns the number of seconds the caller waited."""
+        start = time.monotonic()
+        self.waiting += 1
+        try:
+            async with self._lock:
+                self._refill(time.monotonic())
+                if self._tokens < 1:
+                    delay = (1 - self._tokens) / self.rate
+                    _LOGGER.debug("API enforced delay, wait: %s", round(delay, 2))
+                    await asyncio.sleep(delay)
+                    self._refill(time.monotonic())
+                self._tokens -= 1
+        finally:
+            self.waiting -= 1
+        waited = time.monotonic() - start
+        self.calls += 1
+        self.total_wait += waited
+        if waited > 0.01:
+            self.delayed += 1
+        if waited > self.max_wait:
+            self.max_wait = waited
+        return waited
+
+    def as_dict(self) -> dict:
+        """Return the limiter settings and wait counters."""
+        return {
+            "rate": self.rate,
+            "burst": self.burst,
+            "calls": self.calls,
+            "delayed": self.delayed,
+            "total_wait": round(self.total_wait, 3),
+            "max_wait": round(self.max_wait, 3),
+            "waiting": self.waiting,
+        }
+
+
+def get_limiter(
+    hass, apiKey: str, rate: float | None = None, burst: int | None = None
+) -> TokenBucket:
+    """Return the shared limiter for an API key, creating it on first use."""
+    limiters = hass.data.setdefault(DOMAIN, {}).setdefault("limiters", {})
+    limiter = limiters.get(apiKey)
+    if limiter is None:
+        limiter = TokenBucket(rate or DEFAULT_API_RATE, burst or DEFAULT_API_BURST)
+        limiters[apiKey] = limiter
+    elif (rate is not None and rate != limiter.rate) or (
+        burst is not None and burst != limiter.burst
+    ):
+        _LOGGER.warning(
+            "API rate %s/%s ignored, this apiKey is already limited to %s req/s burst %s",
+            rate,
+            burst,
+            limiter.rate,
+            limiter.burst,
+        )
+    return limiter
@@ -0,0 +1,146 @@
+"""Daily report totals of each inverter, so past days are not fetched again."""
+from __future__ import annotations
+
+from datetime import date, datetime, timedelta
+from functools import partial
+import logging
+
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util
+
+from .const import DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_KEY = f"{DOMAIN}.reports"
+STORAGE_VERSION = 1
+SAVE_DELAY = 60  # seconds
+
+REPORT_VARIABLES = [
+    "feedin",
+    "generation",
+    "gridConsumption",
+    "chargeEnergyToTal",
+    "dischargeEnergyToTal",
+    "loads",
+    "PVEnergyTotal",
+]
+SETTLE = timedelta(hours=1)  # the cloud may still add to a day's totals this long after midnight
+KEEP_DAYS = 400  # days of history kept
+
+
+class ReportHistory:
+    """Daily totals of the report variables, the past days final once fetched.
+
+    A day's totals are final when they were fetched SETTLE after the day
+    ended, from then on they are served from here. Until then the day is
+    fetched again: today on every report poll, yesterday for the first polls
+    after midnight, and any other day of this month missing, e.g. after a
+    fresh install, with one month report.
+    """
+
+    def __init__(self, devicesn: str) -> None:
+        self.devicesn = devicesn
+        self.days: dict[str, dict[str, float]] = {}  # ISO date -> variable -> total
+        self.final: set[str] = set()
+        self._store: Store | None = None
+        self._data_to_save = None  # every history of the store, set with _store
+
+    def pending(self, today: date) -> list[date]:
+        """Past days still to be fetched, this month's and yesterday."""
+        yesterday = today - timedelta(days=1)
+        days = [today.replace(day=number) for number in range(1, today.day)]
+        if yesterday.month != today.month:
+            days.append(yesterday)
+        return [day for day in days if day.isoformat() not in self.final]
+
+    def record_month(self, year: int, month: int, result: list, fetched: datetime) -> None:
+        """Keep the days up to today of a month report, one value per day."""
+        recorded = set()
+        for item in result:
+            for index, value in enumerate(item["values"]):
+                day = date(year, month, index + 1)
+                if day > fetched.date():
+                    break
+                self._record(day, item["variable"], value)
+                recorded.add(day)
+        for day in recorded:
+            self._settle(day, fetched)
+        self._save()
+
+    def record_day(self, day: date, hourly: dict[str, list], fetched: datetime) -> None:
+        """Keep the totals of a day report, which has one value per hour."""
+        for variable, values in hourly.items():
+            self._record(day, variable, sum(value for value in values if value is not None))
+        self._settle(day, fetched)
+        self._save()
+
+    def _record(self, day: date, variable: str, value) -> None:
+        if value is None:
+            _LOGGER.debug("Report %s for %s has no value for SN: %s", variable, day, self.devicesn)
+            value = 0
+        self.days.setdefault(day.isoformat(), {})[variable] = round(value, 3)
+
+    def _settle(self, day: date, fetched: datetime) -> None:
+        if fetched >= dt_util.start_of_local_day(day + timedelta(days=1)) + SETTLE:
+            self.final.add(day.isoformat())
+
+    def day(self, day: date) -> dict[str, float]:
+        return self.days.get(day.isoformat(), {})
+
+    def month_to_date(self, today: date) -> dict[str, float]:
+        """Totals of this month up to and including today."""
+        totals: dict[str, float] = {}
+        for number in range(1, today.day + 1):
+            for variable, value in self.day(today.replace(day=number)).items():
+                totals[variable] = totals.get(variable, 0.0) + value
+        return {variable: round(total, 3) for variable, total in totals.items()}
+
+    def between(self, start: date, end: date) -> dict[str, dict[str, float]]:
+        """The kept days from start to end, both included."""
+        return {
+            iso: dict(values)
+            for iso, values in sorted(self.days.items())
+            if start.isoformat() <= iso <= end.isoformat()
+        }
+
+    def _save(self) -> None:
+        oldest = (dt_util.now().date() - timedelta(days=KEEP_DAYS)).isoformat()
+        for iso in [iso for iso in self.days if iso < oldest]:
+            del self.days[iso]
+            self.final.discard(iso)
+        if self._store is not None:
+            self._store.async_delay_save(self._data_to_save, SAVE_DELAY)
+
+    def as_dict(self) -> dict:
+        return {"days": self.days, "final": sorted(self.final)}
+
+
+def report_histories(hass) -> dict[str, ReportHistory]:
+    return hass.data.get(DOMAIN, {}).get("reports", {})
+
+
+def _data_to_save(histories: dict) -> dict:
+    return {devicesn: history.as_dict() for devicesn, history in histories.items()}
+
+
+async def async_load_report_history(hass, history: ReportHistory) -> None:
+    """Restore the days kept before a restart and persist them from now on."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    histories = domain_data.setdefault("reports", {})
+    histories[history.devicesn] = history
+    load = domain_data.get("reports_load")
+    if load is None:
+        # one shared store, inverters set up at the same time wait on the same load
+        domain_data["reports_store"] = Store(hass, STORAGE_VERSION, STORAGE_KEY)
+        load = hass.async_create_task(domain_data["reports_store"].async_load())
+        domain_data["reports_load"] = load
+    saved = (await load or {}).get(history.devicesn)
+    if history._store is not None:
+        return
+    if saved:
+        history.days = saved.get("days", {})
+        history.final = set(saved.get("final", []))
+        _LOGGER.debug("Restored %s days of reports for SN: %s", len(history.days), history.devicesn)
+    history._data_to_save = partial(_data_to_save, histories)
+    history._store = domain_data["reports_store"]
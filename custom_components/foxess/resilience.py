@@ -0,0 +1,157 @@
+"""Backoff and circuit breaking for FoxESS cloud failures."""
+from __future__ import annotations
+
+import logging
+import random
+import time
+
+from .const import DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+BACKOFF_MAX = 30 * 60  # seconds, longest retry delay
+RATE_LIMIT_ERRNOS = frozenset({40400})  # too frequent, or the daily budget is spent
+RATE_LIMIT_BACKOFF = 15 * 60  # seconds, shortest retry delay after a rate limit reply
+RATE_LIMIT_MEMORY = 60 * 60  # seconds a rate limit reply keeps the retries long
+
+FAILURE_THRESHOLD = 3  # consecutive failures that open the circuit
+OPEN_BASE = 60  # seconds the circuit first stays open, doubled each time it reopens
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half-open"
+_SEVERITY = {STATE_CLOSED: 0, STATE_HALF_OPEN: 1, STATE_OPEN: 2}
+
+
+class CircuitOpenError(Exception):
+    """The call was not made, the endpoint's circuit is open."""
+
+
+def backoff_delay(base: float, failures: int, rate_limited: bool = False) -> float:
+    """Exponential backoff with equal jitter, half the delay fixed and half random."""
+    if rate_limited:
+        base = max(base, RATE_LIMIT_BACKOFF)
+    delay = min(base * 2 ** max(failures - 1, 0), BACKOFF_MAX)
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+class CircuitBreaker:
+    """Stop calling an endpoint after repeated failures, then let one probe through."""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.state = STATE_CLOSED
+        self.failures = 0  # consecutive
+        self.opened = 0  # times opened since the last success
+        self.open_until = 0.0
+        self.last_errno = None
+        self.rate_limited_at = None
+        self.total_failures = 0
+        self.rejected = 0
+
+    def allow(self, now: float | None = None) -> bool:
+        """True if a call may be made, an open circuit half-opens for a single probe."""
+        if self.state == STATE_CLOSED:
+            return True
+        now = time.monotonic() if now is None else now
+        if self.state == STATE_OPEN and now >= self.open_until:
+            self.state = STATE_HALF_OPEN
+            _LOGGER.debug("Circuit %s half-open, probing", self.name)
+            return True
+        self.rejected += 1
+        return False
+
+    def abandon_probe(self) -> None:
+        """The probe ended without an answer, e.g. cancelled, the next call probes again."""
+        if self.state == STATE_HALF_OPEN:
+            # open_until has passed, so allow() half-opens for the next call
+            self.state = STATE_OPEN
+
+    def record_success(self) -> None:
+        if self.state != STATE_CLOSED:
+            _LOGGER.debug("Circuit %s closed", self.name)
+        self.state = STATE_CLOSED
+        self.failures = 0
+        self.opened = 0
+        self.last_errno = None
+
+    def record_failure(self, errno=None, now: float | None = None) -> None:
+        now = time.monotonic() if now is None else now
+        self.failures += 1
+        self.total_failures += 1
+        self.last_errno = errno
+        rate_limited = errno in RATE_LIMIT_ERRNOS
+        if rate_limited:
+            self.rate_limited_at = now
+        if rate_limited or self.state == STATE_HALF_OPEN or self.failures >= FAILURE_THRESHOLD:
+            self.opened += 1
+            delay = backoff_delay(OPEN_BASE, self.opened, rate_limited)
+            self.state = STATE_OPEN
+            self.open_until = now + delay
+            _LOGGER.warning(
+                "FoxESS Cloud %s failing (errno %s), pausing calls for %d seconds",
+                self.name,
+                errno,
+                delay,
+            )
+
+    def rate_limited(self, now: float | None = None) -> bool:
+        now = time.monotonic() if now is None else now
+        return self.rate_limited_at is not None and now - self.rate_limited_at < RATE_LIMIT_MEMORY
+
+    def as_dict(self) -> dict:
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "last_errno": self.last_errno,
+            "total_failures": self.total_failures,
+            "rejected": self.rejected,
+        }
+
+
+class CloudHealth:
+    """The circuit breakers of one apiKey, one per endpoint path and inverter.
+
+    Breakers scoped to an inverter keep one misconfigured or faulty device
+    from pausing the calls of the others sharing the apiKey.
+    """
+
+    def __init__(self) -> None:
+        self.breakers: dict[tuple, CircuitBreaker] = {}
+
+    def breaker(self, path: str, scope: str | None = None) -> CircuitBreaker:
+        breaker = self.breakers.get((path, scope))
+        if breaker is None:
+            name = path if scope is None else f"{path} {scope}"
+            breaker = self.breakers[(path, scope)] = CircuitBreaker(name)
+        return breaker
+
+    def rate_limited(self) -> bool:
+        """True if the cloud answered too frequent recently."""
+        now = time.monotonic()
+        return any(breaker.rate_limited(now) for breaker in self.breakers.values())
+
+    def as_dict(self, scope: str | None = None) -> dict:
+        """Summary for an inverter's allData health bucket, only changes when a breaker does."""
+        breakers = [
+            breaker for (_, key), breaker in self.breakers.items() if key in (scope, None)
+        ]
+        return {
+            "state": max(
+                (breaker.state for breaker in breakers),
+                key=_SEVERITY.get,
+                default=STATE_CLOSED,
+            ),
+            "failures": sum(breaker.failures for breaker in breakers),
+            "rate_limited": self.rate_limited(),
+            "endpoints": {breaker.name: breaker.as_dict() for breaker in breakers},
+        }
+
+
+def get_health(hass, apiKey: str) -> CloudHealth:
+    """Return the shared breakers for an apiKey."""
+    healths = hass.data.setdefault(DOMAIN, {}).setdefault("health", {})
+    health = healths.get(apiKey)
+    if health is None:
+        health = healths[apiKey] = CloudHealth()
+    return health
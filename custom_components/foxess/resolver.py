@@ -0,0 +1,161 @@
+"""DNS cache for the FoxESS cloud host, serving stale answers when DNS fails."""
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass
+import logging
+import socket
+import time
+
+from aiohttp.abc import AbstractResolver
+from aiohttp.resolver import ThreadedResolver
+
+try:
+    import aiodns
+except ImportError:  # Home Assistant ships aiodns, without it the TTL is not known
+    aiodns = None
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_TTL = 300  # seconds, used when the record TTL is not known
+MIN_TTL = 30
+MAX_TTL = 3600
+MAX_STALE = 24 * 60 * 60  # seconds an expired answer may be served while DNS fails
+PREFETCH_AT = 0.8  # share of the TTL after which the answer is resolved again
+PREFETCH_IDLE = 15 * 60  # seconds without a lookup after which prefetching stops
+
+
+@dataclass
+class _Entry:
+    addresses: list
+    resolved: float
+    expires: float
+    used: float
+
+
+class CachingResolver(AbstractResolver):
+    """Keep answers for their TTL, refresh them before they expire and serve them stale on failure.
+
+    Lookups by the connector are answered from the cache, a failed refresh
+    leaves the last good answer in place, so a DNS blip doesn't cost a poll.
+    """
+
+    def __init__(self) -> None:
+        self._resolver = ThreadedResolver()
+        self._dns = None
+        self._cache: dict[tuple, _Entry] = {}
+        self._pending: dict[tuple, asyncio.Task] = {}
+        self._timers: dict[tuple, asyncio.TimerHandle] = {}
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.failures = 0
+
+    async def resolve(self, host: str, port: int = 0, family: int = socket.AF_INET) -> list:
+        key = (host, port, family)
+        now = time.monotonic()
+        entry = self._cache.get(key)
+        if entry is not None:
+            entry.used = now
+            if now < entry.expires:
+                self.hits += 1
+                return entry.addresses
+            if now - entry.expires < MAX_STALE:
+                # serve the expired answer now, refresh it in the background
+                self.stale += 1
+                self._refresh_later(key, 0)
+                return entry.addresses
+        self.misses += 1
+        return await self._refresh(key)
+
+    async def _refresh(self, key: tuple) -> list:
+        """Resolve, sharing one lookup between concurrent callers."""
+        task = self._pending.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._lookup(key))
+            self._pending[key] = task
+            task.add_done_callback(lambda _: self._pending.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def _lookup(self, key: tuple) -> list:
+        host, port, family = key
+        try:
+            addresses, ttl = await asyncio.gather(
+                self._resolver.resolve(host, port, family), self._ttl(host, family)
+            )
+        except OSError as err:
+            self.failures += 1
+            entry = self._cache.get(key)
+            if entry is not None and time.monotonic() - entry.expires < MAX_STALE:
+                _LOGGER.debug("DNS lookup for %s failed (%s), serving the last answer", host, err)
+                self._refresh_later(key, MIN_TTL)
+                return entry.addresses
+            raise
+        now = time.monotonic()
+        used = self._cache[key].used if key in self._cache else now
+        self._cache[key] = _Entry(addresses, now, now + ttl, used)
+        _LOGGER.debug("DNS %s resolved, ttl %s: %s", host, ttl, [a["host"] for a in addresses])
+        if now - used < PREFETCH_IDLE:
+            self._refresh_later(key, ttl * PREFETCH_AT)
+        return addresses
+
+    async def _ttl(self, host: str, family: int) -> int:
+        """TTL of the A (or AAAA) records, DEFAULT_TTL when aiodns is not available."""
+        if aiodns is None:
+            return DEFAULT_TTL
+        if self._dns is None:
+            self._dns = aiodns.DNSResolver()
+        try:
+            records = await self._dns.query(host, "AAAA" if family == socket.AF_INET6 else "A")
+            ttl = min(record.ttl for record in records)
+        except (aiodns.error.DNSError, AttributeError, ValueError) as err:
+            _LOGGER.debug("DNS TTL for %s not known: %s", host, err)
+            return DEFAULT_TTL
+        return min(max(ttl, MIN_TTL), MAX_TTL)
+
+    def _refresh_later(self, key: tuple, delay: float) -> None:
+        if key in self._pending:
+            return
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        loop = asyncio.get_running_loop()
+        self._timers[key] = loop.call_later(delay, self._start_refresh, key)
+
+    def _start_refresh(self, key: tuple) -> None:
+        self._timers.pop(key, None)
+        if key in self._pending:
+            return
+        task = asyncio.ensure_future(self._lookup(key))
+        self._pending[key] = task
+        # a failed background refresh has already been logged and rescheduled
+        task.add_done_callback(lambda done: done.cancelled() or done.exception())
+        task.add_done_callback(lambda _: self._pending.pop(key, None))
+
+    async def async_prefetch(self, host: str, port: int = 443) -> None:
+        """Resolve a host ahead of the first request."""
+        try:
+            await self.resolve(host, port, socket.AF_INET)
+        except OSError as err:
+            _LOGGER.debug("DNS prefetch for %s failed: %s", host, err)
+
+    def as_dict(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale": self.stale,
+            "failures": self.failures,
+        }
+
+    async def close(self) -> None:
+        for timer in self._timers.values():
+            timer.cancel()
+        self._timers.clear()
+        for task in list(self._pending.values()):
+            task.cancel()
+        await self._resolver.close()
+        if self._dns is not None and hasattr(self._dns, "close"):
+            # close() is a coroutine in newer aiodns releases
+            result = self._dns.close()
+            if asyncio.iscoroutine(result):
+                await result
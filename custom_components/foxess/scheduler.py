@@ -0,0 +1,116 @@
+"""Time ordered poll scheduler for the FoxESS OpenAPI endpoints."""
+from __future__ import annotations
+
+from dataclasses import dataclass, replace
+import heapq
+import logging
+import time
+
+from .resilience import backoff_delay
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@dataclass
+class EndpointJob:
+    """One endpoint polled on its own interval."""
+
+    name: str
+    interval: float  # seconds between successful polls
+    priority: int  # lower runs first when several jobs are due together
+    retry: float  # seconds before the first retry of a failed poll, doubled for each failure
+    stretchable: bool = False  # interval grows when the daily API budget runs short
+    due: float = 0.0
+    runs: int = 0
+    failures: int = 0
+    _token: int = 0
+
+
+class PollScheduler:
+    """Priority queue of endpoint jobs ordered by due time, then priority."""
+
+    def __init__(self, jobs) -> None:
+        self.jobs: dict[str, EndpointJob] = {}
+        self._queue: list = []
+        # popped jobs and their token, each must be re-queued before the poll ends
+        self._in_flight: dict[str, int] = {}
+        # interval multiplier for stretchable jobs, set from the API quota
+        self.stretch = 1.0
+        now = time.monotonic()
+        for job in jobs:
+            # every endpoint is due at startup
+            self.jobs[job.name] = replace(job)
+            self._push(self.jobs[job.name], now)
+
+    def _push(self, job: EndpointJob, due: float) -> None:
+        # re-queueing a job invalidates its older queue entry
+        job._token += 1
+        job.due = due
+        heapq.heappush(self._queue, (due, job.priority, job._token, job.name))
+
+    def pop_due(self, now: float) -> dict[str, EndpointJob]:
+        """Remove and return the jobs due at now, in priority order."""
+        due = []
+        while self._queue and self._queue[0][0] <= now:
+            _, _, token, name = heapq.heappop(self._queue)
+            job = self.jobs[name]
+            if token == job._token:
+                due.append(job)
+        due.sort(key=lambda job: job.priority)
+        self._in_flight.update((job.name, job._token) for job in due)
+        return {job.name: job for job in due}
+
+    def retry_unfinished(self, now: float) -> list[str]:
+        """Retry the popped jobs nothing re-queued, e.g. when their poll raised."""
+        lost = [
+            self.jobs[name]
+            for name, token in self._in_flight.items()
+            if self.jobs[name]._token == token
+        ]
+        self._in_flight.clear()
+        for job in lost:
+            self.retry(job, now)
+        return [job.name for job in lost]
+
+    def complete(self, job: EndpointJob, now: float) -> None:
+        """The poll succeeded, run again after the job interval."""
+        job.runs += 1
+        job.failures = 0
+        self._push(job, now + self.interval(job))
+
+    def interval(self, job: EndpointJob) -> float:
+        """Seconds between successful polls, after any quota stretch."""
+        if job.stretchable:
+            return job.interval * self.stretch
+        return job.interval
+
+    def retry(
+        self, job: EndpointJob, now: float, delay: float | None = None, rate_limited: bool = False
+    ) -> float:
+        """The poll failed, back off from delay or the job retry policy, returns the wait."""
+        job.failures += 1
+        delay = backoff_delay(job.retry if delay is None else delay, job.failures, rate_limited)
+        self._push(job, now + delay)
+        return delay
+
+    def defer(self, job: EndpointJob, now: float, delay: float) -> None:
+        """Move a job without counting a failure, e.g. while the inverter is off-line."""
+        self._push(job, now + delay)
+
+    def next_due(self) -> float:
+        """Monotonic time the next job is due."""
+        return min(job.due for job in self.jobs.values())
+
+    def as_dict(self) -> dict:
+        """Queue state for debugging, seconds until each job is due."""
+        now = time.monotonic()
+        return {
+            job.name: {
+                "due_in": round(job.due - now, 1),
+                "interval": self.interval(job),
+                "priority": job.priority,
+                "runs": job.runs,
+                "failures": job.failures,
+            }
+            for job in sorted(self.jobs.values(), key=lambda job: (job.due, job.priority))
+        }
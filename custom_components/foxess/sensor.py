@@ -1,31 +1,32 @@
 from __future__ import annotations
 
-from collections import namedtuple
+from collections.abc import Callable
+from dataclasses import dataclass
+from functools import partial
+from typing import Any
 from datetime import timedelta
 from datetime import datetime
-from dateutil import parser
 import time
 import logging
 import json
-import hashlib
 import asyncio
 import voluptuous as vol
 
-from homeassistant.components.rest.data import RestData
 from homeassistant.components.sensor import (
     SensorDeviceClass,
     SensorStateClass,
     PLATFORM_SCHEMA,
     SensorEntity,
+    SensorEntityDescription,
 )
 
 
 from homeassistant.const import (
-    ATTR_DATE,
-    ATTR_TIME,
     CONF_PASSWORD,
     CONF_USERNAME,
+    CONF_DEVICE_CLASS,
     CONF_NAME,
+    CONF_UNIT_OF_MEASUREMENT,
     UnitOfPower,
     UnitOfTemperature,
     UnitOfEnergy,
@@ -33,31 +34,47 @@ from homeassistant.const import (
     UnitOfElectricCurrent,
     UnitOfFrequency,
     UnitOfReactivePower,
+    UnitOfTime,
     PERCENTAGE,
+    SUN_EVENT_SUNRISE,
+    EntityCategory,
 )
-from homeassistant.helpers.update_coordinator import (
-    CoordinatorEntity,
-    DataUpdateCoordinator,
-)
-from homeassistant.util.ssl import SSLCipherList
+from homeassistant.core import callback
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
 from homeassistant.helpers.icon import icon_for_battery_level
+from homeassistant.helpers.sun import get_astral_event_next, is_up
+from homeassistant.util import dt as dt_util
 import homeassistant.helpers.config_validation as cv
 
+from .backfill import StatisticsBackfill
+from .batch import get_batcher
+from .client import METHOD_GET, METHOD_POST, get_client
+from .const import DOMAIN
+from .coordinator import FoxESSCoordinator
+from .derived import CONF_STATE_CLASS, DERIVED_SCHEMA, DerivedStage, derived_key
+from .integrator import EnergyIntegrator
+from .metrics import MIN_TIMEOUT
+from .inverter import FoxESSInverter
+from .options import InverterOptions
+from .quota import async_load_quota, get_quota
+from .ratelimit import get_limiter
+from .reports import REPORT_VARIABLES, ReportHistory, async_load_report_history
+from .resilience import get_health
+from .scheduler import EndpointJob, PollScheduler
+from .services import async_register_services
+from .snapshot import async_load_snapshot, save_snapshot, saved_reports_until
+from .timestamp import cloud_timestamp
+from .variables import VariableSet, async_load_variable_set, requested_variables
+
 _LOGGER = logging.getLogger(__name__)
-_ENDPOINT_OA_DOMAIN = "https://www.foxesscloud.com"
-_ENDPOINT_OA_BATTERY_SETTINGS = "/op/v0/device/battery/soc/get?sn="
+_ENDPOINT_OA_BATTERY_SETTINGS = "/op/v0/device/battery/soc/get"
 _ENDPOINT_OA_REPORT = "/op/v0/device/report/query"
 _ENDPOINT_OA_DEVICE_DETAIL = "/op/v0/device/detail"
 _ENDPOINT_OA_DEVICE_DETAIL_V1 = "/op/v1/device/detail"
 _ENDPOINT_OA_DEVICE_VARIABLES = "/op/v0/device/real/query"
 _ENDPOINT_OA_DEVICE_VARIABLES_V1 = "/op/v1/device/real/query"
-_ENDPOINT_OA_DAILY_GENERATION = "/op/v0/device/generation?sn="
-
-METHOD_POST = "POST"
-METHOD_GET = "GET"
-DEFAULT_ENCODING = "UTF-8"
-USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
-DEFAULT_TIMEOUT = 75  # increase the size of inherited timeout, the API is a bit slow
+_ENDPOINT_OA_DAILY_GENERATION = "/op/v0/device/generation"
+_ENDPOINT_OA_DEVICE_LIST = "/op/v0/device/list"
 
 ATTR_DEVICE_SN = "deviceSN"
 ATTR_PLANTNAME = "plantName"
@@ -68,6 +85,8 @@ ATTR_MANAGER = "managerVersion"
 ATTR_SLAVE = "slaveVersion"
 ATTR_BATTERYLIST = "batteryList"
 ATTR_LASTCLOUDSYNC = "lastCloudSync"
+ATTR_RESTORED = "restoredSnapshot"
+ATTR_MONTH_TO_DATE = "monthToDate"
 
 BATTERY_LEVELS = {"High": 80, "Medium": 50, "Low": 25, "Empty": 10}
 
@@ -80,15 +99,133 @@ CONF_XTZONE = "xtZone"
 CONF_GET_VARIABLES = "Restrict"
 CONF_V1_API = "Use_V1_Api"
 CONF_EVO = "Evo"
-RETRY_NEXT_SLOT = -1
-RETRY_IN_5_MINS = 25
+CONF_API_RATE = "apiRate"
+CONF_API_BURST = "apiBurst"
+CONF_BATCH = "Batch_Realtime"
+CONF_API_BUDGET = "apiBudget"
+CONF_NIGHT_MODE = "nightMode"
+CONF_AUTO_VARIABLES = "autoVariables"
+CONF_HEDGE = "hedgeRequests"
+CONF_INTEGRATE = "integrateEnergy"
+CONF_DERIVED = "derived"
 DNS_ERROR = 101
+TIMEOUT_ERROR = 102  # the call stalled, it is retried the next minute
+DEADLINE_PASSED = 103  # no time left this poll cycle, the rest is fetched on the next tick
+
+RESTRICTED_VARIABLES = [
+    "ambientTemperation",
+    "batChargePower",
+    "batCurrent",
+    "batCurrent_1",
+    "batCurrent_2",
+    "batDischargePower",
+    "batTemperature",
+    "batTemperature_1",
+    "batTemperature_2",
+    "batVolt",
+    "batVolt_1",
+    "batVolt_2",
+    "boostTemperation",
+    "chargeTemperature",
+    "dspTemperature",
+    "epsCurrentR",
+    "epsCurrentS",
+    "epsCurrentT",
+    "epsPower",
+    "epsPowerR",
+    "epsPowerS",
+    "epsPowerT",
+    "epsVoltR",
+    "epsVoltS",
+    "epsVoltT",
+    "feedinPower",
+    "generationPower",
+    "gridConsumptionPower",
+    "input",
+    "invBatCurrent",
+    "invBatPower",
+    "invBatVolt",
+    "invTemperation",
+    "loadsPower",
+    "loadsPowerR",
+    "loadsPowerS",
+    "loadsPowerT",
+    "meterPower",
+    "meterPower2",
+    "meterPowerR",
+    "meterPowerS",
+    "meterPowerT",
+    "PowerFactor",
+    "pv1Current",
+    "pv1Power",
+    "pv1Volt",
+    "pv2Current",
+    "pv2Power",
+    "pv2Volt",
+    "pv3Current",
+    "pv3Power",
+    "pv3Volt",
+    "pv4Current",
+    "pv4Power",
+    "pv4Volt",
+    "pvPower",
+    "RCurrent",
+    "ReactivePower",
+    "RFreq",
+    "RPower",
+    "RVolt",
+    "SCurrent",
+    "SFreq",
+    "SoC",
+    "SPower",
+    "SVolt",
+    "TCurrent",
+    "TFreq",
+    "TPower",
+    "TVolt",
+    "SoC_1",
+    "Soc_2",
+    "ResidualEnergy",
+    "energyThroughput",
+    "runningState",
+    "currentFaultCount",
+]
+
+# single battery systems report these suffixed, use the single battery entity
+# SoC_1 is left as is for the moment, a future release might align it to use SoC
+VARIABLE_ALIASES = {
+    "batTemperature_1": "batTemperature",
+    "invBatPower_1": "invBatPower",
+}
+# variables read by parseRaw itself, always requested in auto variable mode
+INTERNAL_VARIABLES = {"runningState"}
 
 DEFAULT_NAME = "FoxESS"
-DEFAULT_VERIFY_SSL = False  # True
 
 SCAN_MINUTES = 1  # number of minutes betwen API requests
 SCAN_INTERVAL = timedelta(minutes=SCAN_MINUTES)
+MIN_TICK = 10  # seconds, shortest wait between coordinator updates
+MAX_TICK = 15 * 60  # seconds, longest wait between coordinator updates
+
+JOB_DETAIL = "detail"
+JOB_BATTERY = "battery"
+JOB_REALTIME = "realtime"
+JOB_REPORT = "report"
+JOB_GENERATION = "generation"
+RETRY_NEXT_MINUTE = 60
+RETRY_IN_5_MINS = 5 * 60
+RETRY_OFFLINE = RETRY_IN_5_MINS
+SUNRISE_MARGIN = 60  # seconds after sunrise the first realtime poll of the day runs
+CYCLE_DEADLINE = 60  # seconds a poll cycle may take, later report calls are cut short or put off
+
+# endpoint poll cadence, every job is also run at startup
+POLL_JOBS = (
+    EndpointJob(JOB_DETAIL, interval=15 * 60, priority=0, retry=RETRY_NEXT_MINUTE),
+    EndpointJob(JOB_BATTERY, interval=60 * 60, priority=1, retry=RETRY_IN_5_MINS),
+    EndpointJob(JOB_REALTIME, interval=5 * 60, priority=2, retry=RETRY_IN_5_MINS, stretchable=True),
+    EndpointJob(JOB_REPORT, interval=15 * 60, priority=3, retry=RETRY_IN_5_MINS, stretchable=True),
+    EndpointJob(JOB_GENERATION, interval=60 * 60, priority=4, retry=RETRY_IN_5_MINS),
+)
 
 PLATFORM_SCHEMA = PLATFORM_SCHEMA.extend(
     {
@@ -103,16 +240,22 @@ PLATFORM_SCHEMA = PLATFORM_SCHEMA.extend(
         vol.Optional(CONF_GET_VARIABLES): cv.boolean,
         vol.Optional(CONF_V1_API): cv.boolean,
         vol.Optional(CONF_EVO): cv.boolean,
+        vol.Optional(CONF_BATCH): cv.boolean,
+        vol.Optional(CONF_API_RATE): vol.All(
+            vol.Coerce(float), vol.Range(min=0.01, max=10)
+        ),
+        vol.Optional(CONF_API_BURST): vol.All(vol.Coerce(int), vol.Range(min=1, max=10)),
+        vol.Optional(CONF_API_BUDGET): vol.All(vol.Coerce(int), vol.Range(min=1)),
+        vol.Optional(CONF_NIGHT_MODE): cv.boolean,
+        vol.Optional(CONF_AUTO_VARIABLES): cv.boolean,
+        vol.Optional(CONF_HEDGE): cv.boolean,
+        vol.Optional(CONF_INTEGRATE): cv.boolean,
+        vol.Optional(CONF_DERIVED): vol.All(cv.ensure_list, [DERIVED_SCHEMA]),
     }
 )
 
-token = None
-
-
 async def async_setup_platform(hass, config, async_add_entities, discovery_info=None):
     """Set up the FoxESS sensor."""
-    global LastHour, timeslice, last_api, RestrictGetVar, xtzone, V1_Api, Evo
-    Evo = False
     name = config.get(CONF_NAME)
     deviceID = config.get(CONF_DEVICEID)
     devicesn = config.get(CONF_DEVICESN)
@@ -122,6 +265,8 @@ async def async_setup_platform(hass, config, async_add_entities, discovery_info=
     RestrictGetVar = config.get(CONF_GET_VARIABLES)
     V1_Api = config.get(CONF_V1_API)
     Evo = config.get(CONF_EVO)
+    BatchRealtime = config.get(CONF_BATCH)
+    night_mode = config.get(CONF_NIGHT_MODE) is True
     _LOGGER.debug("API Key: %s", apiKey)
     _LOGGER.debug("Device SN: %s", devicesn)
     _LOGGER.debug("Device ID: %s", deviceID)
@@ -131,11 +276,35 @@ async def async_setup_platform(hass, config, async_add_entities, discovery_info=
     _LOGGER.debug("Extended PV: %s", ExtPV)
     _LOGGER.debug("v1 Api Calls: %s", V1_Api)
     _LOGGER.debug("EVO: %s", Evo)
+    _LOGGER.debug("Night mode: %s", night_mode)
+    serials = hass.data.setdefault(DOMAIN, {}).setdefault("serials", set())
+    if devicesn in serials:
+        _LOGGER.error("Inverter %s is already set up by another foxess platform entry", devicesn)
+        return False
+    serials.add(devicesn)
+    limiter = get_limiter(hass, apiKey, config.get(CONF_API_RATE), config.get(CONF_API_BURST))
+    _LOGGER.debug("API rate limit: %s req/s, burst %s", limiter.rate, limiter.burst)
+    quota = get_quota(hass, apiKey, config.get(CONF_API_BUDGET), devicesn)
+    await async_load_quota(hass, quota)
+    _LOGGER.debug("API daily budget: %s, used today: %s", quota.budget, quota.used)
+    history = ReportHistory(devicesn)
+    await async_load_report_history(hass, history)
+    if config.get(CONF_HEDGE):
+        # slow GET calls are sent a second time, each hedge costs an extra API call
+        get_client(hass).hedge_keys.add(apiKey)
+        _LOGGER.debug("Hedged GET requests enabled")
     if V1_Api is not False:
         V1_Api = True
         _LOGGER.debug("v1 Api Calls Enabled")
     else:
         _LOGGER.warning("v1 Api Calls Disabled, using v0")
+    if BatchRealtime is not True:
+        BatchRealtime = False
+    elif not V1_Api:
+        BatchRealtime = False
+        _LOGGER.warning("Batched realtime needs the v1 Api, fetching inverters separately")
+    else:
+        _LOGGER.debug("Batched realtime enabled for SN: %s", devicesn)
     if ExtPV is not True:
         ExtPV = False
         _LOGGER.debug("Extended PV Disabled")
@@ -146,136 +315,302 @@ async def async_setup_platform(hass, config, async_add_entities, discovery_info=
         _LOGGER.debug("Get Variables is full variable mode")
     else:
         _LOGGER.warning("Get Variables is in restricted mode")
-    timeslice = {}
-    timeslice[devicesn] = RETRY_NEXT_SLOT
-    last_api = 0
-    LastHour = 0
+    # each platform entry has its own options, however many inverters are set up
+    options = InverterOptions(
+        v1_api=V1_Api,
+        restrict=RestrictGetVar,
+        xtzone=xtzone is True,
+        evo=Evo is True,
+        batch=BatchRealtime,
+    )
+    derived = DerivedStage(config.get(CONF_DERIVED, []))
+    derived_sensors = tuple(_derived_sensor(metric) for metric in derived.configs)
+    if config.get(CONF_AUTO_VARIABLES):
+        descriptions = SENSORS + SENSORS_EXTENDED_PV if ExtPV else SENSORS
+        consumed = INTERNAL_VARIABLES | {
+            key
+            for description in descriptions
+            for bucket, key in description.sources or ()
+            if bucket == "raw"
+        }
+        consumed |= {key for bucket, key in derived.inputs if bucket == "raw"}
+        variables = VariableSet(devicesn, consumed, VARIABLE_ALIASES)
+        await async_load_variable_set(hass, variables)
+        _LOGGER.debug("Get Variables is in auto mode, learned: %s", variables.names)
+    else:
+        variables = None
+    batcher = get_batcher(hass, apiKey, partial(fetchRaw, hass)) if BatchRealtime else None
+    inverter = FoxESSInverter(devicesn, apiKey, options, history, variables, batcher)
+    if batcher is not None:
+        batcher.register(inverter)
+    scheduler = PollScheduler(POLL_JOBS)
+    health = get_health(hass, apiKey)
     allData = {
         "report": {},
         "reportDailyGeneration": {},
         "raw": {},
         "battery": {},
         "addressbook": {},
+        "quota": {},
+        "health": {},
+        "metrics": {},
         "online": False,
+        "night": False,
+        "restored": None,
+        "reportMonth": {},
+        "estimate": {},
+        "derived": {},
     }
     allData["addressbook"]["hasBattery"] = False  # assume no battery is fitted for now
     allData["addressbook"]["status"] = "3"  # assume inverter is off-line for now
+    restored = await async_load_snapshot(hass, devicesn, allData)
+    if restored is not None:
+        # values from before the restart, shown as such until the cloud answers
+        allData["restored"] = dt_util.as_local(dt_util.utc_from_timestamp(restored))
+        allData["quota"] = quota.as_dict()
+        allData["health"] = health.as_dict(devicesn)
+
+    # between the 15 minute reports the energy totals run on from the power readings
+    integrator = EnergyIntegrator() if config.get(CONF_INTEGRATE) else None
+    _LOGGER.debug("Integrate energy: %s", integrator is not None)
+
+    # the statistics since the last good report before the restart hold a stale value
+    reports_until = saved_reports_until(hass, devicesn)
+    backfilled = {}
+    for description in SENSORS:
+        if description.state_class != SensorStateClass.TOTAL_INCREASING or description.sources is None:
+            continue
+        # sensors that show a single report variable, maybe run on by its estimate
+        report = [key for bucket, key in description.sources if bucket == "report"]
+        if len(report) == 1:
+            backfilled[report[0]] = f"{deviceID}{description.unique_suffix}"
+    backfill = StatisticsBackfill(
+        hass,
+        apiKey,
+        devicesn,
+        partial(getReportDay, hass, inverter),
+        backfilled,
+        reports_until and dt_util.utc_from_timestamp(reports_until),
+    )
+
+    @callback
+    def diagnostics():
+        """This inverter's part of the get_diagnostics response."""
+        return {
+            "name": name,
+            "online": allData["online"],
+            "night": allData["night"],
+            "restored": allData["restored"] and allData["restored"].isoformat(),
+            "poll_queue": scheduler.as_dict(),
+            "limiter": limiter.as_dict(),
+            "quota": quota.as_dict(),
+            "health": health.as_dict(devicesn),
+            "backfilled_hours": backfill.imported,
+            "suppressed_writes": coordinator.suppressed_writes,
+        }
+
+    hass.data.setdefault(DOMAIN, {}).setdefault("inverters", {})[devicesn] = diagnostics
+    async_register_services(hass)
+
+    @callback
+    def publish():
+        """Push the stages fetched so far to the entities, before the cycle ends."""
+        if coordinator.data is not None:
+            coordinator.async_update_listeners()
+
+    async def dispatch(stages):
+        """Run the cycle's calls side by side, the apiKey rate limiter spaces them out.
+
+        Each result is published as it lands, so the power readings don't
+        wait for the slower reports.
+        """
+        # tasks start in priority order, which is the order they queue on the limiter
+        tasks = [asyncio.ensure_future(stage) for stage in stages]
+        for done, task in enumerate(asyncio.as_completed(tasks), 1):
+            try:
+                await task
+            except Exception:
+                # the other stages carry on, the failed job is retried by retry_unfinished
+                _LOGGER.exception("%s poll stage failed", name)
+            if done < len(tasks):
+                publish()
+
+    async def poll_battery(job, now):
+        # read in battery settings if fitted
+        await getOABatterySettings(hass, allData, inverter)
+        scheduler.complete(job, now)
+
+    async def poll_realtime(job, now, statetest):
+        # main real time data fetch
+        geterror = await getRaw(hass, allData, inverter)
+        if not geterror:
+            scheduler.complete(job, now)
+            if integrator is not None:
+                integrator.sample(allData["raw"], time.time())
+                allData["estimate"] = dict(integrator.estimates)
+            return
+        _LOGGER.debug("get variables failed")
+        if statetest == 2:
+            # The inverter is in alarm, don't check every minute
+            _LOGGER.debug("Inverter in alarm, slowing retry response for SN: %s", devicesn)
+            allData["online"] = False
+            scheduler.retry(job, now, rate_limited=health.rate_limited())
+        elif geterror == DNS_ERROR:
+            delay = scheduler.retry(job, now, RETRY_NEXT_MINUTE)
+            _LOGGER.warning("Fox Cloud - DNS fail, retry in %d seconds", delay)
+        elif geterror == TIMEOUT_ERROR:
+            # a stalled call, the next one most likely gets through
+            delay = scheduler.retry(job, now, RETRY_NEXT_MINUTE)
+            _LOGGER.debug("%s real time call timed out, retry in %d seconds", name, delay)
+        else:
+            # The get variables api call failed, back off from 5 minutes
+            _LOGGER.debug("slowing retry response for SN: %s", devicesn)
+            allData["online"] = False
+            scheduler.retry(job, now, rate_limited=health.rate_limited())
+
+    async def poll_report(job, fetch, now, deadline):
+        geterror = await fetch(hass, allData, inverter, deadline=deadline)
+        if geterror == DEADLINE_PASSED:
+            # out of time this cycle, the calls left run on the next tick
+            _LOGGER.debug("%s poll cycle deadline passed, %s put off", name, job.name)
+            scheduler.defer(job, now, MIN_TICK)
+        elif geterror:
+            _LOGGER.debug("%s False", fetch.__name__)
+            allData["online"] = False
+            if geterror == TIMEOUT_ERROR:
+                # a stalled call, the next one most likely gets through
+                scheduler.retry(job, now, RETRY_NEXT_MINUTE)
+            else:
+                scheduler.retry(job, now, rate_limited=health.rate_limited())
+            if job.name == JOB_REPORT:
+                backfill.report_failed()
+        else:
+            scheduler.complete(job, now)
+            if job.name == JOB_REPORT:
+                # fill any statistics hours missed while HA or the cloud was down
+                backfill.report_ok()
+                if integrator is not None:
+                    integrator.anchor(allData["report"], time.time())
+                    allData["estimate"] = dict(integrator.estimates)
 
     async def async_update_data():
         _LOGGER.debug("Updating data from https://www.foxesscloud.com/")
-        global token, timeslice, LastHour
-        hournow = datetime.now().strftime("%H")  # update hour now
-        _LOGGER.debug("Time now: %s, last %s", hournow, LastHour)
-        tslice = timeslice[devicesn] + 1 # increment current device time slice
-        timeslice[devicesn] = tslice
-        if tslice % 5 == 0:
-            _LOGGER.debug("Main Poll, interval: %s, %s", devicesn, timeslice[devicesn])
-            # try the openapi see if we get a response
+        now = time.monotonic()
+        deadline = now + CYCLE_DEADLINE
+        stretch = quota.stretch()
+        if stretch > 1 and scheduler.stretch == 1:
+            _LOGGER.warning(
+                "%s API calls projected over the daily budget of %s, slowing realtime and report polls",
+                name,
+                quota.budget,
+            )
+        elif stretch == 1 and scheduler.stretch > 1:
+            _LOGGER.debug("%s API poll intervals back to normal", name)
+        scheduler.stretch = stretch
+        due = scheduler.pop_due(now)
+        try:
             geterror = False
-            if tslice % 15 == 0:
-                # get device detail at startup, then every 15 minutes to save api calls
-                if Evo:
-                    # Evo not currently in device detail, use list and fill partial blanks
-                    geterror = await getOADeviceList(hass, allData, devicesn, apiKey)
-                else:
-                    geterror = await getOADeviceDetail(hass, allData, devicesn, apiKey)
-                await asyncio.sleep(1)  # OpenAPI demand
-            if not geterror:
-                if allData["addressbook"]["status"] is not None:
-                    statetest = int(allData["addressbook"]["status"])
-                    if statetest in [3]:
-                        allData["raw"]["runningState"] = "164"  # off-grid
-                else:
-                    statetest = 0
-                _LOGGER.debug(" Statetest %s", statetest)
-                if statetest in [1, 2]:
-                    allData["online"] = True
-                    if tslice == 0:
-                        # read in battery settings if fitted at startup, then every 60 mins
-                        await getOABatterySettings(hass, allData, devicesn, apiKey)
-                        await asyncio.sleep(1)  # OpenAPI demand
-                    # main real time data fetch, followed by reports
-                    geterror = await getRaw(hass, allData, apiKey, devicesn)
+            if due:
+                _LOGGER.debug("Poll %s, due: %s", devicesn, list(due))
+                if JOB_DETAIL in due:
+                    # device detail gives the on-line status, the other jobs depend on it
+                    if options.evo:
+                        # Evo not currently in device detail, use list and fill partial blanks
+                        geterror = await getOADeviceList(hass, allData, inverter)
+                    else:
+                        geterror = await getOADeviceDetail(hass, allData, inverter)
                     if not geterror:
-                        if tslice % 15 == 0:  # do at startup and every 15 minutes
-                            await asyncio.sleep(1)  # OpenAPI demand limit
-                            geterror = await getReport(hass, allData, apiKey, devicesn)
-                            if not geterror:
-                                if tslice == 0:
-                                    # get daily generation at startup, then every 60 minutes
-                                    await asyncio.sleep(1)  # OpenAPI demand
-                                    geterror = await getReportDailyGeneration(hass, allData, apiKey, devicesn)
-                                    if geterror:
-                                        _LOGGER.debug("getReportDailyGeneration False")
-                            else:
-                                _LOGGER.debug("getReport False")
-                            if geterror:
-                                geterror = False
-                                allData["online"] = False
-                                tslice = RETRY_IN_5_MINS  # retry in 5 minutes
+                        scheduler.complete(due.pop(JOB_DETAIL), now)
+                        allData["restored"] = None
+                if not geterror:
+                    # PV only inverters have nothing to report between sunset and sunrise
+                    night = night_mode and not allData["addressbook"]["hasBattery"] and not is_up(hass)
+                    if night != allData["night"]:
+                        _LOGGER.debug("%s night mode %s", name, "started" if night else "ended")
+                        allData["night"] = night
+                    if allData["addressbook"]["status"] is not None:
+                        statetest = int(allData["addressbook"]["status"])
+                        if statetest in [3]:
+                            allData["raw"]["runningState"] = "164"  # off-grid
                     else:
-                        _LOGGER.debug("get variables failed")
-                        if statetest == 2:
-                            # The inverter is in alarm, don't check every minute
-                            _LOGGER.debug(
-                                "Inverter in alarm, slowing retry response for SN: %s",
-                                devicesn,
-                            )
+                        statetest = 0
+                    _LOGGER.debug(" Statetest %s", statetest)
+                    if statetest in [1, 2]:
+                        allData["online"] = not night
+                        stages = []
+                        if JOB_BATTERY in due:
+                            stages.append(poll_battery(due.pop(JOB_BATTERY), now))
+                        if night and JOB_REALTIME in due:
+                            # skip real time polling until just after sunrise
+                            sunrise = get_astral_event_next(hass, SUN_EVENT_SUNRISE)
+                            delay = (sunrise - dt_util.utcnow()).total_seconds() + SUNRISE_MARGIN
+                            scheduler.defer(due.pop(JOB_REALTIME), now, max(delay, MIN_TICK))
+                            _LOGGER.debug("%s real time polls paused until %s", name, sunrise)
+                        if JOB_REALTIME in due:
+                            stages.append(poll_realtime(due.pop(JOB_REALTIME), now, statetest))
+                        for job_name, fetch in (
+                            (JOB_REPORT, getReport),
+                            (JOB_GENERATION, getReportDailyGeneration),
+                        ):
+                            if job_name in due:
+                                stages.append(poll_report(due.pop(job_name), fetch, now, deadline))
+                        await dispatch(stages)
+                    else:
+                        if statetest == 3:
+                            # The inverter is off-line, no raw data polling, don't update entities
+                            # retry device detail call every 5 minutes until it comes back on-line
                             allData["online"] = False
-                            tslice = RETRY_IN_5_MINS  # retry in 5 minutes
-                        else:
-                            if geterror==DNS_ERROR:
-                                _LOGGER.warning("Fox Cloud - DNS fail, retry in 1 minute")
-                                # retry in 1 minute
-                                if tslice != 0:
-                                    tslice = (tslice-1)
-                                else:
-                                    tslice = RETRY_NEXT_SLOT
-                            else:
-                                # The get variables api call failed, leave it 5 minutes
-                                _LOGGER.debug("slowing retry response for SN: %s", devicesn)
-                                allData["online"] = False
-                                tslice = RETRY_IN_5_MINS  # retry in 5 minutes
-                        geterror = False
-                else:
-                    if statetest == 3:
-                        # The inverter is off-line, no raw data polling, don't update entities
-                        # retry device detail call every 5 minutes until it comes back on-line
-                        allData["online"] = False
-                        tslice = RETRY_IN_5_MINS  # retry in 5 minutes
-                        _LOGGER.debug("Inverter off-line for SN: %s", devicesn)
-
-                if not allData["online"]:
-                    if not geterror:
+                            detail = scheduler.jobs[JOB_DETAIL]
+                            if detail.due > now + RETRY_OFFLINE:
+                                scheduler.defer(detail, now, RETRY_OFFLINE)
+                            _LOGGER.debug("Inverter off-line for SN: %s", devicesn)
+                        # nothing else can be fetched until the inverter is on-line
+                        for job in due.values():
+                            scheduler.defer(job, now, RETRY_OFFLINE)
+                        due = {}
+
+                    if not allData["online"] and not night:
                         _LOGGER.warning("%s Inverter is off-line, waiting to retry", name)
-                    else:
-                        _LOGGER.warning("%s Cloud timeout, retry in 1 minute", name)
-            else:
-                _LOGGER.warning("%s Cloud timeout on Device Detail, retry in 1 minute.", name)
-
-            if geterror is not False:
-                allData["online"] = False
-                if tslice != 0:
-                    tslice = tslice-1
-                    # failed to get specific detail so retry slot in 1 minute
                 else:
-                    tslice = RETRY_NEXT_SLOT  # failed to get full data, try again in 1 minute
-
-        # actions here are every minute
-        if tslice >= 59:
-            tslice = RETRY_NEXT_SLOT  # reset timeslot, ready for full data fetch at 0
-        _LOGGER.debug("Auxilliary timeslice %s, %s", devicesn, tslice)
-
-        if LastHour != hournow:
-            LastHour = hournow  # update the hour the last poll was run
+                    # failed to get the device detail, the other due jobs wait for its retry
+                    delay = scheduler.retry(due.pop(JOB_DETAIL), now, rate_limited=health.rate_limited())
+                    _LOGGER.warning("%s Cloud timeout on Device Detail, retry in %d seconds.", name, delay)
+                    allData["online"] = False
+                    for job in due.values():
+                        scheduler.defer(job, now, delay)
+        finally:
+            # a poll that raised leaves its job off the queue, it would never run again
+            lost = scheduler.retry_unfinished(now)
+            if lost:
+                _LOGGER.warning("%s poll of %s failed unexpectedly, retrying", name, lost)
+
+        allData["quota"] = quota.as_dict()
+        allData["health"] = health.as_dict(devicesn)
+        allData["metrics"] = get_client(hass).metrics.summary()
+        if allData["restored"] is None:
+            save_snapshot(
+                hass,
+                devicesn,
+                allData,
+                backfill.reports_until and backfill.reports_until.timestamp(),
+            )
 
-        timeslice[devicesn] = tslice
+        # wake up when the next job is due
+        coordinator.update_interval = timedelta(
+            seconds=min(max(scheduler.next_due() - time.monotonic(), MIN_TICK), MAX_TICK)
+        )
+        _LOGGER.debug(
+            "Poll queue %s, next update in %s: %s",
+            devicesn,
+            coordinator.update_interval,
+            scheduler.as_dict(),
+        )
 
         _LOGGER.debug(allData)
 
         return allData
 
-    coordinator = DataUpdateCoordinator(
+    coordinator = FoxESSCoordinator(
         hass,
         _LOGGER,
         # Name of the data. For logging purposes.
@@ -283,9 +618,18 @@ async def async_setup_platform(hass, config, async_add_entities, discovery_info=
         update_method=async_update_data,
         # Polling interval. Will only be polled if there are subscribers.
         update_interval=SCAN_INTERVAL,
+        derived=derived,
     )
 
-    await coordinator.async_refresh()
+    if allData["restored"] is not None:
+        # add the entities now, HA startup doesn't wait on the cloud
+        coordinator.data = allData
+        coordinator.derive()
+        hass.async_create_background_task(
+            coordinator.async_refresh(), f"{DOMAIN} {devicesn} first refresh"
+        )
+    else:
+        await coordinator.async_refresh()
 
     if not coordinator.last_update_success:
         _LOGGER.error(
@@ -294,500 +638,48 @@ async def async_setup_platform(hass, config, async_add_entities, discovery_info=
         return False
 
     async_add_entities(
-        [
-            FoxESSCurrent(
-                coordinator, name, deviceID, "PV1 Current", "pv1-current", "pv1Current"
-            ),
-            FoxESSPower(
-                coordinator, name, deviceID, "PV1 Power", "pv1-power", "pv1Power"
-            ),
-            FoxESSVolt(coordinator, name, deviceID, "PV1 Volt", "pv1-volt", "pv1Volt"),
-            FoxESSCurrent(
-                coordinator, name, deviceID, "PV2 Current", "pv2-current", "pv2Current"
-            ),
-            FoxESSPower(
-                coordinator, name, deviceID, "PV2 Power", "pv2-power", "pv2Power"
-            ),
-            FoxESSVolt(coordinator, name, deviceID, "PV2 Volt", "pv2-volt", "pv2Volt"),
-            FoxESSCurrent(
-                coordinator, name, deviceID, "PV3 Current", "pv3-current", "pv3Current"
-            ),
-            FoxESSPower(
-                coordinator, name, deviceID, "PV3 Power", "pv3-power", "pv3Power"
-            ),
-            FoxESSVolt(coordinator, name, deviceID, "PV3 Volt", "pv3-volt", "pv3Volt"),
-            FoxESSCurrent(
-                coordinator, name, deviceID, "PV4 Current", "pv4-current", "pv4Current"
-            ),
-            FoxESSPower(
-                coordinator, name, deviceID, "PV4 Power", "pv4-power", "pv4Power"
-            ),
-            FoxESSVolt(coordinator, name, deviceID, "PV4 Volt", "pv4-volt", "pv4Volt"),
-            FoxESSCurrent(
-                coordinator, name, deviceID, "PV5 Current", "pv5-current", "pv5Current"
-            ),
-            FoxESSPower(
-                coordinator, name, deviceID, "PV5 Power", "pv5-power", "pv5Power"
-            ),
-            FoxESSVolt(coordinator, name, deviceID, "PV5 Volt", "pv5-volt", "pv5Volt"),
-            FoxESSCurrent(
-                coordinator, name, deviceID, "PV6 Current", "pv6-current", "pv6Current"
-            ),
-            FoxESSPower(
-                coordinator, name, deviceID, "PV6 Power", "pv6-power", "pv6Power"
-            ),
-            FoxESSVolt(coordinator, name, deviceID, "PV6 Volt", "pv6-volt", "pv6Volt"),
-            FoxESSPower(coordinator, name, deviceID, "PV Power", "pv-power", "pvPower"),
-            FoxESSCurrent(
-                coordinator, name, deviceID, "R Current", "r-current", "RCurrent"
-            ),
-            FoxESSFreq(coordinator, name, deviceID, "R Freq", "r-freq", "RFreq"),
-            FoxESSPower(coordinator, name, deviceID, "R Power", "r-power", "RPower"),
-            FoxESSPowerString(
-                coordinator,
-                name,
-                deviceID,
-                "Meter2 Power",
-                "meter2-power",
-                "meterPower2",
-            ),
-            FoxESSVolt(coordinator, name, deviceID, "R Volt", "r-volt", "RVolt"),
-            FoxESSCurrent(
-                coordinator, name, deviceID, "S Current", "s-current", "SCurrent"
-            ),
-            FoxESSFreq(coordinator, name, deviceID, "S Freq", "s-freq", "SFreq"),
-            FoxESSPower(coordinator, name, deviceID, "S Power", "s-power", "SPower"),
-            FoxESSVolt(coordinator, name, deviceID, "S Volt", "s-volt", "SVolt"),
-            FoxESSCurrent(
-                coordinator, name, deviceID, "T Current", "t-current", "TCurrent"
-            ),
-            FoxESSFreq(coordinator, name, deviceID, "T Freq", "t-freq", "TFreq"),
-            FoxESSPower(coordinator, name, deviceID, "T Power", "t-power", "TPower"),
-            FoxESSVolt(coordinator, name, deviceID, "T Volt", "t-volt", "TVolt"),
-            FoxESSReactivePower(coordinator, name, deviceID),
-            FoxESSPowerFactor(coordinator, name, deviceID),
-            FoxESSTemp(
-                coordinator,
-                name,
-                deviceID,
-                "Bat Temperature",
-                "bat-temperature",
-                "batTemperature",
-            ),
-            FoxESSTemp(
-                coordinator,
-                name,
-                deviceID,
-                "Bat Temperature2",
-                "bat-temperature2",
-                "batTemperature_2",
-            ),
-            FoxESSTemp(
-                coordinator,
-                name,
-                deviceID,
-                "Ambient Temperature",
-                "ambient-temperature",
-                "ambientTemperation",
-            ),
-            FoxESSTemp(
-                coordinator,
-                name,
-                deviceID,
-                "Boost Temperature",
-                "boost-temperature",
-                "boostTemperation",
-            ),
-            FoxESSTemp(
-                coordinator,
-                name,
-                deviceID,
-                "Inv Temperature",
-                "inv-temperature",
-                "invTemperation",
-            ),
-            FoxESSBatSoC(coordinator, name, deviceID, "Bat SoC", "bat-soc", "SoC"),
-            FoxESSBatSoC(coordinator, name, deviceID, "Bat SoC1", "bat-soc1", "SoC_1"),
-            FoxESSBatSoC(coordinator, name, deviceID, "Bat SoC2", "bat-soc2", "SoC_2"),
-            FoxESSBatSoC(coordinator, name, deviceID, "Bat SoH", "bat-soh", "SOH"),
-            FoxESSPower(
-                coordinator,
-                name,
-                deviceID,
-                "Inverter Bat Power",
-                "inv-Bat-Power",
-                "invBatPower",
-            ),
-            FoxESSPower(
-                coordinator,
-                name,
-                deviceID,
-                "Inverter Bat Power2",
-                "inv-Bat-Power2",
-                "invBatPower_2",
-            ),
-            FoxESSBatMinSoC(coordinator, name, deviceID),
-            FoxESSBatMinSoConGrid(coordinator, name, deviceID),
-            FoxESSSolarPower(coordinator, name, deviceID),
-            FoxESSEnergyThroughput(coordinator, name, deviceID),
-            FoxESSEnergySolar(coordinator, name, deviceID),
-            FoxESSInverter(coordinator, name, deviceID),
-            FoxESSPowerString(
-                coordinator,
-                name,
-                deviceID,
-                "Generation Power",
-                "-generation-power",
-                "generationPower",
-            ),
-            FoxESSPowerString(
-                coordinator,
-                name,
-                deviceID,
-                "Grid Consumption Power",
-                "grid-consumption-power",
-                "gridConsumptionPower",
-            ),
-            FoxESSPowerString(
-                coordinator,
-                name,
-                deviceID,
-                "FeedIn Power",
-                "feedIn-power",
-                "feedinPower",
-            ),
-            FoxESSPowerString(
-                coordinator,
-                name,
-                deviceID,
-                "Bat Discharge Power",
-                "bat-discharge-power",
-                "batDischargePower",
-            ),
-            FoxESSPowerString(
-                coordinator,
-                name,
-                deviceID,
-                "Bat Charge Power",
-                "bat-charge-power",
-                "batChargePower",
-            ),
-            FoxESSPowerString(
-                coordinator, name, deviceID, "Load Power", "load-power", "loadsPower"
-            ),
-            FoxESSEnergyGenerated(
-                coordinator,
-                name,
-                deviceID,
-                "Energy Generated",
-                "energy-generated",
-                "value",
-            ),
-            FoxESSEnergyGenerated(
-                coordinator,
-                name,
-                deviceID,
-                "Energy Generated Month",
-                "energy-generated-month",
-                "month",
-            ),
-            FoxESSEnergyGenerated(
-                coordinator,
-                name,
-                deviceID,
-                "Energy Generated Cumulative",
-                "energy-generated-cumulative",
-                "cumulative",
-            ),
-            FoxESSEnergyGridConsumption(coordinator, name, deviceID),
-            FoxESSEnergyFeedin(coordinator, name, deviceID),
-            FoxESSEnergyBatCharge(coordinator, name, deviceID),
-            FoxESSEnergyBatDischarge(coordinator, name, deviceID),
-            FoxESSEnergyLoad(coordinator, name, deviceID),
-            FoxESSPVEnergyTotal(coordinator, name, deviceID),
-            FoxESSResidualEnergy(coordinator, name, deviceID),
-            FoxESSResponseTime(coordinator, name, deviceID),
-            FoxESSMaxBatChargeCurrent(coordinator, name, deviceID),
-            FoxESSMaxBatDischargeCurrent(coordinator, name, deviceID),
-            FoxESSRunningState(
-                coordinator,
-                name,
-                deviceID,
-                "Running State",
-                "running-state",
-                "runningState",
-            ),
-        ]
+        FoxESSSensor(coordinator, name, deviceID, description)
+        for description in SENSORS
     )
 
     if ExtPV:
         async_add_entities(
-            [
-                FoxESSCurrent(
-                    coordinator,
-                    name,
-                    deviceID,
-                    "PV7 Current",
-                    "pv7-current",
-                    "pv7Current",
-                ),
-                FoxESSPower(
-                    coordinator, name, deviceID, "PV7 Power", "pv7-power", "pv7Power"
-                ),
-                FoxESSVolt(
-                    coordinator, name, deviceID, "PV7 Volt", "pv7-volt", "pv7Volt"
-                ),
-                FoxESSCurrent(
-                    coordinator,
-                    name,
-                    deviceID,
-                    "PV8 Current",
-                    "pv8-current",
-                    "pv8Current",
-                ),
-                FoxESSPower(
-                    coordinator, name, deviceID, "PV8 Power", "pv8-power", "pv8Power"
-                ),
-                FoxESSVolt(
-                    coordinator, name, deviceID, "PV8 Volt", "pv8-volt", "pv8Volt"
-                ),
-                FoxESSCurrent(
-                    coordinator,
-                    name,
-                    deviceID,
-                    "PV9 Current",
-                    "pv9-current",
-                    "pv9Current",
-                ),
-                FoxESSPower(
-                    coordinator, name, deviceID, "PV9 Power", "pv9-power", "pv9Power"
-                ),
-                FoxESSVolt(
-                    coordinator, name, deviceID, "PV9 Volt", "pv9-volt", "pv9Volt"
-                ),
-                FoxESSCurrent(
-                    coordinator,
-                    name,
-                    deviceID,
-                    "PV10 Current",
-                    "pv10-current",
-                    "pv10Current",
-                ),
-                FoxESSPower(
-                    coordinator, name, deviceID, "PV10 Power", "pv10-power", "pv10Power"
-                ),
-                FoxESSVolt(
-                    coordinator, name, deviceID, "PV10 Volt", "pv10-volt", "pv10Volt"
-                ),
-                FoxESSCurrent(
-                    coordinator,
-                    name,
-                    deviceID,
-                    "PV11 Current",
-                    "pv11-current",
-                    "pv11Current",
-                ),
-                FoxESSPower(
-                    coordinator, name, deviceID, "PV11 Power", "pv11-power", "pv11Power"
-                ),
-                FoxESSVolt(
-                    coordinator, name, deviceID, "PV11 Volt", "pv11-volt", "pv11Volt"
-                ),
-                FoxESSCurrent(
-                    coordinator,
-                    name,
-                    deviceID,
-                    "PV12 Current",
-                    "pv12-current",
-                    "pv12Current",
-                ),
-                FoxESSPower(
-                    coordinator, name, deviceID, "PV12 Power", "pv12-power", "pv12Power"
-                ),
-                FoxESSVolt(
-                    coordinator, name, deviceID, "PV12 Volt", "pv12-volt", "pv12Volt"
-                ),
-                FoxESSCurrent(
-                    coordinator,
-                    name,
-                    deviceID,
-                    "PV13 Current",
-                    "pv13-current",
-                    "pv13Current",
-                ),
-                FoxESSPower(
-                    coordinator, name, deviceID, "PV13 Power", "pv13-power", "pv13Power"
-                ),
-                FoxESSVolt(
-                    coordinator, name, deviceID, "PV13 Volt", "pv13-volt", "pv13Volt"
-                ),
-                FoxESSCurrent(
-                    coordinator,
-                    name,
-                    deviceID,
-                    "PV14 Current",
-                    "pv14-current",
-                    "pv14Current",
-                ),
-                FoxESSPower(
-                    coordinator, name, deviceID, "PV14 Power", "pv14-power", "pv14Power"
-                ),
-                FoxESSVolt(
-                    coordinator, name, deviceID, "PV14 Volt", "pv14-volt", "pv14Volt"
-                ),
-                FoxESSCurrent(
-                    coordinator,
-                    name,
-                    deviceID,
-                    "PV15 Current",
-                    "pv15-current",
-                    "pv15Current",
-                ),
-                FoxESSPower(
-                    coordinator, name, deviceID, "PV15 Power", "pv15-power", "pv15Power"
-                ),
-                FoxESSVolt(
-                    coordinator, name, deviceID, "PV15 Volt", "pv15-volt", "pv15Volt"
-                ),
-                FoxESSCurrent(
-                    coordinator,
-                    name,
-                    deviceID,
-                    "PV16 Current",
-                    "pv16-current",
-                    "pv16Current",
-                ),
-                FoxESSPower(
-                    coordinator, name, deviceID, "PV16 Power", "pv16-power", "pv16Power"
-                ),
-                FoxESSVolt(
-                    coordinator, name, deviceID, "PV16 Volt", "pv16-volt", "pv16Volt"
-                ),
-                FoxESSCurrent(
-                    coordinator,
-                    name,
-                    deviceID,
-                    "PV17 Current",
-                    "pv17-current",
-                    "pv17Current",
-                ),
-                FoxESSPower(
-                    coordinator, name, deviceID, "PV17 Power", "pv17-power", "pv17Power"
-                ),
-                FoxESSVolt(
-                    coordinator, name, deviceID, "PV17 Volt", "pv17-volt", "pv17Volt"
-                ),
-                FoxESSCurrent(
-                    coordinator,
-                    name,
-                    deviceID,
-                    "PV18 Current",
-                    "pv18-current",
-                    "pv18Current",
-                ),
-                FoxESSPower(
-                    coordinator, name, deviceID, "PV18 Power", "pv18-power", "pv18Power"
-                ),
-                FoxESSVolt(
-                    coordinator, name, deviceID, "PV18 Volt", "pv18-volt", "pv18Volt"
-                ),
-            ]
+            FoxESSSensor(coordinator, name, deviceID, description)
+            for description in SENSORS_EXTENDED_PV
         )
 
+    if derived_sensors:
+        async_add_entities(
+            FoxESSSensor(coordinator, name, deviceID, description)
+            for description in derived_sensors
+        )
 
-class GetAuth:
-    def get_signature(self, token, path, lang="en"):
-        """
-        This function is used to generate a signature consisting of URL, token, and timestamp, and return a dictionary containing the signature and other information.
-            :param token: your key
-            :param path:  your request path
-            :param lang: language, default is English.
-            :return: with authentication header
-        """
-        timestamp = round(time.time() * 1000)
-        signature = rf"{path}\r\n{token}\r\n{timestamp}"
-        # or use user_agent_rotator.get_random_user_agent() for user-agent
-        result = {
-            "token": token,
-            "lang": lang,
-            "timestamp": str(timestamp),
-            "Content-Type": "application/json",
-            "signature": self.md5c(text=signature),
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) "
-            "Chrome/117.0.0.0 Safari/537.36",
-            "Connection": "close",
-        }
-
-        return result
-
-    @staticmethod
-    def md5c(text="", _type="lower"):
-        res = hashlib.md5(text.encode(encoding="UTF-8")).hexdigest()
-        if _type.__eq__("lower"):
-            return res
-        else:
-            return res.upper()
-
-
-async def waitforAPI():
-    global last_api
-    # wait for openAPI, there is a minimum of 1 second allowed between OpenAPI query calls
-    # check if last_api call was less than a second ago and if so delay the balance of 1 second
-    now = time.time()
-    last = last_api
-    diff = now - last if last != 0 else 1
-    diff = round((diff + 0.2), 2)
-    if diff < 1:
-        await asyncio.sleep(diff)
-        _LOGGER.debug("API enforced delay, wait: %s", diff)
-    now = time.time()
-    last_api = now
-    return False
-
-
-async def getOADeviceDetail(hass, allData, devicesn, apiKey):
-    await waitforAPI()
 
-    if V1_Api:
+async def getOADeviceDetail(hass, allData, inverter):
+    if inverter.options.v1_api:
         path = _ENDPOINT_OA_DEVICE_DETAIL_V1
         _LOGGER.debug("Device Detail using V1 API")
     else:
         path = _ENDPOINT_OA_DEVICE_DETAIL
 
-    headerData = GetAuth().get_signature(token=apiKey, path=path)
+    _LOGGER.debug("OADevice Detail fetch %s?sn=%s", path, inverter.devicesn)
 
-    path = _ENDPOINT_OA_DOMAIN + path + "?sn="
-    _LOGGER.debug("OADevice Detail fetch %s%s", path, devicesn)
-    timestamp = round(time.time() * 1000)
-
-    restOADeviceDetail = RestData(
-        hass,
+    restOADeviceDetail = await get_client(hass).async_request(
         METHOD_GET,
-        path + devicesn,
-        DEFAULT_ENCODING,
-        None,
-        headerData,
-        None,
-        None,
-        DEFAULT_VERIFY_SSL,
-        SSLCipherList.PYTHON_DEFAULT,
-        DEFAULT_TIMEOUT,
+        path,
+        inverter.apiKey,
+        params={"sn": inverter.devicesn},
+        scope=inverter.devicesn,
     )
-    await restOADeviceDetail.async_update()
 
-    if restOADeviceDetail.data is None or restOADeviceDetail.data == "":
+    if restOADeviceDetail.payload is None:
         _LOGGER.debug("Unable to get OA Device Detail from FoxESS Cloud")
         return True
     else:
-        response = json.loads(restOADeviceDetail.data)
-        if response["errno"] == 0 and (response["msg"]=='success' or response["msg"]=='Operation successful'):
-            ResponseTime = round(time.time() * 1000) - timestamp
-            if ResponseTime > 0:
-                allData["raw"]["ResponseTime"] = ResponseTime
-            else:
-                allData["raw"]["ResponseTime"] = 0
-            _LOGGER.debug("OA Device Detail Good Response: %s", response["result"])
-            result = response["result"]
+        if restOADeviceDetail.ok:
+            allData["raw"]["ResponseTime"] = restOADeviceDetail.timing["request"]
+            _LOGGER.debug("OA Device Detail Good Response: %s", restOADeviceDetail.result)
+            result = restOADeviceDetail.result
             allData["addressbook"] = result
             # manually poke this in as on the old cloud it was called plantname, need to keep in line with old entity name
             plantName = result["stationName"]
@@ -800,54 +692,31 @@ async def getOADeviceDetail(hass, allData, devicesn, apiKey):
                 allData["addressbook"][ATTR_BATTERYLIST] = "No Battery"
             return False
         else:
-            _LOGGER.error("OA Device Detail Bad Response: %s", response)
+            _LOGGER.error("OA Device Detail Bad Response: %s", restOADeviceDetail.payload)
             return True
 
 
-async def getOADeviceList(hass, allData, devicesn, apiKey):
-    await waitforAPI()
-
-    path = "/op/v0/device/list"
-    headerData = GetAuth().get_signature(token=apiKey, path=path)
-
-    path = _ENDPOINT_OA_DOMAIN + "/op/v0/device/list"
-    _LOGGER.debug("OADevice List fetch %s%s", path, devicesn)
-    timestamp = round(time.time() * 1000)
+async def getOADeviceList(hass, allData, inverter):
+    path = _ENDPOINT_OA_DEVICE_LIST
+    _LOGGER.debug("OADevice List fetch %s%s", path, inverter.devicesn)
 
     listData = (
         '{ "currentPage": 1, "pageSize": 10}'
     )
 
-    restOADeviceList = RestData(
-        hass,
-        METHOD_POST,
-        path,
-        DEFAULT_ENCODING,
-        None,
-        headerData,
-        None,
-        listData,
-        DEFAULT_VERIFY_SSL,
-        SSLCipherList.PYTHON_DEFAULT,
-        DEFAULT_TIMEOUT,
+    restOADeviceList = await get_client(hass).async_request(
+        METHOD_POST, path, inverter.apiKey, data=listData, scope=inverter.devicesn
     )
-    await restOADeviceList.async_update()
 
-    if restOADeviceList.data is None or restOADeviceList.data == "":
+    if restOADeviceList.payload is None:
         _LOGGER.debug("Unable to get OA Device List from FoxESS Cloud")
         return True
     else:
-        response = json.loads(restOADeviceList.data)
-        if response["errno"] == 0 and (response["msg"]=='success' or response["msg"]=='Operation successful'):
-            ResponseTime = round(time.time() * 1000) - timestamp
-            if ResponseTime > 0:
-                allData["raw"]["ResponseTime"] = ResponseTime
-            else:
-                allData["raw"]["ResponseTime"] = 0
-            _LOGGER.debug("OA Device List Good Response: %s", response["result"])
-            result = json.loads(restOADeviceList.data)["result"]["data"]
+        if restOADeviceList.ok:
+            allData["raw"]["ResponseTime"] = restOADeviceList.timing["request"]
+            _LOGGER.debug("OA Device List Good Response: %s", restOADeviceList.result)
+            result = restOADeviceList.result["data"]
             for item in result:
-                variableName = item["stationName"]
                 _LOGGER.debug("OA Device List item: %s", item)
                 break
             allData["addressbook"] = item
@@ -866,17 +735,12 @@ async def getOADeviceList(hass, allData, devicesn, apiKey):
 
             return False
         else:
-            _LOGGER.error("OA Device List Bad Response: %s", response)
+            _LOGGER.error("OA Device List Bad Response: %s", restOADeviceList.payload)
             return True
 
 
-async def getOABatterySettings(hass, allData, devicesn, apiKey):
-    await waitforAPI()  # check for api delay
-
-    path = "/op/v0/device/battery/soc/get"
-    headerData = GetAuth().get_signature(token=apiKey, path=path)
-
-    path = _ENDPOINT_OA_DOMAIN + _ENDPOINT_OA_BATTERY_SETTINGS
+async def getOABatterySettings(hass, allData, inverter):
+    path = _ENDPOINT_OA_BATTERY_SETTINGS
     if "hasBattery" not in allData["addressbook"]:
         hasBattery = False
     else:
@@ -884,32 +748,24 @@ async def getOABatterySettings(hass, allData, devicesn, apiKey):
 
     if hasBattery:
         # only make this call if device detail reports battery fitted
-        _LOGGER.debug("OABattery Settings fetch %s %s", path, devicesn)
-        restOABatterySettings = RestData(
-            hass,
+        _LOGGER.debug("OABattery Settings fetch %s %s", path, inverter.devicesn)
+        restOABatterySettings = await get_client(hass).async_request(
             METHOD_GET,
-            path + devicesn,
-            DEFAULT_ENCODING,
-            None,
-            headerData,
-            None,
-            None,
-            DEFAULT_VERIFY_SSL,
-            SSLCipherList.PYTHON_DEFAULT,
-            DEFAULT_TIMEOUT,
+            path,
+            inverter.apiKey,
+            params={"sn": inverter.devicesn},
+            scope=inverter.devicesn,
         )
-        await restOABatterySettings.async_update()
 
-        if restOABatterySettings.data is None:
+        if restOABatterySettings.payload is None:
             _LOGGER.debug("Unable to get OA Battery Settings from FoxESS Cloud")
             return True
         else:
-            response = json.loads(restOABatterySettings.data)
-            if response["errno"] == 0 and (response["msg"]=='success' or response["msg"]=='Operation successful'):
+            if restOABatterySettings.ok:
                 _LOGGER.debug(
-                    "OA Battery Settings Good Response: %s", response["result"]
+                    "OA Battery Settings Good Response: %s", restOABatterySettings.result
                 )
-                result = response["result"]
+                result = restOABatterySettings.result
                 minSoc = result["minSoc"]
                 minSocOnGrid = result["minSocOnGrid"]
                 allData["battery"]["minSoc"] = minSoc
@@ -921,7 +777,7 @@ async def getOABatterySettings(hass, allData, devicesn, apiKey):
                 )
                 return False
             else:
-                _LOGGER.error("OA Battery Settings Bad Response: %s", response)
+                _LOGGER.error("OA Battery Settings Bad Response: %s", restOABatterySettings.payload)
                 return True
     else:
         # device detail reports no battery fitted so reset these variables to show unknown
@@ -930,126 +786,157 @@ async def getOABatterySettings(hass, allData, devicesn, apiKey):
         return False
 
 
-async def getReport(hass, allData, apiKey, devicesn):
-    await waitforAPI()  # check for api delay
+def _time_left(deadline: float | None) -> float | None:
+    """Seconds to the poll cycle deadline, the timeout of the next call."""
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def _out_of_time(timeout: float | None) -> bool:
+    # too little time left for the cloud to answer, the call is left to the next tick
+    return timeout is not None and timeout < MIN_TIMEOUT
+
+
+def _report_error(response):
+    """The error code of a failed report call."""
+    if response.cut_short:
+        return DEADLINE_PASSED
+    return TIMEOUT_ERROR if response.timed_out else True
+
+
+async def getReport(hass, allData, inverter, deadline=None):
+    """Today's report totals, past days of the month come from the report history.
+
+    Each call gets the time left to the deadline, the days already recorded
+    are kept when it runs out and the others are fetched on the next poll.
+    """
+    history = inverter.history
+    now = dt_util.now()
+    today = now.date()
+    pending = history.pending(today)
+    if any(day.month == today.month for day in pending):
+        # days of this month never fetched or not final yet, one month report has them all
+        path = _ENDPOINT_OA_REPORT
+        _LOGGER.debug("OA Report fetch %s ", path)
+        reportData = json.dumps(
+            {
+                "sn": inverter.devicesn,
+                "year": today.year,
+                "month": today.month,
+                "dimension": "month",
+                "variables": REPORT_VARIABLES,
+            }
+        )
+        _LOGGER.debug("getReport OA request: %s", reportData)
+        timeout = _time_left(deadline)
+        if _out_of_time(timeout):
+            return DEADLINE_PASSED
+        restOAReport = await get_client(hass).async_request(
+            METHOD_POST,
+            path,
+            inverter.apiKey,
+            data=reportData,
+            scope=inverter.devicesn,
+            timeout=timeout,
+        )
+        if restOAReport.payload is None:
+            _LOGGER.debug("Unable to get OA Report from FoxESS Cloud")
+            return _report_error(restOAReport)
+        if not restOAReport.ok:
+            _LOGGER.debug("OA Report Bad Response: %s ", restOAReport.data)
+            return True
+        _LOGGER.debug("OA Report Data fetched OK: %s ", restOAReport.data[:350])
+        history.record_month(today.year, today.month, restOAReport.result, now)
+        pending = [day for day in pending if day.month != today.month]
+    else:
+        pending.append(today)
+    # yesterday when it was last month, and today when the month report wasn't needed
+    for day in pending:
+        timeout = _time_left(deadline)
+        if _out_of_time(timeout):
+            return DEADLINE_PASSED
+        restOAReport = await fetchReportDay(hass, inverter, day, REPORT_VARIABLES, timeout)
+        if not restOAReport.ok:
+            _LOGGER.debug("OA Day Report Bad Response: %s ", restOAReport.data)
+            return _report_error(restOAReport)
+        history.record_day(day, _hourly(restOAReport), now)
+
+    allData["report"] = dict(history.day(today))
+    allData["reportMonth"] = history.month_to_date(today)
+    for variableName, total in allData["report"].items():
+        _LOGGER.debug("OA Report Variable: %s, Total: %s", variableName, total)
+    return False
 
-    path = _ENDPOINT_OA_REPORT
-    headerData = GetAuth().get_signature(token=apiKey, path=path)
-
-    path = _ENDPOINT_OA_DOMAIN + _ENDPOINT_OA_REPORT
-    _LOGGER.debug("OA Report fetch %s ", path)
-
-    now = datetime.now()
-    month = str(datetime.now().month)  # now.strftime("%-m")
-
-    reportData = (
-        '{"sn":"'
-        + devicesn
-        + '","year":'
-        + now.strftime("%Y")
-        + ',"month":'
-        + month
-        + ',"dimension":"month","variables":["feedin","generation","gridConsumption","chargeEnergyToTal","dischargeEnergyToTal","loads","PVEnergyTotal"]}'
-    )
 
-    _LOGGER.debug("getReport OA request: %s", reportData)
+async def getReportDay(hass, inverter, day, variables):
+    """Hourly values of the report variables for a day, None if the call failed."""
+    restOAReport = await fetchReportDay(hass, inverter, day, variables)
+    if not restOAReport.ok:
+        _LOGGER.debug("OA Day Report Bad Response: %s ", restOAReport.data)
+        return None
+    return _hourly(restOAReport)
 
-    restOAReport = RestData(
-        hass,
-        METHOD_POST,
-        path,
-        DEFAULT_ENCODING,
-        None,
-        headerData,
-        None,
-        reportData,
-        DEFAULT_VERIFY_SSL,
-        SSLCipherList.PYTHON_DEFAULT,
-        DEFAULT_TIMEOUT,
-    )
 
-    await restOAReport.async_update()
+def _hourly(restOAReport):
+    return {item["variable"]: item["values"] for item in restOAReport.result}
 
-    if restOAReport.data is None or restOAReport.data == "":
-        _LOGGER.debug("Unable to get OA Report from FoxESS Cloud")
-        return True
-    else:
-        # Openapi responded so process data
-        response = json.loads(restOAReport.data)
-        if response["errno"] == 0 and (response["msg"]=='success' or response["msg"]=='Operation successful'):
-            _LOGGER.debug(
-                "OA Report Data fetched OK: %s %s ", response, restOAReport.data[:350]
-            )
-            result = json.loads(restOAReport.data)["result"]
-            today = int(
-                now.strftime("%d")
-            )  # need today as an integer to locate in the monthly report index
-            for item in result:
-                variableName = item["variable"]
-                # Daily reports break down the data hour by month for each day
-                # so locate the current days index and use that as the sum
-                index = 1
-                cumulative_total = 0
-                for dataItem in item["values"]:
-                    if today == index:  # we're only interested in the total for today
-                        if dataItem != None:
-                            cumulative_total = dataItem
-                        else:
-                            _LOGGER.debug("Report month fetch, None received")
-                        break
-                    index += 1
-                    # cumulative_total += dataItem
-                allData["report"][variableName] = round(cumulative_total, 3)
-                _LOGGER.debug(
-                    "OA Report Variable: %s, Total: %s", variableName, cumulative_total
-                )
-            return False
-        else:
-            _LOGGER.debug("OA Report Bad Response: %s %s ", response, restOAReport.data)
-            return True
 
+async def fetchReportDay(hass, inverter, day, variables, timeout=None):
+    """The report/query call with the day dimension, one value per hour."""
+    path = _ENDPOINT_OA_REPORT
+    reportData = json.dumps(
+        {
+            "sn": inverter.devicesn,
+            "year": day.year,
+            "month": day.month,
+            "day": day.day,
+            "dimension": "day",
+            "variables": variables,
+        }
+    )
+    _LOGGER.debug("getReportDay OA request: %s", reportData)
 
-async def getReportDailyGeneration(hass, allData, apiKey, devicesn):
-    await waitforAPI()  # check for api delay
+    return await get_client(hass).async_request(
+        METHOD_POST,
+        path,
+        inverter.apiKey,
+        data=reportData,
+        scope=inverter.devicesn,
+        timeout=timeout,
+    )
 
-    path = "/op/v0/device/generation"
-    headerData = GetAuth().get_signature(token=apiKey, path=path)
 
-    path = _ENDPOINT_OA_DOMAIN + _ENDPOINT_OA_DAILY_GENERATION
+async def getReportDailyGeneration(hass, allData, inverter, deadline=None):
+    path = _ENDPOINT_OA_DAILY_GENERATION
+    timeout = _time_left(deadline)
+    if _out_of_time(timeout):
+        return DEADLINE_PASSED
     _LOGGER.debug("getReportDailyGeneration fetch %s ", path)
 
-    generationData = '{"sn":"' + devicesn + '","dimension":"day"}'
+    generationData = '{"sn":"' + inverter.devicesn + '","dimension":"day"}'
 
     _LOGGER.debug("getReportDailyGeneration OA request: %s", generationData)
 
-    restOAgen = RestData(
-        hass,
+    restOAgen = await get_client(hass).async_request(
         METHOD_GET,
-        path + devicesn,
-        DEFAULT_ENCODING,
-        None,
-        headerData,
-        None,
-        generationData,
-        DEFAULT_VERIFY_SSL,
-        SSLCipherList.PYTHON_DEFAULT,
-        DEFAULT_TIMEOUT,
+        path,
+        inverter.apiKey,
+        params={"sn": inverter.devicesn},
+        data=generationData,
+        scope=inverter.devicesn,
+        timeout=timeout,
     )
 
-    await restOAgen.async_update()
-
-    if restOAgen.data is None or restOAgen.data == "":
+    if restOAgen.payload is None:
         _LOGGER.debug("Unable to get OA Daily Generation Report from FoxESS Cloud")
-        return True
+        return _report_error(restOAgen)
     else:
-        response = json.loads(restOAgen.data)
-        if response["errno"] == 0 and (response["msg"]=='success' or response["msg"]=='Operation successful'):
+        if restOAgen.ok:
             _LOGGER.debug(
                 "OA Daily Generation Report Data fetched OK Response: %s",
                 restOAgen.data[:500],
             )
 
-            parsed = json.loads(restOAgen.data)["result"]
+            parsed = restOAgen.result
             if "today" not in parsed:
                 allData["reportDailyGeneration"]["value"] = 0
                 _LOGGER.debug(
@@ -1087,1179 +974,809 @@ async def getReportDailyGeneration(hass, allData, apiKey, devicesn):
             return False
         else:
             _LOGGER.debug(
-                "OA Daily Generation Report Bad Response: %s %s ",
-                response,
+                "OA Daily Generation Report Bad Response: %s ",
                 restOAgen.data,
             )
             return True
 
 
-async def getRaw(hass, allData, apiKey, devicesn):
-    await waitforAPI()  # check for api delay
-
+async def fetchRaw(hass, inverters):
+    """Fetch real time variables for a list of inverters, v1 api only for more than one."""
     # "deviceSN" used for OpenAPI and it only fetches the real time data
+    sns = [inverter.devicesn for inverter in inverters]
 
-    # build the devicesn string
-    if V1_Api:
-        dsn = '{"sns":["' + devicesn + '"] }' 
+    # a batch is only made up of v1 api inverters
+    v1_api = len(sns) > 1 or inverters[0].options.v1_api
+    # build the devicesn request
+    if v1_api:
+        request = {"sns": sns}
     else:
-        dsn = '{"sn":"' + devicesn + '" }' 
+        request = {"sn": sns[0]}
 
-    if RestrictGetVar:
+    names = requested_variables(inverter.variables for inverter in inverters)
+    if names is not None:
+        _LOGGER.debug("Getting Device Variable in auto mode")
+        request["variables"] = names
+    elif all(inverter.options.restrict for inverter in inverters):
         _LOGGER.debug("Getting Device Variable in restricted mode")
-        # build the devicesn string
-        if V1_Api:
-            dsn = '{"sns":["' + devicesn + '"] ' 
-        else:
-            dsn = '{"sn":"' + devicesn + '"' 
-
-        rawData = (
-            dsn + ',"variables":["ambientTemperation", "batChargePower", "batCurrent", "batCurrent_1", "batCurrent_2", "batDischargePower", "batTemperature", "batTemperature_1", "batTemperature_2", "batVolt", "batVolt_1", "batVolt_2", "boostTemperation", "chargeTemperature", "dspTemperature", "epsCurrentR", "epsCurrentS", "epsCurrentT", "epsPower", "epsPowerR", "epsPowerS", "epsPowerT", "epsVoltR", "epsVoltS", "epsVoltT", "feedinPower", "generationPower", "gridConsumptionPower", "input", "invBatCurrent", "invBatPower", "invBatVolt", "invTemperation", "loadsPower", "loadsPowerR", "loadsPowerS", "loadsPowerT", "meterPower", "meterPower2", "meterPowerR", "meterPowerS", "meterPowerT", "PowerFactor", "pv1Current", "pv1Power", "pv1Volt", "pv2Current", "pv2Power", "pv2Volt", "pv3Current", "pv3Power", "pv3Volt", "pv4Current", "pv4Power", "pv4Volt", "pvPower", "RCurrent", "ReactivePower", "RFreq", "RPower", "RVolt", "SCurrent", "SFreq", "SoC", "SPower", "SVolt", "TCurrent", "TFreq", "TPower", "TVolt", "SoC_1", "Soc_2", "ResidualEnergy", "energyThroughput", "runningState", "currentFaultCount"] }'
-        )
-    else:
-        rawData = dsn # '{"sn":"' + dsn + '" }'
+        request["variables"] = RESTRICTED_VARIABLES
 
+    rawData = json.dumps(request)
     _LOGGER.debug("getRaw OA request: %s", rawData)
 
-    timestamp = round(time.time() * 1000)
-
-    if V1_Api:
+    if v1_api:
         path = _ENDPOINT_OA_DEVICE_VARIABLES_V1
         _LOGGER.debug("Using V1 API")
     else:
         path = _ENDPOINT_OA_DEVICE_VARIABLES
 
-    headerData = GetAuth().get_signature(token=apiKey, path=path)
-
-    path = _ENDPOINT_OA_DOMAIN + path
     _LOGGER.debug("Path: %s", path)
 
-    restOADeviceVariables = RestData(
-        hass,
+    restOADeviceVariables = await get_client(hass).async_request(
         METHOD_POST,
         path,
-        DEFAULT_ENCODING,
-        None,
-        headerData,
-        None,
-        rawData,
-        DEFAULT_VERIFY_SSL,
-        SSLCipherList.PYTHON_DEFAULT,
-        DEFAULT_TIMEOUT,
+        inverters[0].apiKey,
+        data=rawData,
+        scope=sns[0] if len(sns) == 1 else None,
     )
+    if restOADeviceVariables.dns_error:
+        _LOGGER.debug("Getvar DNS exception: %s", restOADeviceVariables.exception)
+        return DNS_ERROR, None, 0
+    if restOADeviceVariables.timed_out:
+        _LOGGER.debug("Getvar timed out")
+        return TIMEOUT_ERROR, None, 0
+
+    if restOADeviceVariables.payload is None:
+        _LOGGER.debug("Unable to get OA Variables from FoxESS Cloud")
+        return True, None, 0
+    # Openapi responded correctly
+    if restOADeviceVariables.ok:
+        return False, restOADeviceVariables.result, restOADeviceVariables.timing["request"]
+    _LOGGER.debug("OA Device Variables Bad Response: %s", restOADeviceVariables.payload)
+    return True, None, 0
 
-    await restOADeviceVariables.async_update()
-    if restOADeviceVariables.last_exception is not None:
-        lastex = str(restOADeviceVariables.last_exception)
-        _LOGGER.debug("Getvar exception: %s", lastex)
-        if "Timeout while contacting DNS servers" in lastex:
-            _LOGGER.debug("Getvar DNS exception: %s", lastex)
-            return DNS_ERROR
-            # [Timeout while contacting DNS servers]
 
-    if restOADeviceVariables.data is None or restOADeviceVariables.data == "":
-        _LOGGER.debug("Unable to get OA Variables from FoxESS Cloud")
-        return True
+async def getRaw(hass, allData, inverter):
+    if inverter.batcher is not None:
+        geterror, element, ResponseTime = await inverter.batcher.async_fetch(inverter.devicesn)
     else:
-        # Openapi responded correctly
-        response = json.loads(restOADeviceVariables.data)
-        if response["errno"] == 0 and (response["msg"]=='success' or response["msg"]=='Operation successful'):
-            ResponseTime = round(time.time() * 1000) - timestamp
-            if ResponseTime > 0:
-                allData["raw"]["ResponseTime"] = ResponseTime
-            else:
-                allData["raw"]["ResponseTime"] = 0
-
-            test = json.loads(restOADeviceVariables.data)["result"]
+        geterror, result, ResponseTime = await fetchRaw(hass, [inverter])
+        element = result[0] if not geterror else None
+    if geterror:
+        return geterror
+    allData["raw"]["ResponseTime"] = ResponseTime
+    variables = inverter.variables
+    if variables is not None:
+        if variables.stale:
+            variables.learn(element.get("datas") or [])
+        else:
+            # variables without a value are no longer requested, they still read as zero
+            for variableName in variables.empty:
+                allData["raw"].setdefault(VARIABLE_ALIASES.get(variableName, variableName), 0)
+    return parseRaw(allData, inverter, element)
+
+
+def parseRaw(allData, inverter, element):
+    """Process one element of the real/query result[] into allData."""
+    timercv = element.get("time")
+    _LOGGER.debug("OA Variables time: %s ", timercv)
+    try:
+        # format is "2025-02-21 16:38:29 GMT+0000", the offset is only applied with xtZone
+        tsrcv = cloud_timestamp(timercv, inverter.options.xtzone)
+    except (TypeError, ValueError) as err:
+        _LOGGER.debug("OA Variables time not understood: %s", err)
+        tsrcv = 0
+    age = 0
+    if tsrcv != 0:
+        testd = datetime.now()
+        tsnow = round(time.time())
+        age = round(tsnow - tsrcv)
+        _LOGGER.debug(
+            "OA Variables time: %s vs %s timestamps r:%s now:%s, age: %s",
+            timercv,
+            testd,
+            tsrcv,
+            tsnow,
+            age,
+        )
+        if age > 361:
+            _LOGGER.debug(
+                "OA Variables invalid age: %s vs %s timestamps r:%s now:%s, age: %s",
+                timercv,
+                testd,
+                tsrcv,
+                tsnow,
+                age,
+            )
 
-            timercv = test[0].get("time")
-            try:
-                # format is "2025-02-21 16:38:29 GMT+0000" strptime is useless at international dates, so work out the offset
-                # tsrcv = datetime.strptime(testt, "%Y-%m-%d %H:%M:%S %Z%z") fails on some countries
-                _LOGGER.debug("OA Variables time: %s ", timercv)
-                tzoffsetsign = timercv[23:24]
-                tzoffsethr = int(timercv[24:26])
-                tzoffsetmin = int(timercv[26:28])
-                tzfull = str(timercv[23:28])
-                _LOGGER.debug(
-                    "OA Variables tzoffsign: %s, hr: %s, min: %s, full: %s",
-                    tzoffsetsign,
-                    tzoffsethr,
-                    tzoffsetmin,
-                    tzfull,
-                )
-                if tzoffsetsign in ["+"]:
-                    tzoffset = (tzoffsethr * 3600 + tzoffsetmin * 60) * 1
-                else:
-                    tzoffset = (tzoffsethr * 3600 + tzoffsetmin * 60) * -1
-                tsrcv = (parser.parse(timercv, ignoretz=True)).timestamp()
-                zulu = datetime.now().astimezone().strftime("%z")
-                if zulu != tzfull:
-                    if xtzone:
-                        _LOGGER.debug(
-                            "OA Variables tsrcv applying offset: %s, offset: %s, zulu: %s",
-                            tsrcv,
-                            tzoffset,
-                            zulu,
-                        )
-                        tsrcv = tsrcv - tzoffset
-                else:
-                    _LOGGER.debug(
-                        "OA Variables tsrcv is local: %s, zulu: %s, offset: %s ",
-                        tsrcv,
-                        zulu,
-                        tzoffset,
-                    )
-            except:
-                tsrcv = 0
-            age = 0
-            if tsrcv != 0:
-                testd = datetime.now()
-                tsnow = round(time.time())
-                age = round(tsnow - tsrcv)
-                _LOGGER.debug(
-                    "OA Variables time: %s vs %s timestamps r:%s now:%s, age: %s",
-                    timercv,
-                    testd,
-                    tsrcv,
-                    tsnow,
-                    age,
-                )
-                if age > 361:
-                    _LOGGER.debug(
-                        "OA Variables invalid age: %s vs %s timestamps r:%s now:%s, age: %s",
-                        timercv,
-                        testd,
-                        tsrcv,
-                        tsnow,
-                        age,
-                    )
-
-            result = test[0].get("datas")
-            _LOGGER.debug("OA Variables Good Response: %s", result)
-            # allData['raw'] = {}
-            for (
-                item
-            ) in result:  # json.loads(result): # restOADeviceVariables.data)['result']:
-                variableName = item["variable"]
-                # If value exists
-                if item.get("value") is not None:
-                    variableValue = item["value"]
+    result = element.get("datas")
+    _LOGGER.debug("OA Variables Good Response: %s", result)
+    # allData['raw'] = {}
+    for (
+        item
+    ) in result:  # json.loads(result): # restOADeviceVariables.data)['result']:
+        variableName = item["variable"]
+        # If value exists
+        if item.get("value") is not None:
+            variableValue = item["value"]
+        else:
+            variableValue = 0
+            _LOGGER.debug("Variable %s no value, set to zero", variableName)
+        # fix for various battery and scale items
+        variableName = VARIABLE_ALIASES.get(variableName, variableName)
+        if variableName == "ResidualEnergy":
+            if item.get("unit") is not None:
+                scale=item["unit"]
+                if scale in ['1.0kWh', 'kWh', None]:
+                    variableValue = round((variableValue * 100),2)
+                    _LOGGER.debug("OA Variables ResidualEnergy Scale: *100 %s", scale)
+                elif scale=="0.1kWh":
+                    variableValue = round((variableValue * 10),2)
+                    _LOGGER.debug("OA Variables ResidualEnergy Scale: *10 %s", scale)
                 else:
-                    variableValue = 0
-                    _LOGGER.debug("Variable %s no value, set to zero", variableName)
-                # fix for various battery and scale items
-                if variableName == "SoC_1":
-                    variableName = "SoC_1"  # do nothing for the moment, future release might align this correctly to use SoC
-                elif variableName == "batTemperature_1":
-                    variableName = "batTemperature"  # use entity for single battery systems
-                elif variableName == "invBatPower_1":
-                    variableName = "invBatPower"  # use entity for single battery systems
-                elif variableName == "ResidualEnergy":
-                    if item.get("unit") is not None:
-                        scale=item["unit"]
-                        if scale in ['1.0kWh', 'kWh', None]:
-                            variableValue = round((variableValue * 100),2)
-                            _LOGGER.debug("OA Variables ResidualEnergy Scale: *100 %s", scale)
-                        elif scale=="0.1kWh":
-                            variableValue = round((variableValue * 10),2)
-                            _LOGGER.debug("OA Variables ResidualEnergy Scale: *10 %s", scale)
-                        else:
-                            _LOGGER.debug("OA Variables ResidualEnergy Scale: %s", scale)
+                    _LOGGER.debug("OA Variables ResidualEnergy Scale: %s", scale)
+
+        allData["raw"][variableName] = variableValue
+        _LOGGER.debug(
+            "Var: %s, SN: %s set to %s",
+            variableName,
+            inverter.devicesn,
+            allData["raw"][variableName],
+        )
 
-                allData["raw"][variableName] = variableValue
+        if variableName == "runningState" and (
+            "hasBattery" in allData["addressbook"]
+        ):
+            hasBat = allData["addressbook"]["hasBattery"]
+            if not hasBat:
+                # solar only inverter
                 _LOGGER.debug(
-                    "Var: %s, SN: %s set to %s",
-                    variableName,
-                    devicesn,
-                    allData["raw"][variableName],
+                    "TestState: %s, hasBat: %s online: %s",
+                    variableValue,
+                    hasBat,
+                    allData["online"],
                 )
-
-                if variableName == "runningState" and (
-                    "hasBattery" in allData["addressbook"]
-                ):
-                    hasBat = allData["addressbook"]["hasBattery"]
-                    if not hasBat:
-                        # solar only inverter
+                if variableValue is not None:
+                    if variableValue == "161" or variableValue == "162":
+                        # waiting and solar only so set off-line flag
+                        if age < 361:
+                            _LOGGER.debug(
+                                "Waiting but data less than 5 minutes old - allow sample, RunningState: %s, hasBat: %s online: %s",
+                                variableValue,
+                                hasBat,
+                                allData["online"],
+                            )
+                        else:
+                            allData["online"] = False
+                            _LOGGER.debug(
+                                "Waiting so set off-line state, TestState: %s, hasBat: %s online: %s",
+                                variableValue,
+                                hasBat,
+                                allData["online"],
+                            )
+                    elif variableValue == "163" and not allData["online"]:
+                        # on-grid but showing off-line wait for it to be set on-line by OADeviceDetail
+                        # allData["online"] = False
                         _LOGGER.debug(
-                            "TestState: %s, hasBat: %s online: %s",
+                            "Inverter on-grid but off-line wait for OADevice to confirm, TestState: %s, hasBat: %s",
                             variableValue,
                             hasBat,
-                            allData["online"],
                         )
-                        if variableValue is not None:
-                            if variableValue == "161" or variableValue == "162":
-                                # waiting and solar only so set off-line flag
-                                if age < 361:
-                                    _LOGGER.debug(
-                                        "Waiting but data less than 5 minutes old - allow sample, RunningState: %s, hasBat: %s online: %s",
-                                        variableValue,
-                                        hasBat,
-                                        allData["online"],
-                                    )
-                                else:
-                                    allData["online"] = False
-                                    _LOGGER.debug(
-                                        "Waiting so set off-line state, TestState: %s, hasBat: %s online: %s",
-                                        variableValue,
-                                        hasBat,
-                                        allData["online"],
-                                    )
-                            elif variableValue == "163" and not allData["online"]:
-                                # on-grid but showing off-line wait for it to be set on-line by OADeviceDetail
-                                # allData["online"] = False
-                                _LOGGER.debug(
-                                    "Inverter on-grid but off-line wait for OADevice to confirm, TestState: %s, hasBat: %s",
-                                    variableValue,
-                                    hasBat,
-                                )
-
-            return False
-        else:
-            _LOGGER.debug("OA Device Variables Bad Response: %s", response)
-            return True
-
-
-class FoxESSPowerString(CoordinatorEntity, SensorEntity):
-    _attr_state_class: SensorStateClass = SensorStateClass.MEASUREMENT
-    _attr_device_class = SensorDeviceClass.POWER
-    _attr_native_unit_of_measurement = UnitOfPower.KILO_WATT
-
-    def __init__(self, coordinator, name, deviceID, nameValue, uniqueValue, keyValue):
-        super().__init__(coordinator=coordinator)
-        self._nameValue = nameValue
-        self._uniqueValue = uniqueValue
-        self._keyValue = keyValue
-        _LOGGER.debug("Initiating Entity - %s", self._nameValue)
-        self._attr_name = f"{name} - {self._nameValue}"
-        self._attr_unique_id = f"{deviceID}{self._uniqueValue}"
-        self.status = namedtuple(
-            "status",
-            [
-                ATTR_DATE,
-                ATTR_TIME,
-            ],
-        )
-
-    @property
-    def native_value(self) -> str | None:
-        if self.coordinator.data["online"] and self.coordinator.data["raw"]:
-            if self._keyValue not in self.coordinator.data["raw"]:
-                _LOGGER.debug("%s None", self._keyValue)
-            else:
-                return self.coordinator.data["raw"][self._keyValue]
-        return None
-
-
-class FoxESSCurrent(CoordinatorEntity, SensorEntity):
-    _attr_state_class: SensorStateClass = SensorStateClass.MEASUREMENT
-    _attr_device_class = SensorDeviceClass.CURRENT
-    _attr_native_unit_of_measurement = UnitOfElectricCurrent.AMPERE
-
-    def __init__(self, coordinator, name, deviceID, nameValue, uniqueValue, keyValue):
-        super().__init__(coordinator=coordinator)
-        self._nameValue = nameValue
-        self._uniqueValue = uniqueValue
-        self._keyValue = keyValue
-        _LOGGER.debug("Initiating Entity - %s", self._nameValue)
-        self._attr_name = f"{name} - {self._nameValue}"
-        self._attr_unique_id = f"{deviceID}{self._uniqueValue}"
-        self.status = namedtuple(
-            "status",
-            [
-                ATTR_DATE,
-                ATTR_TIME,
-            ],
-        )
-
-    @property
-    def native_value(self) -> float | None:
-        if self.coordinator.data["online"] and self.coordinator.data["raw"]:
-            if self._keyValue not in self.coordinator.data["raw"]:
-                _LOGGER.debug("%s None", self._keyValue)
-            else:
-                return self.coordinator.data["raw"][self._keyValue]
-        return None
-
-
-class FoxESSFreq(CoordinatorEntity, SensorEntity):
-    _attr_state_class: SensorStateClass = SensorStateClass.MEASUREMENT
-    _attr_device_class = SensorDeviceClass.FREQUENCY
-    _attr_native_unit_of_measurement = UnitOfFrequency.HERTZ
-
-    def __init__(self, coordinator, name, deviceID, nameValue, uniqueValue, keyValue):
-        super().__init__(coordinator=coordinator)
-        self._nameValue = nameValue
-        self._uniqueValue = uniqueValue
-        self._keyValue = keyValue
-        _LOGGER.debug("Initiating Entity - %s", self._nameValue)
-        self._attr_name = f"{name} - {self._nameValue}"
-        self._attr_unique_id = f"{deviceID}{self._uniqueValue}"
-        self.status = namedtuple(
-            "status",
-            [
-                ATTR_DATE,
-                ATTR_TIME,
-            ],
-        )
-
-    @property
-    def native_value(self) -> float | None:
-        if self.coordinator.data["online"] and self.coordinator.data["raw"]:
-            if self._keyValue not in self.coordinator.data["raw"]:
-                _LOGGER.debug("%s None", self._keyValue)
-            else:
-                return self.coordinator.data["raw"][self._keyValue]
-        return None
-
-
-class FoxESSPower(CoordinatorEntity, SensorEntity):
-    _attr_state_class: SensorStateClass = SensorStateClass.MEASUREMENT
-    _attr_device_class = SensorDeviceClass.POWER
-    _attr_native_unit_of_measurement = UnitOfPower.KILO_WATT
-
-    def __init__(self, coordinator, name, deviceID, nameValue, uniqueValue, keyValue):
-        super().__init__(coordinator=coordinator)
-        self._nameValue = nameValue
-        self._uniqueValue = uniqueValue
-        self._keyValue = keyValue
-        _LOGGER.debug("Initiating Entity - %s", self._nameValue)
-        self._attr_name = f"{name} - {self._nameValue}"
-        self._attr_unique_id = f"{deviceID}{self._uniqueValue}"
-        self.status = namedtuple(
-            "status",
-            [
-                ATTR_DATE,
-                ATTR_TIME,
-            ],
-        )
-
-    @property
-    def native_value(self) -> float | None:
-        if self.coordinator.data["online"] and self.coordinator.data["raw"]:
-            if self._keyValue not in self.coordinator.data["raw"]:
-                _LOGGER.debug("%s None", self._keyValue)
-            else:
-                return self.coordinator.data["raw"][self._keyValue]
-        return None
-
 
-class FoxESSVolt(CoordinatorEntity, SensorEntity):
-    _attr_state_class: SensorStateClass = SensorStateClass.MEASUREMENT
-    _attr_device_class = SensorDeviceClass.VOLTAGE
-    _attr_native_unit_of_measurement = UnitOfElectricPotential.VOLT
+    return False
 
-    def __init__(self, coordinator, name, deviceID, nameValue, uniqueValue, keyValue):
-        super().__init__(coordinator=coordinator)
-        self._nameValue = nameValue
-        self._uniqueValue = uniqueValue
-        self._keyValue = keyValue
-        _LOGGER.debug("Initiating Entity - %s", self._nameValue)
-        self._attr_name = f"{name} - {self._nameValue}"
-        self._attr_unique_id = f"{deviceID}{self._uniqueValue}"
-        self.status = namedtuple(
-            "status",
-            [
-                ATTR_DATE,
-                ATTR_TIME,
-            ],
-        )
 
-    @property
-    def native_value(self) -> float | None:
-        if self.coordinator.data["online"] and self.coordinator.data["raw"]:
-            if self._keyValue not in self.coordinator.data["raw"]:
-                _LOGGER.debug("%s None", self._keyValue)
-            else:
-                return self.coordinator.data["raw"][self._keyValue]
-        return None
+INVERTER_STATES = {1: "on-line", 2: "in-alarm"}
 
 
-class FoxESSReactivePower(CoordinatorEntity, SensorEntity):
-    _attr_state_class: SensorStateClass = SensorStateClass.MEASUREMENT
-    _attr_device_class = SensorDeviceClass.REACTIVE_POWER
-    _attr_native_unit_of_measurement = UnitOfReactivePower.VOLT_AMPERE_REACTIVE
+def _online_value(bucket, key, scale=None):
+    """Value of a realtime variable, only while the inverter is on-line."""
 
-    def __init__(self, coordinator, name, deviceID):
-        super().__init__(coordinator=coordinator)
-        _LOGGER.debug("Initiating Entity - Reactive Power")
-        self._attr_name = name + " - Reactive Power"
-        self._attr_unique_id = deviceID + "reactive-power"
-        self.status = namedtuple(
-            "status",
-            [
-                ATTR_DATE,
-                ATTR_TIME,
-            ],
-        )
-
-    @property
-    def native_value(self) -> float | None:
-        if self.coordinator.data["online"] and self.coordinator.data["raw"]:
-            if "ReactivePower" not in self.coordinator.data["raw"]:
-                _LOGGER.debug("ReactivePower None")
-            else:
-                return self.coordinator.data["raw"]["ReactivePower"] * 1000
+    def value(data):
+        if data["online"] and data[bucket]:
+            result = data[bucket].get(key)
+            if scale is not None and result is not None:
+                return result * scale
+            return result
         return None
 
+    return value
 
-class FoxESSPowerFactor(CoordinatorEntity, SensorEntity):
-    _attr_state_class: SensorStateClass = SensorStateClass.MEASUREMENT
-    _attr_device_class = SensorDeviceClass.POWER_FACTOR
-    _attr_native_unit_of_measurement = PERCENTAGE
 
-    def __init__(self, coordinator, name, deviceID):
-        super().__init__(coordinator=coordinator)
-        _LOGGER.debug("Initiating Entity - Power Factor")
-        self._attr_name = name + " - Power Factor"
-        self._attr_unique_id = deviceID + "power-factor"
-        self.status = namedtuple(
-            "status",
-            [
-                ATTR_DATE,
-                ATTR_TIME,
-            ],
-        )
-
-    @property
-    def native_value(self) -> float | None:
-        if self.coordinator.data["online"] and self.coordinator.data["raw"]:
-            if "PowerFactor" not in self.coordinator.data["raw"]:
-                _LOGGER.debug("PowerFactor None")
-            else:
-                return self.coordinator.data["raw"]["PowerFactor"]
-        return None
+def _report_value(bucket, key, ndigits=None):
+    """Value of a report total, kept while the inverter is off-line."""
 
+    def value(data):
+        if key not in data[bucket]:
+            return None
+        result = data[bucket][key]
+        if ndigits is not None:
+            return round(result, ndigits)
+        return result
 
-class FoxESSEnergyGenerated(CoordinatorEntity, SensorEntity):
-    _attr_state_class: SensorStateClass = SensorStateClass.TOTAL_INCREASING
-    _attr_device_class = SensorDeviceClass.ENERGY
-    _attr_native_unit_of_measurement = UnitOfEnergy.KILO_WATT_HOUR
+    return value
 
-    def __init__(self, coordinator, name, deviceID, nameValue, uniqueValue, keyValue):
-        super().__init__(coordinator=coordinator)
-        self._nameValue = nameValue
-        self._uniqueValue = uniqueValue
-        self._keyValue = keyValue
-        _LOGGER.debug("Initiating Entity - %s", self._nameValue)
-        self._attr_name = f"{name} - {self._nameValue}"
-        self._attr_unique_id = f"{deviceID}{self._uniqueValue}"
-        self.status = namedtuple(
-            "status",
-            [
-                ATTR_DATE,
-                ATTR_TIME,
-            ],
-        )
 
-    @property
-    def native_value(self) -> float | None:
-        if self._keyValue not in self.coordinator.data["reportDailyGeneration"]:
-            _LOGGER.debug("%s None", self._keyValue)
-        else:
-            if self.coordinator.data["reportDailyGeneration"][self._keyValue] == 0:
-                energygenerated = 0
-            else:
-                energygenerated = self.coordinator.data["reportDailyGeneration"][
-                    self._keyValue
-                ]
-                if energygenerated > 0:
-                    energygenerated = round(energygenerated, 3)
-                else:
-                    energygenerated = 0
-            return energygenerated
-        return None
+def _energy_value(key, ndigits=None):
+    """Report total, run on by the integrated power readings when there is an estimate."""
+    from_report = _report_value("report", key, ndigits)
+    from_estimate = _report_value("estimate", key, ndigits)
 
+    def value(data):
+        if key in data["estimate"]:
+            return from_estimate(data)
+        return from_report(data)
 
-class FoxESSEnergyThroughput(CoordinatorEntity, SensorEntity):
-    _attr_state_class: SensorStateClass = SensorStateClass.TOTAL_INCREASING
-    _attr_device_class = SensorDeviceClass.ENERGY
-    _attr_native_unit_of_measurement = UnitOfEnergy.KILO_WATT_HOUR
+    return value
 
-    def __init__(self, coordinator, name, deviceID):
-        super().__init__(coordinator=coordinator)
-        _LOGGER.debug("Initiating Entity - Energy Throughput")
-        self._attr_name = name + " - Energy Throughput"
-        self._attr_unique_id = deviceID + "energy-throughput"
-        self.status = namedtuple(
-            "status",
-            [
-                ATTR_DATE,
-                ATTR_TIME,
-            ],
-        )
 
-    @property
-    def native_value(self) -> str | None:
-        if "energyThroughput" not in self.coordinator.data["raw"]:
-            _LOGGER.debug("raw Energy Throughput None")
-        else:
-            if self.coordinator.data["raw"]["energyThroughput"] == 0:
-                energygenerated = 0
-            else:
-                energygenerated = self.coordinator.data["raw"]["energyThroughput"]
-                if energygenerated > 0:
-                    energygenerated = round(energygenerated, 3)
-                else:
-                    energygenerated = 0
-            return energygenerated
-        return None
+def _derived_value(key):
+    """Value worked out by the coordinator's derived stage."""
 
+    def value(data):
+        return data["derived"].get(key)
 
-class FoxESSEnergyGridConsumption(CoordinatorEntity, SensorEntity):
-    _attr_state_class: SensorStateClass = SensorStateClass.TOTAL_INCREASING
-    _attr_device_class = SensorDeviceClass.ENERGY
-    _attr_native_unit_of_measurement = UnitOfEnergy.KILO_WATT_HOUR
+    return value
 
-    def __init__(self, coordinator, name, deviceID):
-        super().__init__(coordinator=coordinator)
-        _LOGGER.debug("Initiating Entity - Grid Consumption")
-        self._attr_name = name + " - Grid Consumption"
-        self._attr_unique_id = deviceID + "grid-consumption"
-        self.status = namedtuple(
-            "status",
-            [
-                ATTR_DATE,
-                ATTR_TIME,
-            ],
-        )
 
-    @property
-    def native_value(self) -> str | None:
-        if "gridConsumption" not in self.coordinator.data["report"]:
-            _LOGGER.debug("report gridConsumption None")
-        else:
-            if self.coordinator.data["report"]["gridConsumption"] == 0:
-                energygrid = 0
-            else:
-                energygrid = self.coordinator.data["report"]["gridConsumption"]
-            return energygrid
-        return None
+def _positive_value(bucket, key):
+    """Total rounded to 3 places, negative or missing readings show as 0."""
 
+    def value(data):
+        if key not in data[bucket]:
+            return None
+        result = data[bucket][key]
+        if not result or result < 0:
+            return 0
+        return round(result, 3)
 
-class FoxESSEnergyFeedin(CoordinatorEntity, SensorEntity):
-    _attr_state_class: SensorStateClass = SensorStateClass.TOTAL_INCREASING
-    _attr_device_class = SensorDeviceClass.ENERGY
-    _attr_native_unit_of_measurement = UnitOfEnergy.KILO_WATT_HOUR
+    return value
 
-    def __init__(self, coordinator, name, deviceID):
-        super().__init__(coordinator=coordinator)
-        _LOGGER.debug("Initiating Entity - FeedIn")
-        self._attr_name = name + " - FeedIn"
-        self._attr_unique_id = deviceID + "feedIn"
-        self.status = namedtuple(
-            "status",
-            [
-                ATTR_DATE,
-                ATTR_TIME,
-            ],
-        )
 
-    @property
-    def native_value(self) -> str | None:
-        if "feedin" not in self.coordinator.data["report"]:
-            _LOGGER.debug("report feedin None")
+def _residual_energy(data):
+    if data["online"] and data["raw"] and "ResidualEnergy" in data["raw"]:
+        residual = data["raw"]["ResidualEnergy"]
+        if residual > 0:
+            if residual > 50:  # if openAPI scale is invalid (bug)
+                residual = residual / 100
         else:
-            if self.coordinator.data["report"]["feedin"] == 0:
-                energyfeedin = 0
-            else:
-                energyfeedin = self.coordinator.data["report"]["feedin"]
-            return energyfeedin
-        return None
-
-
-class FoxESSEnergyBatCharge(CoordinatorEntity, SensorEntity):
-    _attr_state_class: SensorStateClass = SensorStateClass.TOTAL_INCREASING
-    _attr_device_class = SensorDeviceClass.ENERGY
-    _attr_native_unit_of_measurement = UnitOfEnergy.KILO_WATT_HOUR
+            residual = 0
+        return residual
+    return None
 
-    def __init__(self, coordinator, name, deviceID):
-        super().__init__(coordinator=coordinator)
-        _LOGGER.debug("Initiating Entity - Bat Charge")
-        self._attr_name = name + " - Bat Charge"
-        self._attr_unique_id = deviceID + "bat-charge"
-        self.status = namedtuple(
-            "status",
-            [
-                ATTR_DATE,
-                ATTR_TIME,
-            ],
-        )
 
-    @property
-    def native_value(self) -> str | None:
-        if "chargeEnergyToTal" not in self.coordinator.data["report"]:
-            _LOGGER.debug("report chargeEnergyToTal None")
-        else:
-            if self.coordinator.data["report"]["chargeEnergyToTal"] == 0:
-                energycharge = 0
-            else:
-                energycharge = self.coordinator.data["report"]["chargeEnergyToTal"]
-            return energycharge
+def _inverter_state(data):
+    if data["night"]:
+        return "night"
+    status = data["addressbook"].get("status")
+    if status is None:
+        _LOGGER.debug("addressbook status None")
         return None
+    status = int(status)
+    if data["online"] or status in [1, 2, 3]:
+        return INVERTER_STATES.get(status, "off-line")
+    return None
 
-class FoxESSMaxBatChargeCurrent(CoordinatorEntity, SensorEntity):
-    _attr_state_class: SensorStateClass = SensorStateClass.MEASUREMENT
-    _attr_device_class = SensorDeviceClass.CURRENT
-    _attr_native_unit_of_measurement = UnitOfElectricCurrent.AMPERE
 
-    def __init__(self, coordinator, name, deviceID):
-        super().__init__(coordinator=coordinator)
-        _LOGGER.debug("Initiating Entity - Max Bat Charge Current")
-        self._attr_name = name + " - Max Bat Charge Current"
-        self._attr_unique_id = deviceID + "max-bat-charge-charge"
-        self.status = namedtuple(
-            "status",
-            [
-                ATTR_DATE,
-                ATTR_TIME,
-            ],
-        )
-
-    @property
-    def native_value(self) -> str | None:
-        if "maxChargeCurrent" not in self.coordinator.data["raw"]:
-            _LOGGER.debug("report maxChargeCurrent None")
-        else:
-            if self.coordinator.data["raw"]["maxChargeCurrent"] == 0:
-                charge = 0
-            else:
-                charge = self.coordinator.data["raw"]["maxChargeCurrent"]
-            return charge
+def _inverter_attributes(data):
+    addressbook = data["addressbook"]
+    if "status" not in addressbook:
+        _LOGGER.debug("addressbook status attributes None")
         return None
+    return {
+        ATTR_DEVICE_SN: addressbook[ATTR_DEVICE_SN],
+        ATTR_PLANTNAME: addressbook[ATTR_PLANTNAME],
+        ATTR_MODULESN: addressbook[ATTR_MODULESN],
+        ATTR_DEVICE_TYPE: addressbook[ATTR_DEVICE_TYPE],
+        ATTR_MASTER: addressbook[ATTR_MASTER],
+        ATTR_MANAGER: addressbook[ATTR_MANAGER],
+        ATTR_SLAVE: addressbook[ATTR_SLAVE],
+        ATTR_BATTERYLIST: addressbook[ATTR_BATTERYLIST],
+        ATTR_LASTCLOUDSYNC: data["restored"] or datetime.now(),
+    }
 
-class FoxESSMaxBatDischargeCurrent(CoordinatorEntity, SensorEntity):
-    _attr_state_class: SensorStateClass = SensorStateClass.MEASUREMENT
-    _attr_device_class = SensorDeviceClass.CURRENT
-    _attr_native_unit_of_measurement = UnitOfElectricCurrent.AMPERE
-
-    def __init__(self, coordinator, name, deviceID):
-        super().__init__(coordinator=coordinator)
-        _LOGGER.debug("Initiating Entity - Max Bat Discharge Current")
-        self._attr_name = name + " - Max Bat Discharge Current"
-        self._attr_unique_id = deviceID + "max-bat-discharge-charge"
-        self.status = namedtuple(
-            "status",
-            [
-                ATTR_DATE,
-                ATTR_TIME,
-            ],
-        )
 
-    @property
-    def native_value(self) -> str | None:
-        if "maxDischargeCurrent" not in self.coordinator.data["raw"]:
-            _LOGGER.debug("report maxDischargeCurrent None")
-        else:
-            if self.coordinator.data["raw"]["maxDischargeCurrent"] == 0:
-                charge = 0
-            else:
-                charge = self.coordinator.data["raw"]["maxDischargeCurrent"]
-            return charge
+def _health_attributes(data):
+    health = data["health"]
+    if not health:
         return None
+    return {
+        "rate_limited": health["rate_limited"],
+        "endpoints": health["endpoints"],
+    }
 
 
-class FoxESSEnergyBatDischarge(CoordinatorEntity, SensorEntity):
-    _attr_state_class: SensorStateClass = SensorStateClass.TOTAL_INCREASING
-    _attr_device_class = SensorDeviceClass.ENERGY
-    _attr_native_unit_of_measurement = UnitOfEnergy.KILO_WATT_HOUR
-
-    def __init__(self, coordinator, name, deviceID):
-        super().__init__(coordinator=coordinator)
-        _LOGGER.debug("Initiating Entity - Bat Discharge")
-        self._attr_name = name + " - Bat Discharge"
-        self._attr_unique_id = deviceID + "bat-discharge"
-        self.status = namedtuple(
-            "status",
-            [
-                ATTR_DATE,
-                ATTR_TIME,
-            ],
-        )
+def _latency_attributes(percentile):
+    """The percentile of each endpoint."""
 
-    @property
-    def native_value(self) -> str | None:
-        if "dischargeEnergyToTal" not in self.coordinator.data["report"]:
-            _LOGGER.debug("report dischargeEnergyToTal None")
-        else:
-            if self.coordinator.data["report"]["dischargeEnergyToTal"] == 0:
-                energydischarge = 0
-            else:
-                energydischarge = self.coordinator.data["report"][
-                    "dischargeEnergyToTal"
-                ]
-            return energydischarge
-        return None
+    def attributes(data):
+        metrics = data["metrics"]
+        if not metrics:
+            return None
+        return {path: stats[percentile] for path, stats in metrics["endpoints"].items()}
 
+    return attributes
 
-class FoxESSEnergyLoad(CoordinatorEntity, SensorEntity):
-    _attr_state_class: SensorStateClass = SensorStateClass.TOTAL_INCREASING
-    _attr_device_class = SensorDeviceClass.ENERGY
-    _attr_native_unit_of_measurement = UnitOfEnergy.KILO_WATT_HOUR
 
-    def __init__(self, coordinator, name, deviceID):
-        super().__init__(coordinator=coordinator)
-        _LOGGER.debug("Initiating Entity - Load")
-        self._attr_name = name + " - Load"
-        self._attr_unique_id = deviceID + "load"
-        self.status = namedtuple(
-            "status",
-            [
-                ATTR_DATE,
-                ATTR_TIME,
-            ],
-        )
-
-    @property
-    def native_value(self) -> str | None:
-        if "loads" not in self.coordinator.data["report"]:
-            _LOGGER.debug("report loads None")
-        else:
-            if self.coordinator.data["report"]["loads"] == 0:
-                energyload = 0
-            else:
-                energyload = self.coordinator.data["report"]["loads"]
-            # round
-            return round(energyload, 3)
+def _error_attributes(data):
+    metrics = data["metrics"]
+    if not metrics:
         return None
+    return {
+        path: {"success": stats["success"], "error": stats["error"], "timeout": stats["timeout"]}
+        for path, stats in metrics["endpoints"].items()
+    }
 
 
-class FoxESSPVEnergyTotal(CoordinatorEntity, SensorEntity):
-    _attr_state_class: SensorStateClass = SensorStateClass.TOTAL_INCREASING
-    _attr_device_class = SensorDeviceClass.ENERGY
-    _attr_native_unit_of_measurement = UnitOfEnergy.KILO_WATT_HOUR
-
-    def __init__(self, coordinator, name, deviceID):
-        super().__init__(coordinator=coordinator)
-        _LOGGER.debug("Initiating Entity - PV Energy Total")
-        self._attr_name = name + " - PVEnergyTotal"
-        self._attr_unique_id = deviceID + "PVEnergyTotal"
-        self.status = namedtuple(
-            "status",
-            [
-                ATTR_DATE,
-                ATTR_TIME,
-            ],
-        )
-
-    @property
-    def native_value(self) -> str | None:
-        if "PVEnergyTotal" not in self.coordinator.data["report"]:
-            _LOGGER.debug("report PVEnergyTotal None")
-        else:
-            if self.coordinator.data["report"]["PVEnergyTotal"] == 0:
-                energyload = 0
-            else:
-                energyload = self.coordinator.data["report"]["PVEnergyTotal"]
-            # round
-            return round(energyload, 3)
+def _quota_attributes(data):
+    quota = data["quota"]
+    if not quota:
         return None
+    return {
+        "budget": quota["budget"],
+        "projected": quota["projected"],
+        "stretch": quota["stretch"],
+        "refused": quota["refused"],
+    }
 
 
-class FoxESSInverter(CoordinatorEntity, SensorEntity):
-    def __init__(self, coordinator, name, deviceID):
-        super().__init__(coordinator=coordinator)
-        _LOGGER.debug("Initiating Entity - Inverter")
-        self._attr_name = name + " - Inverter"
-        self._attr_unique_id = deviceID + "Inverter"
-        self._attr_icon = "mdi:solar-power"
-        self.status = namedtuple(
-            "status",
-            [
-                ATTR_DATE,
-                ATTR_TIME,
-                ATTR_DEVICE_SN,
-                ATTR_PLANTNAME,
-                ATTR_MODULESN,
-                ATTR_DEVICE_TYPE,
-                ATTR_MASTER,
-                ATTR_MANAGER,
-                ATTR_SLAVE,
-                ATTR_BATTERYLIST,
-                ATTR_LASTCLOUDSYNC,
-            ],
-        )
-
-    @property
-    def native_value(self) -> str | None:
-        if self.coordinator.data["online"] or (
-            self.coordinator.data["online"] == False
-            and int(self.coordinator.data["addressbook"]["status"]) in [1, 2, 3]
-        ):
-            if "status" not in self.coordinator.data["addressbook"]:
-                _LOGGER.debug("addressbook status None")
-            else:
-                if int(self.coordinator.data["addressbook"]["status"]) == 1:
-                    return "on-line"
-                else:
-                    if int(self.coordinator.data["addressbook"]["status"]) == 2:
-                        return "in-alarm"
-                    else:
-                        return "off-line"
-        return None
+def _month_attributes(key):
+    """This month's total so far, from the report history."""
 
-    @property
-    def extra_state_attributes(self):           
-        if "status" not in self.coordinator.data["addressbook"]:
-            _LOGGER.debug("addressbook status attributes None")
+    def attributes(data):
+        if key not in data["reportMonth"]:
             return None
-        return {
-            ATTR_DEVICE_SN: self.coordinator.data["addressbook"][ATTR_DEVICE_SN],
-            ATTR_PLANTNAME: self.coordinator.data["addressbook"][ATTR_PLANTNAME],
-            ATTR_MODULESN: self.coordinator.data["addressbook"][ATTR_MODULESN],
-            ATTR_DEVICE_TYPE: self.coordinator.data["addressbook"][ATTR_DEVICE_TYPE],
-            ATTR_MASTER: self.coordinator.data["addressbook"][ATTR_MASTER],
-            ATTR_MANAGER: self.coordinator.data["addressbook"][ATTR_MANAGER],
-            ATTR_SLAVE: self.coordinator.data["addressbook"][ATTR_SLAVE],
-            ATTR_BATTERYLIST: self.coordinator.data["addressbook"][ATTR_BATTERYLIST],
-            ATTR_LASTCLOUDSYNC: datetime.now(),
-        }
-
-
-class FoxESSRunningState(CoordinatorEntity, SensorEntity):
-    def __init__(self, coordinator, name, deviceID, nameValue, uniqueValue, keyValue):
-        super().__init__(coordinator=coordinator)
-        self._nameValue = nameValue
-        self._uniqueValue = uniqueValue
-        self._keyValue = keyValue
-        _LOGGER.debug("Initiating Entity - %s", self._nameValue)
-        self._attr_name = f"{name} - {self._nameValue}"
-        self._attr_unique_id = f"{deviceID}{self._uniqueValue}"
-        self._attr_icon = "mdi:state-machine"
-        self.status = namedtuple(
-            "status",
-            [
-                ATTR_DATE,
-                ATTR_TIME,
-            ],
-        )
-
-    @property
-    def native_value(self) -> str | None:
-        if self.coordinator.data["raw"]:
-            if self._keyValue not in self.coordinator.data["raw"]:
-                _LOGGER.debug("%s None", self._keyValue)
-            else:
-                res = self.coordinator.data["raw"][self._keyValue]
-                if res == "160":
-                    resText = f"{res}: self-test"
-                elif res == "161":
-                    resText = f"{res}: waiting"
-                elif res == "162":
-                    resText = f"{res}: checking"
-                elif res == "163":
-                    resText = f"{res}: on-grid"
-                elif res == "164":
-                    resText = f"{res}: off-grid"
-                elif res == "165":
-                    resText = f"{res}: fault"
-                elif res == "166":
-                    resText = f"{res}: permanent-fault"
-                elif res == "167":
-                    resText = f"{res}: standby"
-                elif res == "168":
-                    resText = f"{res}: upgrading"
-                elif res == "169":
-                    resText = f"{res}: fct"
-                elif res == "170":
-                    resText = f"{res}: illegal"
-                else:
-                    _LOGGER.debug("runcode %s", res)
-                    resText = f"{res}: unknown code"
-                return resText
-        return None
-
-
-class FoxESSEnergySolar(CoordinatorEntity, SensorEntity):
-    _attr_state_class: SensorStateClass = SensorStateClass.TOTAL_INCREASING
-    _attr_device_class = SensorDeviceClass.ENERGY
-    _attr_native_unit_of_measurement = UnitOfEnergy.KILO_WATT_HOUR
-
-    def __init__(self, coordinator, name, deviceID):
-        super().__init__(coordinator=coordinator)
-        _LOGGER.debug("Initiating Entity - Solar")
-        self._attr_name = name + " - Solar"
-        self._attr_unique_id = deviceID + "solar"
-        self.status = namedtuple(
-            "status",
-            [
-                ATTR_DATE,
-                ATTR_TIME,
-            ],
-        )
-
-    @property
-    def native_value(self) -> float | None:
-        if "loads" not in self.coordinator.data["report"]:
-            loads = 0
-        else:
-            loads = float(self.coordinator.data["report"]["loads"])
-
-        if "chargeEnergyToTal" not in self.coordinator.data["report"]:
-            charge = 0
-        else:
-            charge = float(self.coordinator.data["report"]["chargeEnergyToTal"])
-
-        if "feedin" not in self.coordinator.data["report"]:
-            feedIn = 0
-        else:
-            feedIn = float(self.coordinator.data["report"]["feedin"])
-
-        if "gridConsumption" not in self.coordinator.data["report"]:
-            gridConsumption = 0
-        else:
-            gridConsumption = float(self.coordinator.data["report"]["gridConsumption"])
-
-        if "dischargeEnergyToTal" not in self.coordinator.data["report"]:
-            discharge = 0
-        else:
-            discharge = float(self.coordinator.data["report"]["dischargeEnergyToTal"])
-
-        energysolar = round((loads + charge + feedIn - gridConsumption - discharge), 3)
-        if energysolar < 0:
-            energysolar = 0
-        return round(energysolar, 3)
-
-
-class FoxESSSolarPower(CoordinatorEntity, SensorEntity):
-    _attr_state_class: SensorStateClass = SensorStateClass.MEASUREMENT
-    _attr_device_class = SensorDeviceClass.POWER
-    _attr_native_unit_of_measurement = UnitOfPower.KILO_WATT
-
-    def __init__(self, coordinator, name, deviceID):
-        super().__init__(coordinator=coordinator)
-        _LOGGER.debug("Initiating Entity - Solar Power")
-        self._attr_name = name + " - Solar Power"
-        self._attr_unique_id = deviceID + "solar-power"
-        self.status = namedtuple(
-            "status",
-            [
-                ATTR_DATE,
-                ATTR_TIME,
-            ],
-        )
-
-    @property
-    def native_value(self) -> float | None:
-        if "loadsPower" not in self.coordinator.data["raw"]:
-            loads = 0
-        else:
-            loads = float(self.coordinator.data["raw"]["loadsPower"])
-
-        if "batChargePower" not in self.coordinator.data["raw"]:
-            charge = 0
-        else:
-            if self.coordinator.data["raw"]["batChargePower"] is None:
-                charge = 0
-            else:
-                charge = float(self.coordinator.data["raw"]["batChargePower"])
-
-        if "feedinPower" not in self.coordinator.data["raw"]:
-            feedIn = 0
-        else:
-            feedIn = float(self.coordinator.data["raw"]["feedinPower"])
-
-        if "gridConsumptionPower" not in self.coordinator.data["raw"]:
-            gridConsumption = 0
-        else:
-            gridConsumption = float(
-                self.coordinator.data["raw"]["gridConsumptionPower"]
-            )
-
-        if "batDischargePower" not in self.coordinator.data["raw"]:
-            discharge = 0
-        else:
-            if self.coordinator.data["raw"]["batDischargePower"] is None:
-                discharge = 0
-            else:
-                discharge = float(self.coordinator.data["raw"]["batDischargePower"])
-
-        # check if what was returned (that some time was negative) is <0, so fix it
-        total = loads + charge + feedIn - gridConsumption - discharge
-        if total < 0:
-            total = 0
-        return round(total, 3)
-
-
-class FoxESSBatSoC(CoordinatorEntity, SensorEntity):
-    _attr_device_class = SensorDeviceClass.BATTERY
-    _attr_native_unit_of_measurement = "%"
+        return {ATTR_MONTH_TO_DATE: data["reportMonth"][key]}
+
+    return attributes
+
+
+@dataclass(frozen=True, kw_only=True)
+class FoxESSSensorEntityDescription(SensorEntityDescription):
+    """Describes a FoxESS sensor, value_fn reads its state from the coordinator data."""
+
+    unique_suffix: str
+    value_fn: Callable[[dict], Any]
+    attributes_fn: Callable[[dict], dict | None] | None = None
+    battery_icon: bool = False
+    # (bucket, key) pairs of allData the value is computed from, None writes on every update
+    sources: frozenset | None = None
+
+
+_MEASUREMENT = {"state_class": SensorStateClass.MEASUREMENT}
+_TOTAL = {
+    "state_class": SensorStateClass.TOTAL_INCREASING,
+    "device_class": SensorDeviceClass.ENERGY,
+    "native_unit_of_measurement": UnitOfEnergy.KILO_WATT_HOUR,
+}
+_CURRENT = {
+    **_MEASUREMENT,
+    "device_class": SensorDeviceClass.CURRENT,
+    "native_unit_of_measurement": UnitOfElectricCurrent.AMPERE,
+}
+_POWER = {
+    **_MEASUREMENT,
+    "device_class": SensorDeviceClass.POWER,
+    "native_unit_of_measurement": UnitOfPower.KILO_WATT,
+}
+_VOLT = {
+    **_MEASUREMENT,
+    "device_class": SensorDeviceClass.VOLTAGE,
+    "native_unit_of_measurement": UnitOfElectricPotential.VOLT,
+}
+_FREQ = {
+    **_MEASUREMENT,
+    "device_class": SensorDeviceClass.FREQUENCY,
+    "native_unit_of_measurement": UnitOfFrequency.HERTZ,
+}
+_TEMP = {
+    "device_class": SensorDeviceClass.TEMPERATURE,
+    "native_unit_of_measurement": UnitOfTemperature.CELSIUS,
+}
+_SOC = {
+    "device_class": SensorDeviceClass.BATTERY,
+    "native_unit_of_measurement": PERCENTAGE,
+    "battery_icon": True,
+}
+
+
+def _online_sources(bucket, *keys):
+    return frozenset({("online", None), *((bucket, key) for key in keys)})
+
+
+def _sources(bucket, *keys):
+    return frozenset((bucket, key) for key in keys)
+
+
+def _report_sources(key):
+    return _sources("report", key) | _sources("reportMonth", key)
+
+
+def _energy_sources(key):
+    return _report_sources(key) | _sources("estimate", key)
+
+
+def _raw_sensor(kind, nameValue, uniqueValue, keyValue):
+    return FoxESSSensorEntityDescription(
+        key=keyValue,
+        name=nameValue,
+        unique_suffix=uniqueValue,
+        value_fn=_online_value("raw", keyValue),
+        sources=_online_sources("raw", keyValue),
+        **kind,
+    )
 
-    def __init__(self, coordinator, name, deviceID, nameValue, uniqueValue, keyValue):
-        super().__init__(coordinator=coordinator)
-        self._nameValue = nameValue
-        self._uniqueValue = uniqueValue
-        self._keyValue = keyValue
-        _LOGGER.debug("Initiating Entity - %s", self._nameValue)
-        self._attr_name = f"{name} - {self._nameValue}"
-        self._attr_unique_id = f"{deviceID}{self._uniqueValue}"
-        self.status = namedtuple(
-            "status",
-            [
-                ATTR_DATE,
-                ATTR_TIME,
-            ],
-        )
 
-    @property
-    def native_value(self) -> float | None:
-        if self.coordinator.data["online"] and self.coordinator.data["raw"]:
-            if self._keyValue not in self.coordinator.data["raw"]:
-                _LOGGER.debug("%s None", self._keyValue)
-            else:
-                return self.coordinator.data["raw"][self._keyValue]
-        return None
+def _derived_sensor(config):
+    """Sensor of a derived metric from the platform config."""
+    key = derived_key(config)
+    return FoxESSSensorEntityDescription(
+        key=key,
+        name=config[CONF_NAME],
+        unique_suffix=f"derived-{key}",
+        value_fn=_derived_value(key),
+        sources=_sources("derived", key),
+        native_unit_of_measurement=config.get(CONF_UNIT_OF_MEASUREMENT),
+        device_class=config.get(CONF_DEVICE_CLASS),
+        state_class=config.get(CONF_STATE_CLASS),
+    )
 
-    @property
-    def icon(self):
-        return icon_for_battery_level(battery_level=self.native_value, charging=None)
 
+def _pv_string(n):
+    return (
+        _raw_sensor(_CURRENT, f"PV{n} Current", f"pv{n}-current", f"pv{n}Current"),
+        _raw_sensor(_POWER, f"PV{n} Power", f"pv{n}-power", f"pv{n}Power"),
+        _raw_sensor(_VOLT, f"PV{n} Volt", f"pv{n}-volt", f"pv{n}Volt"),
+    )
 
-class FoxESSBatMinSoC(CoordinatorEntity, SensorEntity):
-    _attr_device_class = SensorDeviceClass.BATTERY
-    _attr_native_unit_of_measurement = "%"
 
-    def __init__(self, coordinator, name, deviceID):
-        super().__init__(coordinator=coordinator)
-        _LOGGER.debug("Initiating Entity - Bat MinSoC")
-        self._attr_name = name + " - Bat MinSoC"
-        self._attr_unique_id = deviceID + "bat-minsoc"
-        self.status = namedtuple(
-            "status",
-            [
-                ATTR_DATE,
-                ATTR_TIME,
-            ],
+SENSORS: tuple[FoxESSSensorEntityDescription, ...] = (
+    *(description for n in range(1, 7) for description in _pv_string(n)),
+    _raw_sensor(_POWER, "PV Power", "pv-power", "pvPower"),
+    _raw_sensor(_CURRENT, "R Current", "r-current", "RCurrent"),
+    _raw_sensor(_FREQ, "R Freq", "r-freq", "RFreq"),
+    _raw_sensor(_POWER, "R Power", "r-power", "RPower"),
+    _raw_sensor(_POWER, "Meter2 Power", "meter2-power", "meterPower2"),
+    _raw_sensor(_VOLT, "R Volt", "r-volt", "RVolt"),
+    _raw_sensor(_CURRENT, "S Current", "s-current", "SCurrent"),
+    _raw_sensor(_FREQ, "S Freq", "s-freq", "SFreq"),
+    _raw_sensor(_POWER, "S Power", "s-power", "SPower"),
+    _raw_sensor(_VOLT, "S Volt", "s-volt", "SVolt"),
+    _raw_sensor(_CURRENT, "T Current", "t-current", "TCurrent"),
+    _raw_sensor(_FREQ, "T Freq", "t-freq", "TFreq"),
+    _raw_sensor(_POWER, "T Power", "t-power", "TPower"),
+    _raw_sensor(_VOLT, "T Volt", "t-volt", "TVolt"),
+    FoxESSSensorEntityDescription(
+        key="ReactivePower",
+        name="Reactive Power",
+        unique_suffix="reactive-power",
+        value_fn=_online_value("raw", "ReactivePower", scale=1000),
+        sources=_online_sources("raw", "ReactivePower"),
+        device_class=SensorDeviceClass.REACTIVE_POWER,
+        native_unit_of_measurement=UnitOfReactivePower.VOLT_AMPERE_REACTIVE,
+        **_MEASUREMENT,
+    ),
+    FoxESSSensorEntityDescription(
+        key="PowerFactor",
+        name="Power Factor",
+        unique_suffix="power-factor",
+        value_fn=_online_value("raw", "PowerFactor"),
+        sources=_online_sources("raw", "PowerFactor"),
+        device_class=SensorDeviceClass.POWER_FACTOR,
+        native_unit_of_measurement=PERCENTAGE,
+        **_MEASUREMENT,
+    ),
+    _raw_sensor(_TEMP, "Bat Temperature", "bat-temperature", "batTemperature"),
+    _raw_sensor(_TEMP, "Bat Temperature2", "bat-temperature2", "batTemperature_2"),
+    _raw_sensor(_TEMP, "Ambient Temperature", "ambient-temperature", "ambientTemperation"),
+    _raw_sensor(_TEMP, "Boost Temperature", "boost-temperature", "boostTemperation"),
+    _raw_sensor(_TEMP, "Inv Temperature", "inv-temperature", "invTemperation"),
+    _raw_sensor(_SOC, "Bat SoC", "bat-soc", "SoC"),
+    _raw_sensor(_SOC, "Bat SoC1", "bat-soc1", "SoC_1"),
+    _raw_sensor(_SOC, "Bat SoC2", "bat-soc2", "SoC_2"),
+    _raw_sensor(_SOC, "Bat SoH", "bat-soh", "SOH"),
+    _raw_sensor(_POWER, "Inverter Bat Power", "inv-Bat-Power", "invBatPower"),
+    _raw_sensor(_POWER, "Inverter Bat Power2", "inv-Bat-Power2", "invBatPower_2"),
+    FoxESSSensorEntityDescription(
+        key="minSoc",
+        name="Bat MinSoC",
+        unique_suffix="bat-minsoc",
+        value_fn=_online_value("battery", "minSoc"),
+        sources=_online_sources("battery", "minSoc"),
+        **_SOC,
+    ),
+    FoxESSSensorEntityDescription(
+        key="minSocOnGrid",
+        name="Bat minSocOnGrid",
+        unique_suffix="bat-minSocOnGrid",
+        value_fn=_online_value("battery", "minSocOnGrid"),
+        sources=_online_sources("battery", "minSocOnGrid"),
+        **_SOC,
+    ),
+    FoxESSSensorEntityDescription(
+        key="solarPower",
+        name="Solar Power",
+        unique_suffix="solar-power",
+        value_fn=_derived_value("solarPower"),
+        sources=_sources("derived", "solarPower"),
+        **_POWER,
+    ),
+    FoxESSSensorEntityDescription(
+        key="energyThroughput",
+        name="Energy Throughput",
+        unique_suffix="energy-throughput",
+        value_fn=_positive_value("raw", "energyThroughput"),
+        sources=_sources("raw", "energyThroughput"),
+        **_TOTAL,
+    ),
+    FoxESSSensorEntityDescription(
+        key="solar",
+        name="Solar",
+        unique_suffix="solar",
+        value_fn=_derived_value("solar"),
+        sources=_sources("derived", "solar"),
+        **_TOTAL,
+    ),
+    FoxESSSensorEntityDescription(
+        key="status",
+        name="Inverter",
+        unique_suffix="Inverter",
+        icon="mdi:solar-power",
+        value_fn=_inverter_state,
+        # no sources, the lastCloudSync attribute is refreshed on every update
+        attributes_fn=_inverter_attributes,
+    ),
+    _raw_sensor(_POWER, "Generation Power", "-generation-power", "generationPower"),
+    _raw_sensor(_POWER, "Grid Consumption Power", "grid-consumption-power", "gridConsumptionPower"),
+    _raw_sensor(_POWER, "FeedIn Power", "feedIn-power", "feedinPower"),
+    _raw_sensor(_POWER, "Bat Discharge Power", "bat-discharge-power", "batDischargePower"),
+    _raw_sensor(_POWER, "Bat Charge Power", "bat-charge-power", "batChargePower"),
+    _raw_sensor(_POWER, "Load Power", "load-power", "loadsPower"),
+    FoxESSSensorEntityDescription(
+        key="value",
+        name="Energy Generated",
+        unique_suffix="energy-generated",
+        value_fn=_positive_value("reportDailyGeneration", "value"),
+        sources=_sources("reportDailyGeneration", "value"),
+        **_TOTAL,
+    ),
+    FoxESSSensorEntityDescription(
+        key="month",
+        name="Energy Generated Month",
+        unique_suffix="energy-generated-month",
+        value_fn=_positive_value("reportDailyGeneration", "month"),
+        sources=_sources("reportDailyGeneration", "month"),
+        **_TOTAL,
+    ),
+    FoxESSSensorEntityDescription(
+        key="cumulative",
+        name="Energy Generated Cumulative",
+        unique_suffix="energy-generated-cumulative",
+        value_fn=_positive_value("reportDailyGeneration", "cumulative"),
+        sources=_sources("reportDailyGeneration", "cumulative"),
+        **_TOTAL,
+    ),
+    FoxESSSensorEntityDescription(
+        key="gridConsumption",
+        name="Grid Consumption",
+        unique_suffix="grid-consumption",
+        value_fn=_energy_value("gridConsumption"),
+        sources=_energy_sources("gridConsumption"),
+        attributes_fn=_month_attributes("gridConsumption"),
+        **_TOTAL,
+    ),
+    FoxESSSensorEntityDescription(
+        key="feedin",
+        name="FeedIn",
+        unique_suffix="feedIn",
+        value_fn=_energy_value("feedin"),
+        sources=_energy_sources("feedin"),
+        attributes_fn=_month_attributes("feedin"),
+        **_TOTAL,
+    ),
+    FoxESSSensorEntityDescription(
+        key="chargeEnergyToTal",
+        name="Bat Charge",
+        unique_suffix="bat-charge",
+        value_fn=_energy_value("chargeEnergyToTal"),
+        sources=_energy_sources("chargeEnergyToTal"),
+        attributes_fn=_month_attributes("chargeEnergyToTal"),
+        **_TOTAL,
+    ),
+    FoxESSSensorEntityDescription(
+        key="dischargeEnergyToTal",
+        name="Bat Discharge",
+        unique_suffix="bat-discharge",
+        value_fn=_energy_value("dischargeEnergyToTal"),
+        sources=_energy_sources("dischargeEnergyToTal"),
+        attributes_fn=_month_attributes("dischargeEnergyToTal"),
+        **_TOTAL,
+    ),
+    FoxESSSensorEntityDescription(
+        key="loads",
+        name="Load",
+        unique_suffix="load",
+        value_fn=_energy_value("loads", ndigits=3),
+        sources=_energy_sources("loads"),
+        attributes_fn=_month_attributes("loads"),
+        **_TOTAL,
+    ),
+    FoxESSSensorEntityDescription(
+        key="PVEnergyTotal",
+        name="PVEnergyTotal",
+        unique_suffix="PVEnergyTotal",
+        value_fn=_report_value("report", "PVEnergyTotal", ndigits=3),
+        sources=_report_sources("PVEnergyTotal"),
+        attributes_fn=_month_attributes("PVEnergyTotal"),
+        **_TOTAL,
+    ),
+    FoxESSSensorEntityDescription(
+        key="ResidualEnergy",
+        name="Residual Energy",
+        unique_suffix="residual-energy",
+        value_fn=_residual_energy,
+        sources=_online_sources("raw", "ResidualEnergy"),
+        device_class=SensorDeviceClass.ENERGY,
+        native_unit_of_measurement=UnitOfEnergy.KILO_WATT_HOUR,
+    ),
+    FoxESSSensorEntityDescription(
+        key="ResponseTime",
+        name="Response Time",
+        unique_suffix="response-time",
+        value_fn=_report_value("raw", "ResponseTime"),
+        sources=_sources("raw", "ResponseTime"),
+        native_unit_of_measurement="mS",
+    ),
+    FoxESSSensorEntityDescription(
+        key="apiCallsUsed",
+        name="API Calls Used",
+        unique_suffix="api-calls-used",
+        icon="mdi:counter",
+        value_fn=_report_value("quota", "used"),
+        attributes_fn=_quota_attributes,
+        sources=_sources("quota", "used", "budget", "projected", "stretch", "refused"),
+        **_MEASUREMENT,
+    ),
+    FoxESSSensorEntityDescription(
+        key="apiCallsRemaining",
+        name="API Calls Remaining",
+        unique_suffix="api-calls-remaining",
+        icon="mdi:counter",
+        value_fn=_report_value("quota", "remaining"),
+        sources=_sources("quota", "remaining"),
+        **_MEASUREMENT,
+    ),
+    FoxESSSensorEntityDescription(
+        key="cloudCircuit",
+        name="Cloud Circuit",
+        unique_suffix="cloud-circuit",
+        icon="mdi:electric-switch",
+        entity_category=EntityCategory.DIAGNOSTIC,
+        value_fn=_report_value("health", "state"),
+        attributes_fn=_health_attributes,
+        sources=_sources("health", "state", "rate_limited", "endpoints"),
+    ),
+    FoxESSSensorEntityDescription(
+        key="cloudFailures",
+        name="Cloud Failures",
+        unique_suffix="cloud-failures",
+        icon="mdi:cloud-alert",
+        entity_category=EntityCategory.DIAGNOSTIC,
+        value_fn=_report_value("health", "failures"),
+        sources=_sources("health", "failures"),
+        **_MEASUREMENT,
+    ),
+    *(
+        FoxESSSensorEntityDescription(
+            key=f"cloudLatency{percentile}",
+            name=f"Cloud Latency {percentile}",
+            unique_suffix=f"cloud-latency-{percentile}",
+            icon="mdi:timer-outline",
+            entity_category=EntityCategory.DIAGNOSTIC,
+            value_fn=_report_value("metrics", percentile),
+            attributes_fn=_latency_attributes(percentile),
+            sources=_sources("metrics", percentile, "endpoints"),
+            device_class=SensorDeviceClass.DURATION,
+            native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+            **_MEASUREMENT,
         )
+        for percentile in ("p50", "p95", "p99")
+    ),
+    FoxESSSensorEntityDescription(
+        key="cloudErrors",
+        name="Cloud Errors",
+        unique_suffix="cloud-errors",
+        icon="mdi:cloud-cancel",
+        entity_category=EntityCategory.DIAGNOSTIC,
+        value_fn=_report_value("metrics", "errors"),
+        attributes_fn=_error_attributes,
+        sources=_sources("metrics", "errors", "endpoints"),
+        **_MEASUREMENT,
+    ),
+    FoxESSSensorEntityDescription(
+        key="cloudTimeouts",
+        name="Cloud Timeouts",
+        unique_suffix="cloud-timeouts",
+        icon="mdi:timer-alert-outline",
+        entity_category=EntityCategory.DIAGNOSTIC,
+        value_fn=_report_value("metrics", "timeouts"),
+        sources=_sources("metrics", "timeouts"),
+        **_MEASUREMENT,
+    ),
+    FoxESSSensorEntityDescription(
+        key="maxChargeCurrent",
+        name="Max Bat Charge Current",
+        unique_suffix="max-bat-charge-charge",
+        value_fn=_report_value("raw", "maxChargeCurrent"),
+        sources=_sources("raw", "maxChargeCurrent"),
+        **_CURRENT,
+    ),
+    FoxESSSensorEntityDescription(
+        key="maxDischargeCurrent",
+        name="Max Bat Discharge Current",
+        unique_suffix="max-bat-discharge-charge",
+        value_fn=_report_value("raw", "maxDischargeCurrent"),
+        sources=_sources("raw", "maxDischargeCurrent"),
+        **_CURRENT,
+    ),
+    FoxESSSensorEntityDescription(
+        key="runningState",
+        name="Running State",
+        unique_suffix="running-state",
+        icon="mdi:state-machine",
+        value_fn=_derived_value("runningState"),
+        sources=_sources("derived", "runningState"),
+    ),
+)
 
-    @property
-    def native_value(self) -> float | None:
-        if self.coordinator.data["online"] and self.coordinator.data["battery"]:
-            if "minSoc" not in self.coordinator.data["battery"]:
-                _LOGGER.debug("minSoc None")
-            else:
-                return self.coordinator.data["battery"]["minSoc"]
-        return None
+# Fox R series, PV strings 7-18 only created with extendPV
+SENSORS_EXTENDED_PV: tuple[FoxESSSensorEntityDescription, ...] = tuple(
+    description for n in range(7, 19) for description in _pv_string(n)
+)
 
-    @property
-    def icon(self):
-        return icon_for_battery_level(battery_level=self.native_value, charging=None)
 
+class FoxESSSensor(CoordinatorEntity, SensorEntity):
+    """FoxESS sensor, everything that differs between sensors is in the description."""
 
-class FoxESSBatMinSoConGrid(CoordinatorEntity, SensorEntity):
-    _attr_device_class = SensorDeviceClass.BATTERY
-    _attr_native_unit_of_measurement = "%"
+    entity_description: FoxESSSensorEntityDescription
 
-    def __init__(self, coordinator, name, deviceID):
+    def __init__(self, coordinator, name, deviceID, description):
         super().__init__(coordinator=coordinator)
-        _LOGGER.debug("Initiating Entity - Bat minSocOnGrid")
-        self._attr_name = name + " - Bat minSocOnGrid"
-        self._attr_unique_id = deviceID + "bat-minSocOnGrid"
-        self.status = namedtuple(
-            "status",
-            [
-                ATTR_DATE,
-                ATTR_TIME,
-            ],
-        )
+        self.entity_description = description
+        self._attr_name = f"{name} - {description.name}"
+        self._attr_unique_id = f"{deviceID}{description.unique_suffix}"
 
     @property
-    def native_value(self) -> float | None:
-        if self.coordinator.data["online"] and self.coordinator.data["battery"]:
-            if "minSocOnGrid" not in self.coordinator.data["battery"]:
-                _LOGGER.debug("minSocOnGrid None")
-            else:
-                return self.coordinator.data["battery"]["minSocOnGrid"]
-        return None
+    def native_value(self):
+        return self.entity_description.value_fn(self.coordinator.data)
 
     @property
     def icon(self):
-        return icon_for_battery_level(battery_level=self.native_value, charging=None)
-
-
-class FoxESSTemp(CoordinatorEntity, SensorEntity):
-    _attr_device_class = SensorDeviceClass.TEMPERATURE
-    _attr_native_unit_of_measurement = UnitOfTemperature.CELSIUS
-
-    def __init__(self, coordinator, name, deviceID, nameValue, uniqueValue, keyValue):
-        super().__init__(coordinator=coordinator)
-        self._nameValue = nameValue
-        self._uniqueValue = uniqueValue
-        self._keyValue = keyValue
-        _LOGGER.debug("Initiating Entity - %s", self._nameValue)
-        self._attr_name = f"{name} - {self._nameValue}"
-        self._attr_unique_id = f"{deviceID}{self._uniqueValue}"
-        self.status = namedtuple(
-            "status",
-            [
-                ATTR_DATE,
-                ATTR_TIME,
-            ],
-        )
-
-    @property
-    def native_value(self) -> float | None:
-        if self.coordinator.data["online"] and self.coordinator.data["raw"]:
-            if self._keyValue not in self.coordinator.data["raw"]:
-                _LOGGER.debug("%s None", self._keyValue)
-            else:
-                return self.coordinator.data["raw"][self._keyValue]
-        return None
-
-
-class FoxESSResidualEnergy(CoordinatorEntity, SensorEntity):
-    _attr_device_class = SensorDeviceClass.ENERGY
-    _attr_native_unit_of_measurement = UnitOfEnergy.KILO_WATT_HOUR
-
-    def __init__(self, coordinator, name, deviceID):
-        super().__init__(coordinator=coordinator)
-        _LOGGER.debug("Initiating Entity - Residual Energy")
-        self._attr_name = name + " - Residual Energy"
-        self._attr_unique_id = deviceID + "residual-energy"
-        self.status = namedtuple(
-            "status",
-            [
-                ATTR_DATE,
-                ATTR_TIME,
-            ],
-        )
-
-    @property
-    def native_value(self) -> float | None:
-        if self.coordinator.data["online"] and self.coordinator.data["raw"]:
-            if "ResidualEnergy" not in self.coordinator.data["raw"]:
-                _LOGGER.debug("ResidualEnergy None")
-            else:
-                re = self.coordinator.data["raw"]["ResidualEnergy"]
-                if re > 0:
-                    if re > 50: # if openAPI scale is invalid (bug)
-                        re = re / 100
-                else:
-                    re = 0
-                return re
-        return None
-
-
-class FoxESSResponseTime(CoordinatorEntity, SensorEntity):
-    _attr_native_unit_of_measurement = "mS"
-
-    def __init__(self, coordinator, name, deviceID):
-        super().__init__(coordinator=coordinator)
-        _LOGGER.debug("Initiating Entity - Response Time")
-        self._attr_name = name + " - Response Time"
-        self._attr_unique_id = deviceID + "response-time"
-        self.status = namedtuple(
-            "status",
-            [
-                ATTR_DATE,
-                ATTR_TIME,
-            ],
-        )
+        if self.entity_description.battery_icon:
+            return icon_for_battery_level(battery_level=self.native_value, charging=None)
+        return super().icon
 
     @property
-    def native_value(self) -> float | None:
-        if "ResponseTime" not in self.coordinator.data["raw"]:
-            _LOGGER.debug("ResponseTime None")
-        else:
-            return self.coordinator.data["raw"]["ResponseTime"]
-        return None
+    def extra_state_attributes(self):
+        data = self.coordinator.data
+        attributes = None
+        if self.entity_description.attributes_fn is not None:
+            attributes = self.entity_description.attributes_fn(data)
+        if data["restored"] is not None:
+            attributes = {**(attributes or {}), ATTR_RESTORED: data["restored"]}
+        return attributes
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Only write state when one of the values this sensor reads has changed."""
+        changed = self.coordinator.changed
+        sources = self.entity_description.sources
+        if (
+            changed is not None
+            and sources is not None
+            and sources.isdisjoint(changed)
+            and ("restored", None) not in changed
+        ):
+            self.coordinator.suppressed_writes += 1
+            return
+        super()._handle_coordinator_update()
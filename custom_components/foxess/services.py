@@ -0,0 +1,82 @@
+"""The get_diagnostics service, the YAML platform has no config entry to download diagnostics from.
+
+The get_report_history service serves the daily report totals already kept, without cloud calls.
+"""
+from __future__ import annotations
+
+from homeassistant.core import HomeAssistant, ServiceCall, ServiceResponse, SupportsResponse, callback
+import homeassistant.helpers.config_validation as cv
+from homeassistant.util import dt as dt_util
+import voluptuous as vol
+
+from .const import DOMAIN
+from .reports import report_histories
+
+SERVICE_GET_DIAGNOSTICS = "get_diagnostics"
+SERVICE_GET_REPORT_HISTORY = "get_report_history"
+ATTR_START = "start"
+ATTR_END = "end"
+ATTR_DEVICE_SN = "deviceSN"
+
+REPORT_HISTORY_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_START): cv.date,
+        vol.Optional(ATTR_END): cv.date,
+        vol.Optional(ATTR_DEVICE_SN): cv.string,
+    }
+)
+
+
+@callback
+def async_register_services(hass: HomeAssistant) -> None:
+    """Register the services once, however many inverters are set up."""
+    if hass.services.has_service(DOMAIN, SERVICE_GET_DIAGNOSTICS):
+        return
+
+    async def async_get_diagnostics(call: ServiceCall) -> ServiceResponse:
+        return get_diagnostics(hass)
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_GET_DIAGNOSTICS,
+        async_get_diagnostics,
+        supports_response=SupportsResponse.ONLY,
+    )
+
+    async def async_get_report_history(call: ServiceCall) -> ServiceResponse:
+        return get_report_history(hass, call.data)
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_GET_REPORT_HISTORY,
+        async_get_report_history,
+        schema=REPORT_HISTORY_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
+
+
+@callback
+def get_diagnostics(hass: HomeAssistant) -> dict:
+    """Cloud call metrics per host and the polling state of every inverter."""
+    domain_data = hass.data.get(DOMAIN, {})
+    return {
+        "clients": {
+            domain: client.as_dict() for domain, client in domain_data.get("clients", {}).items()
+        },
+        "inverters": {
+            devicesn: diagnostics() for devicesn, diagnostics in domain_data.get("inverters", {}).items()
+        },
+    }
+
+
+@callback
+def get_report_history(hass: HomeAssistant, data: dict) -> dict:
+    """Daily report totals per inverter, this month so far unless start or end is given."""
+    today = dt_util.now().date()
+    end = data.get(ATTR_END, today)
+    start = data.get(ATTR_START, end.replace(day=1))
+    return {
+        devicesn: history.between(start, end)
+        for devicesn, history in report_histories(hass).items()
+        if data.get(ATTR_DEVICE_SN) in (None, devicesn)
+    }
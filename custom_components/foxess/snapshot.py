@@ -0,0 +1,84 @@
+"""Last known allData of each inverter, kept so entities come up before the cloud answers."""
+from __future__ import annotations
+
+import copy
+from functools import partial
+import logging
+import time
+
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util
+
+from .const import DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_KEY = f"{DOMAIN}.snapshot"
+STORAGE_VERSION = 1
+SAVE_DELAY = 60  # seconds, HA also writes pending saves when it stops
+
+MAX_AGE = 24 * 60 * 60  # seconds, older snapshots are not restored
+# live state worked out again at startup, never restored
+LIVE_BUCKETS = ("quota", "health", "metrics", "restored", "estimate", "derived")
+# today's totals, dropped when the snapshot was taken on another day
+DAILY_BUCKETS = ("report", "reportDailyGeneration", "reportMonth")
+
+
+def save_snapshot(hass, devicesn: str, allData: dict, reports_until: float | None = None) -> None:
+    """Keep a copy of a live update, written to .storage a little later.
+
+    reports_until is when the statistics were last known good, the
+    statistics backfill starts from it after a restart.
+    """
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    snapshots = domain_data.setdefault("snapshots", {})
+    snapshots[devicesn] = {
+        "saved": time.time(),
+        "date": dt_util.now().date().isoformat(),
+        "reports_until": reports_until,
+        "data": {
+            bucket: copy.deepcopy(values)
+            for bucket, values in allData.items()
+            if bucket not in LIVE_BUCKETS
+        },
+    }
+    store = domain_data.get("snapshot_store")
+    if store is not None:
+        store.async_delay_save(partial(_data_to_save, snapshots), SAVE_DELAY)
+
+
+def _data_to_save(snapshots: dict) -> dict:
+    return snapshots
+
+
+def saved_reports_until(hass, devicesn: str) -> float | None:
+    """reports_until of the snapshot loaded at startup, kept however old the snapshot is."""
+    return hass.data.get(DOMAIN, {}).get("snapshots", {}).get(devicesn, {}).get("reports_until")
+
+
+async def async_load_snapshot(hass, devicesn: str, allData: dict) -> float | None:
+    """Fill allData from the last snapshot, return when it was taken or None if there isn't one."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    load = domain_data.get("snapshot_load")
+    if load is None:
+        # one shared store, inverters set up at the same time wait on the same load
+        domain_data["snapshot_store"] = Store(hass, STORAGE_VERSION, STORAGE_KEY)
+        load = hass.async_create_task(domain_data["snapshot_store"].async_load())
+        domain_data["snapshot_load"] = load
+    saved = (await load or {}).get(devicesn)
+    if not saved:
+        return None
+    # keep the snapshot until this inverter's first live update replaces it
+    domain_data.setdefault("snapshots", {}).setdefault(devicesn, saved)
+    age = time.time() - saved["saved"]
+    if age > MAX_AGE:
+        _LOGGER.debug("Snapshot for SN: %s is %d seconds old, not restored", devicesn, age)
+        return None
+    for bucket, values in saved["data"].items():
+        if bucket in LIVE_BUCKETS or bucket not in allData:
+            continue
+        if bucket in DAILY_BUCKETS and saved["date"] != dt_util.now().date().isoformat():
+            continue
+        allData[bucket] = values
+    _LOGGER.debug("Restored the snapshot taken %d seconds ago for SN: %s", age, devicesn)
+    return saved["saved"]
@@ -0,0 +1,95 @@
+"""Parser for the fixed format time field of the real/query reply."""
+from __future__ import annotations
+
+from functools import lru_cache
+import time
+
+# "2025-02-21 16:38:29 GMT+0000"
+TIME_FORMAT_LENGTH = 28
+OFFSET_HORIZON = 366 * 86400  # seconds searched ahead for the next DST change
+_WEEK = 7 * 86400
+
+
+@lru_cache(maxsize=8)
+def _day_seconds(date: str) -> int:
+    """Seconds from the epoch to midnight UTC of a YYYY-MM-DD date."""
+    year = int(date[0:4])
+    month = int(date[5:7])
+    day = int(date[8:10])
+    if date[4] != "-" or date[7] != "-" or not 1 <= month <= 12 or not 1 <= day <= 31:
+        raise ValueError(f"bad date {date!r}")
+    # days from civil, proleptic Gregorian calendar
+    year -= month <= 2
+    era = year // 400
+    year_of_era = year - era * 400
+    day_of_year = (153 * (month + (-3 if month > 2 else 9)) + 2) // 5 + day - 1
+    day_of_era = year_of_era * 365 + year_of_era // 4 - year_of_era // 100 + day_of_year
+    return (era * 146097 + day_of_era - 719468) * 86400
+
+
+def parse_cloud_time(text: str) -> tuple[float, int]:
+    """Split "YYYY-MM-DD HH:MM:SS GMT+HHMM" into the wall time as UTC seconds and its offset."""
+    if len(text) != TIME_FORMAT_LENGTH or text[10] != " " or text[19:23] != " GMT":
+        raise ValueError(f"unexpected time format {text!r}")
+    if text[13] != ":" or text[16] != ":" or text[23] not in "+-":
+        raise ValueError(f"unexpected time format {text!r}")
+    hour = int(text[11:13])
+    minute = int(text[14:16])
+    second = int(text[17:19])
+    if hour > 23 or minute > 59 or second > 60:
+        raise ValueError(f"bad time {text!r}")
+    offset = int(text[24:26]) * 3600 + int(text[26:28]) * 60
+    if text[23] == "-":
+        offset = -offset
+    return _day_seconds(text[0:10]) + hour * 3600 + minute * 60 + second, offset
+
+
+class LocalOffset:
+    """The local UTC offset, worked out again only after the next DST change."""
+
+    def __init__(self) -> None:
+        self.offset = 0
+        self.valid_until = float("-inf")
+
+    def __call__(self, now: float | None = None) -> int:
+        if now is None:
+            now = time.time()
+        if now >= self.valid_until:
+            self.offset = time.localtime(now).tm_gmtoff
+            self.valid_until = self._next_change(now, self.offset)
+        return self.offset
+
+    @staticmethod
+    def _next_change(now: float, offset: int) -> float:
+        # step a week at a time, then bisect down to the second of the change
+        start = int(now)
+        end = start + _WEEK
+        while time.localtime(end).tm_gmtoff == offset:
+            start = end
+            end += _WEEK
+            if end - now > OFFSET_HORIZON:
+                return now + OFFSET_HORIZON
+        while end - start > 1:
+            middle = (start + end) // 2
+            if time.localtime(middle).tm_gmtoff == offset:
+                start = middle
+            else:
+                end = middle
+        return end
+
+
+local_offset = LocalOffset()
+
+
+def cloud_timestamp(text: str, cross_zone: bool = False) -> float:
+    """Epoch seconds of a real/query time field.
+
+    When the cloud's offset differs from the local one the wall time is taken
+    as local time, unless cross_zone (the xtZone option) says to trust the
+    offset the cloud sent.
+    """
+    wall, offset = parse_cloud_time(text)
+    local = local_offset()
+    if offset != local and not cross_zone:
+        offset = local
+    return wall - offset
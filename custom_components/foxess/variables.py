@@ -0,0 +1,126 @@
+"""Learned real/query variable sets, one per inverter serial number."""
+from __future__ import annotations
+
+from functools import partial
+import logging
+import time
+
+from homeassistant.helpers.storage import Store
+
+from .const import DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_KEY = f"{DOMAIN}.variables"
+STORAGE_VERSION = 1
+SAVE_DELAY = 10  # seconds
+
+RELEARN_INTERVAL = 24 * 60 * 60  # seconds between full fetches that relearn the set
+
+
+class VariableSet:
+    """The variables an inverter reports and the entities read.
+
+    The first poll fetches every variable, later polls only request the
+    ones that came back with a value and are consumed. The set is relearnt
+    from a full fetch once a day, or when the consumed variables change.
+    """
+
+    def __init__(self, devicesn: str, consumed, aliases: dict) -> None:
+        self.devicesn = devicesn
+        self.consumed = frozenset(consumed)
+        self.aliases = aliases  # cloud variable name -> allData raw key
+        self.names: list[str] | None = None
+        # consumed variables that came back without a value, parsed as 0
+        self.empty: list[str] = []
+        self.learned_at = 0.0
+        self._learned_for: frozenset = frozenset()
+        self._store: Store | None = None
+        self._data_to_save = None  # every set of the store, set with _store
+
+    @property
+    def stale(self) -> bool:
+        """True when the next fetch must ask for every variable."""
+        return (
+            self.names is None
+            or time.time() - self.learned_at > RELEARN_INTERVAL
+            or not self.consumed <= self._learned_for
+        )
+
+    def learn(self, datas: list) -> None:
+        """Keep the variables of a full fetch that have a value and are consumed."""
+        names = []
+        empty = []
+        for item in datas:
+            variable = item["variable"]
+            if self.aliases.get(variable, variable) not in self.consumed:
+                continue
+            if item.get("value") is None:
+                empty.append(variable)
+            else:
+                names.append(variable)
+        if not names:
+            # nothing to learn from, e.g. an inverter asleep with every value empty
+            _LOGGER.debug("No variable values to learn from for SN: %s", self.devicesn)
+            return
+        self.names = sorted(names)
+        self.empty = sorted(empty)
+        self.learned_at = time.time()
+        self._learned_for = self.consumed
+        _LOGGER.debug(
+            "Learned %s of %s variables for SN: %s", len(self.names), len(datas), self.devicesn
+        )
+        if self._store is not None:
+            self._store.async_delay_save(self._data_to_save, SAVE_DELAY)
+
+    def as_dict(self) -> dict:
+        return {
+            "names": self.names,
+            "empty": self.empty,
+            "learned_at": self.learned_at,
+            "consumed": sorted(self._learned_for),
+        }
+
+
+def requested_variables(sets) -> list[str] | None:
+    """Union of the learned sets of a request's inverters, None when a full fetch is needed."""
+    names = set()
+    for variables in sets:
+        if variables is None or variables.stale:
+            return None
+        names.update(variables.names)
+    return sorted(names)
+
+
+def _data_to_save(sets: dict) -> dict:
+    return {
+        devicesn: variables.as_dict()
+        for devicesn, variables in sets.items()
+        if variables.names is not None
+    }
+
+
+async def async_load_variable_set(hass, variables: VariableSet) -> None:
+    """Restore the set learnt before a restart and persist it from now on."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    sets = domain_data.setdefault("variables", {})
+    sets[variables.devicesn] = variables
+    load = domain_data.get("variables_load")
+    if load is None:
+        # one shared store, inverters set up at the same time wait on the same load
+        domain_data["variables_store"] = Store(hass, STORAGE_VERSION, STORAGE_KEY)
+        load = hass.async_create_task(domain_data["variables_store"].async_load())
+        domain_data["variables_load"] = load
+    saved = (await load or {}).get(variables.devicesn)
+    if variables._store is not None:
+        return
+    if saved and saved.get("names") is not None:
+        variables.names = saved["names"]
+        variables.empty = saved.get("empty", [])
+        variables.learned_at = saved.get("learned_at", 0.0)
+        variables._learned_for = frozenset(saved.get("consumed", []))
+        _LOGGER.debug(
+            "Restored %s learned variables for SN: %s", len(variables.names), variables.devicesn
+        )
+    variables._data_to_save = partial(_data_to_save, sets)
+    variables._store = domain_data["variables_store"]
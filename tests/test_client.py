@@ -0,0 +1,122 @@
+"""Tests of the shared cloud client, run with python -m pytest from the repository root."""
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+pytest.importorskip("homeassistant")
+
+from homeassistant.core import HomeAssistant  # noqa: E402
+
+from custom_components.foxess.client import (  # noqa: E402
+    METHOD_GET,
+    FoxESSClient,
+    FoxESSResponse,
+)
+from custom_components.foxess.metrics import (  # noqa: E402
+    MIN_SAMPLES,
+    OUTCOME_SUCCESS,
+    OUTCOME_TIMEOUT,
+    WINDOW,
+)
+from custom_components.foxess.ratelimit import get_limiter  # noqa: E402
+from custom_components.foxess.resilience import (  # noqa: E402
+    FAILURE_THRESHOLD,
+    STATE_CLOSED,
+    STATE_OPEN,
+    get_health,
+)
+
+PATH = "/op/v0/device/real/query"
+
+
+def run(test, config_dir):
+    """Run a coroutine function with a client of its own hass, closing both afterwards."""
+
+    async def main():
+        hass = HomeAssistant(str(config_dir))
+        client = FoxESSClient(hass, "http://127.0.0.1:9")
+        try:
+            await test(client)
+        finally:
+            await client.async_close()
+            await hass.async_stop(force=True)
+
+    asyncio.run(main())
+
+
+def test_cancelled_probe_reopens_circuit(tmp_path):
+    async def test(client):
+        breaker = get_health(client.hass, "probe-key").breaker(PATH, "probe-sn")
+        breaker.state = STATE_OPEN
+        breaker.open_until = 0.0
+        started = asyncio.Event()
+
+        async def stalled(*args):
+            started.set()
+            await asyncio.sleep(3600)
+
+        client._async_request = stalled
+        probe = asyncio.ensure_future(
+            client.async_request(METHOD_GET, PATH, "probe-key", scope="probe-sn")
+        )
+        await started.wait()
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+        assert breaker.state == STATE_OPEN
+        # the next call is let through as the probe
+        assert breaker.allow()
+
+    run(test, tmp_path)
+
+
+async def timed_out(*args):
+    return FoxESSResponse(exception=asyncio.TimeoutError())
+
+
+def test_deadline_timeout_is_not_a_failure(tmp_path):
+    async def test(client):
+        breaker = get_health(client.hass, "deadline-key").breaker(PATH, "deadline-sn")
+        get_limiter(client.hass, "deadline-key", rate=1000)
+        client._async_request = timed_out
+        for _ in range(FAILURE_THRESHOLD):
+            response = await client.async_request(
+                METHOD_GET, PATH, "deadline-key", scope="deadline-sn", timeout=1
+            )
+            assert response.cut_short
+        assert breaker.state == STATE_CLOSED
+        stats = client.metrics.stats(PATH)
+        assert stats.outcomes[OUTCOME_TIMEOUT] == 0
+        assert len(stats.window) == 0
+
+    run(test, tmp_path)
+
+
+def test_adaptive_timeout_is_a_failure(tmp_path):
+    async def test(client):
+        breaker = get_health(client.hass, "timeout-key").breaker(PATH, "timeout-sn")
+        get_limiter(client.hass, "timeout-key", rate=1000)
+        client._async_request = timed_out
+        for _ in range(FAILURE_THRESHOLD):
+            response = await client.async_request(METHOD_GET, PATH, "timeout-key", scope="timeout-sn")
+            assert response.timed_out and not response.cut_short
+        assert breaker.state == STATE_OPEN
+        assert client.metrics.stats(PATH).outcomes[OUTCOME_TIMEOUT] == FAILURE_THRESHOLD
+
+    run(test, tmp_path)
+
+
+def test_short_timeouts_dont_shrink_the_adaptive_timeout(tmp_path):
+    async def test(client):
+        for _ in range(MIN_SAMPLES):
+            client.metrics.record(PATH, OUTCOME_SUCCESS, 5)
+        adaptive = client.metrics.timeout(PATH)
+        client._async_request = timed_out
+        for _ in range(WINDOW):
+            # e.g. the hedge of a slow call, sent with what was left of the timeout
+            await client._async_call(METHOD_GET, PATH, "feedback-key", None, None, 1)
+        assert client.metrics.timeout(PATH) >= adaptive
+
+    run(test, tmp_path)
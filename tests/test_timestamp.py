@@ -0,0 +1,137 @@
+"""Tests of the real/query time field parser, run with python -m pytest from the repository root."""
+from __future__ import annotations
+
+import calendar
+import time
+
+import pytest
+
+from custom_components.foxess import timestamp
+from custom_components.foxess.timestamp import (
+    OFFSET_HORIZON,
+    LocalOffset,
+    cloud_timestamp,
+    parse_cloud_time,
+)
+
+BST_STARTS = calendar.timegm((2025, 3, 30, 1, 0, 0))  # Europe/London clocks go forward
+BST_ENDS = calendar.timegm((2025, 10, 26, 1, 0, 0))  # and back again
+
+
+@pytest.fixture
+def zone(monkeypatch):
+    """Set the local time zone for the test, the module's offset cache starts empty."""
+
+    def set_zone(name: str) -> None:
+        monkeypatch.setenv("TZ", name)
+        time.tzset()
+        monkeypatch.setattr(timestamp, "local_offset", LocalOffset())
+
+    yield set_zone
+    monkeypatch.undo()
+    time.tzset()
+
+
+def test_parse_cloud_time():
+    assert parse_cloud_time("2025-02-21 16:38:29 GMT+0000") == (
+        calendar.timegm((2025, 2, 21, 16, 38, 29)),
+        0,
+    )
+
+
+@pytest.mark.parametrize(
+    ("text", "offset"),
+    [
+        ("2025-06-01 12:00:00 GMT+0100", 3600),
+        ("2025-06-01 12:00:00 GMT+0530", 19800),
+        ("2025-06-01 12:00:00 GMT-0330", -12600),
+    ],
+)
+def test_parse_cloud_time_offset(text, offset):
+    wall, parsed = parse_cloud_time(text)
+    assert wall == calendar.timegm((2025, 6, 1, 12, 0, 0))
+    assert parsed == offset
+
+
+@pytest.mark.parametrize(
+    "day",
+    ["1970-01-01", "1999-12-31", "2000-02-29", "2000-03-01", "2024-02-29", "2100-03-01"],
+)
+def test_parse_cloud_time_dates(day):
+    year, month, number = (int(part) for part in day.split("-"))
+    wall, _ = parse_cloud_time(f"{day} 00:00:00 GMT+0000")
+    assert wall == calendar.timegm((year, month, number, 0, 0, 0))
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "",
+        "2025-02-21 16:38:29",
+        "2025-02-21 16:38:29 GMT+00000",
+        "2025/02/21 16:38:29 GMT+0000",
+        "2025-02-21T16:38:29 GMT+0000",
+        "2025-02-21 16.38.29 GMT+0000",
+        "2025-02-21 16:38:29 UTC+0000",
+        "2025-02-21 16:38:29 GMT 0000",
+        "2025-13-21 16:38:29 GMT+0000",
+        "2025-02-32 16:38:29 GMT+0000",
+        "2025-02-21 24:38:29 GMT+0000",
+        "2025-02-21 16:60:29 GMT+0000",
+        "2025-02-21 16:38:xx GMT+0000",
+    ],
+)
+def test_parse_cloud_time_rejects(text):
+    with pytest.raises(ValueError):
+        parse_cloud_time(text)
+
+
+def test_local_offset_spring_forward(zone):
+    zone("Europe/London")
+    offset = LocalOffset()
+    assert offset(BST_STARTS - 3600) == 0
+    assert offset.valid_until == BST_STARTS
+    assert offset(BST_STARTS - 1) == 0
+    assert offset(BST_STARTS) == 3600
+    assert offset.valid_until == BST_ENDS
+
+
+def test_local_offset_fall_back(zone):
+    zone("Europe/London")
+    offset = LocalOffset()
+    assert offset(BST_ENDS - 1) == 3600
+    assert offset.valid_until == BST_ENDS
+    assert offset(BST_ENDS) == 0
+
+
+def test_local_offset_cached(zone, monkeypatch):
+    zone("Europe/London")
+    offset = LocalOffset()
+    offset(BST_STARTS - 86400)
+    lookups = []
+    localtime = time.localtime
+    monkeypatch.setattr(time, "localtime", lambda *args: lookups.append(args) or localtime(*args))
+    assert offset(BST_STARTS - 3600) == 0
+    assert lookups == []
+
+
+def test_local_offset_without_dst(zone):
+    zone("Asia/Kolkata")
+    offset = LocalOffset()
+    now = BST_STARTS
+    assert offset(now) == 19800
+    assert offset.valid_until == now + OFFSET_HORIZON
+
+
+def test_cloud_timestamp_same_offset(zone):
+    zone("Asia/Kolkata")
+    assert cloud_timestamp("2025-06-01 17:30:00 GMT+0530") == calendar.timegm((2025, 6, 1, 12, 0, 0))
+
+
+def test_cloud_timestamp_other_offset(zone):
+    zone("Asia/Kolkata")
+    # the wall time is taken as local time unless the cloud's offset is trusted
+    assert cloud_timestamp("2025-06-01 12:00:00 GMT+0000") == calendar.timegm((2025, 6, 1, 6, 30, 0))
+    assert cloud_timestamp("2025-06-01 12:00:00 GMT+0000", cross_zone=True) == calendar.timegm(
+        (2025, 6, 1, 12, 0, 0)
+    )
@@ -0,0 +1,254 @@
+"""Poll cycle benchmark, runs the integration against tools/mock_cloud.py.
+
+Needs Home Assistant and aiohttp installed. From the repository root:
+
+    python tools/benchmark.py --inverters 1 10 50 200 --output benchmark.json
+
+For every mode (default, extendPV, restricted) and inverter count the
+platform is set up once per inverter, with its entities added to a sensor
+entity platform, then the coordinators are refreshed for a number of
+cycles with the monotonic clock moved on 5 minutes each time, so the
+cycles see the normal mix of realtime, report and detail polls. Each
+cycle records wall time, CPU time, the tracemalloc peak, the longest event
+loop stall, the number of cloud calls and the state writes the entities
+skipped, the time includes the state writes they made.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+from datetime import datetime, timedelta, timezone
+import json
+import logging
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import aiohttp
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from homeassistant.core import HomeAssistant  # noqa: E402
+from homeassistant.helpers import device_registry, entity, entity_registry  # noqa: E402
+from homeassistant.helpers.entity_platform import EntityPlatform  # noqa: E402
+
+from custom_components.foxess import batch as foxess_batch  # noqa: E402
+from custom_components.foxess import ratelimit as foxess_ratelimit  # noqa: E402
+from custom_components.foxess import resilience as foxess_resilience  # noqa: E402
+from custom_components.foxess import scheduler as foxess_scheduler  # noqa: E402
+from custom_components.foxess import sensor as foxess_sensor  # noqa: E402
+from custom_components.foxess.client import _ENDPOINT_OA_DOMAIN, FoxESSClient  # noqa: E402
+from custom_components.foxess.const import DOMAIN  # noqa: E402
+
+MODES = {
+    # mode: (mock scenario, extra platform config)
+    "default": ("single_battery", {}),
+    "extendPV": ("r_series_18", {foxess_sensor.CONF_EXTPV: True}),
+    "restricted": ("single_battery", {foxess_sensor.CONF_GET_VARIABLES: True}),
+}
+CYCLE_STEP = 5 * 60  # seconds the scheduler clock moves between cycles
+STALL_PROBE = 0.005  # seconds between event loop stall probes
+# modules whose monotonic clock drives polling, backoff, circuits and pacing
+CLOCKED_MODULES = (
+    foxess_batch,
+    foxess_ratelimit,
+    foxess_resilience,
+    foxess_scheduler,
+    foxess_sensor,
+)
+
+
+class ShiftedClock:
+    """time module stand-in whose monotonic clock can be moved forward."""
+
+    def __init__(self) -> None:
+        self.offset = 0.0
+
+    def monotonic(self) -> float:
+        return time.monotonic() + self.offset
+
+    def __getattr__(self, name):
+        return getattr(time, name)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def start_mock(port: int) -> subprocess.Popen:
+    """Run the mock cloud in its own process so its CPU time isn't measured."""
+    process = subprocess.Popen(
+        [sys.executable, str(ROOT / "tools" / "mock_cloud.py"), "--port", str(port)],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    async with aiohttp.ClientSession() as session:
+        for _ in range(100):
+            try:
+                async with session.get(f"http://127.0.0.1:{port}/mock/stats") as resp:
+                    if resp.status == 200:
+                        return process
+            except aiohttp.ClientError:
+                await asyncio.sleep(0.1)
+    process.kill()
+    raise RuntimeError("mock cloud did not start")
+
+
+async def mock_calls(port: int) -> int:
+    async with aiohttp.ClientSession() as session:
+        async with session.get(f"http://127.0.0.1:{port}/mock/stats") as resp:
+            return sum((await resp.json())["calls"].values())
+
+
+async def watch_loop(stall: dict) -> None:
+    """Record the longest time the event loop was late to wake a sleeper."""
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(STALL_PROBE)
+        stall["max"] = max(stall["max"], loop.time() - start - STALL_PROBE)
+
+
+async def run_scenario(port: int, mode: str, inverters: int, cycles: int) -> dict:
+    scenario, extra = MODES[mode]
+    clock = ShiftedClock()
+    for module in CLOCKED_MODULES:
+        module.time = clock
+    with tempfile.TemporaryDirectory() as config_dir:
+        hass = HomeAssistant(config_dir)
+        entity.async_setup(hass)
+        await device_registry.async_load(hass)
+        await entity_registry.async_load(hass)
+        client = FoxESSClient(hass, f"http://127.0.0.1:{port}")
+        hass.data.setdefault(DOMAIN, {}).setdefault("clients", {})[_ENDPOINT_OA_DOMAIN] = client
+        # the entities are added the way Home Assistant adds them, so each
+        # update goes through their state writes, or the writes they skip
+        platform = EntityPlatform(
+            hass=hass,
+            logger=logging.getLogger(__name__),
+            domain="sensor",
+            platform_name=DOMAIN,
+            platform=foxess_sensor,
+            scan_interval=timedelta(seconds=30),
+            entity_namespace=None,
+        )
+
+        setups = []
+        for n in range(inverters):
+            sn = f"mock-{scenario}-{n}"
+            config = {
+                "name": f"Fox{n}",
+                foxess_sensor.CONF_APIKEY: f"benchmark-key-{n}",
+                foxess_sensor.CONF_DEVICESN: sn,
+                foxess_sensor.CONF_DEVICEID: sn,
+                foxess_sensor.CONF_API_RATE: 1000,
+                **extra,
+            }
+            setups.append(
+                foxess_sensor.async_setup_platform(
+                    hass, config, platform._async_schedule_add_entities
+                )
+            )
+        start = time.perf_counter()
+        await asyncio.gather(*setups)
+        await hass.async_block_till_done()
+        setup_time = time.perf_counter() - start
+        entities = list(platform.entities.values())
+        coordinators = list({id(entity.coordinator): entity.coordinator for entity in entities}.values())
+
+        results = []
+        stall = {"max": 0.0}
+        watcher = asyncio.create_task(watch_loop(stall))
+        tracemalloc.start()
+        try:
+            for _ in range(cycles):
+                clock.offset += CYCLE_STEP
+                calls = await mock_calls(port)
+                suppressed = sum(coordinator.suppressed_writes for coordinator in coordinators)
+                stall["max"] = 0.0
+                tracemalloc.reset_peak()
+                wall = time.perf_counter()
+                cpu = time.process_time()
+                await asyncio.gather(*(coordinator.async_refresh() for coordinator in coordinators))
+                cpu = time.process_time() - cpu
+                wall = time.perf_counter() - wall
+                results.append(
+                    {
+                        "wall_s": round(wall, 4),
+                        "cpu_s": round(cpu, 4),
+                        "cpu_per_inverter_ms": round(cpu * 1000 / inverters, 3),
+                        "peak_memory_kib": round(tracemalloc.get_traced_memory()[1] / 1024, 1),
+                        "max_loop_stall_ms": round(stall["max"] * 1000, 2),
+                        "cloud_calls": await mock_calls(port) - calls,
+                        "suppressed_writes": sum(
+                            coordinator.suppressed_writes for coordinator in coordinators
+                        )
+                        - suppressed,
+                    }
+                )
+        finally:
+            tracemalloc.stop()
+            watcher.cancel()
+            await client.async_close()
+            await hass.async_stop(force=True)
+
+    return {
+        "mode": mode,
+        "inverters": inverters,
+        "entities": len(entities),
+        "setup_s": round(setup_time, 3),
+        "cycles": results,
+        "summary": {
+            key: max(cycle[key] for cycle in results)
+            for key in ("wall_s", "cpu_s", "cpu_per_inverter_ms", "peak_memory_kib", "max_loop_stall_ms")
+        },
+    }
+
+
+async def main(args) -> None:
+    port = free_port()
+    mock = await start_mock(port)
+    results = []
+    try:
+        for mode in args.modes:
+            for inverters in args.inverters:
+                result = await run_scenario(port, mode, inverters, args.cycles)
+                print(
+                    f"{mode:>10} {inverters:>4} inverters: "
+                    f"cpu {result['summary']['cpu_s']:.3f}s, "
+                    f"peak {result['summary']['peak_memory_kib']:.0f}KiB, "
+                    f"stall {result['summary']['max_loop_stall_ms']:.1f}ms"
+                )
+                results.append(result)
+    finally:
+        mock.terminate()
+    revision = subprocess.run(
+        ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True
+    ).stdout.strip()
+    report = {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "revision": revision,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cycles": args.cycles,
+        "results": results,
+    }
+    args.output.write_text(json.dumps(report, indent=2) + "\n")
+    print(f"results written to {args.output}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--inverters", type=int, nargs="+", default=[1, 10, 50, 200])
+    parser.add_argument("--modes", nargs="+", choices=list(MODES), default=list(MODES))
+    parser.add_argument("--cycles", type=int, default=6)
+    parser.add_argument("--output", type=Path, default=Path("benchmark.json"))
+    asyncio.run(main(parser.parse_args()))
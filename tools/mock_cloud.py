@@ -0,0 +1,259 @@
+"""Local stand-in for the FoxESS OpenAPI, serving the JSON fixtures in tools/fixtures.
+
+Run it with:
+
+    python tools/mock_cloud.py --port 8080 --scenario single_battery
+
+Serial numbers of the form ``mock-<scenario>-<n>`` (e.g. ``mock-r_series_18-3``)
+get that scenario, any other serial number gets the --scenario default. The
+signature header is checked the same way GetAuth builds it, a bad signature
+answers errno 40256 like the cloud does for bad headers.
+
+To point the integration at it, register a client for the cloud host before
+the platform is set up, e.g. in a script or a test harness:
+
+    hass.data["foxess"]["clients"]["https://www.foxesscloud.com"] = FoxESSClient(hass, "http://127.0.0.1:8080")
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import calendar
+from datetime import datetime, timedelta, timezone
+import hashlib
+import json
+import logging
+from pathlib import Path
+import time
+
+from aiohttp import web
+
+_LOGGER = logging.getLogger("foxess_mock")
+
+FIXTURES = Path(__file__).parent / "fixtures"
+DEFAULT_SCENARIO = "single_battery"
+STATS_PATH = "/mock/stats"  # call counts, served without a signature
+
+ERRNO_OK = 0
+ERRNO_BAD_HEADER = 40256
+ERRNO_BAD_BODY = 40257
+ERRNO_TOO_FREQUENT = 40400
+
+
+def load_fixtures(path: Path = FIXTURES) -> dict:
+    """Read every scenario fixture, keyed by file name."""
+    return {file.stem: json.loads(file.read_text()) for file in sorted(path.glob("*.json"))}
+
+
+def signature(path: str, token: str, timestamp: str) -> str:
+    """Same signature GetAuth sends, md5 of path, token and timestamp joined by a literal \\r\\n."""
+    return hashlib.md5(rf"{path}\r\n{token}\r\n{timestamp}".encode("utf-8")).hexdigest()
+
+
+def reply(errno=ERRNO_OK, result=None, msg=None) -> web.Response:
+    if msg is None:
+        msg = "success" if errno == ERRNO_OK else "mock error"
+    return web.json_response({"errno": errno, "msg": msg, "result": result})
+
+
+class MockCloud:
+    """The request handlers and the per scenario responses."""
+
+    def __init__(self, fixtures: dict, scenario=DEFAULT_SCENARIO, api_key=None,
+                 budget=None, min_interval=0.0, latency=0.0, tz=None) -> None:
+        self.fixtures = fixtures
+        self.scenario = scenario
+        self.api_key = api_key  # None accepts any key
+        self.budget = budget  # calls per key before 40400, None is unlimited
+        self.min_interval = min_interval  # seconds between calls with one key
+        self.latency = latency  # seconds added to every response
+        self.tz = tz
+        self.calls: dict[str, int] = {}
+        self.paths: dict[str, int] = {}
+        self._last_call: dict[str, float] = {}
+
+    def fixture(self, sn: str) -> dict:
+        if sn and sn.startswith("mock-"):
+            name = sn[5:].rsplit("-", 1)[0]
+            if name in self.fixtures:
+                return self.fixtures[name]
+        return self.fixtures[self.scenario]
+
+    @web.middleware
+    async def middleware(self, request: web.Request, handler):
+        """Check the signature and the call budget, like the cloud does."""
+        if request.path.startswith(STATS_PATH):
+            return await handler(request)
+        token = request.headers.get("token")
+        timestamp = request.headers.get("timestamp")
+        sent = request.headers.get("signature")
+        if not token or not timestamp or not sent:
+            return reply(ERRNO_BAD_HEADER, msg="Request header parameters are missing")
+        if sent != signature(request.path, token, timestamp):
+            _LOGGER.warning("Bad signature for %s", request.path)
+            return reply(ERRNO_BAD_HEADER, msg="illegal signature")
+        if self.api_key is not None and token != self.api_key:
+            return reply(41809, msg="invalid token")
+        self.paths[request.path] = self.paths.get(request.path, 0) + 1
+        calls = self.calls[token] = self.calls.get(token, 0) + 1
+        now = time.monotonic()
+        last = self._last_call.get(token)
+        self._last_call[token] = now
+        if (self.budget is not None and calls > self.budget) or (
+            last is not None and now - last < self.min_interval
+        ):
+            return reply(ERRNO_TOO_FREQUENT, msg="The number of requests is too frequent")
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return await handler(request)
+
+    async def _body(self, request: web.Request) -> dict | None:
+        try:
+            return json.loads(await request.read() or b"{}")
+        except ValueError:
+            return None
+
+    def _detail(self, sn: str) -> dict:
+        detail = dict(self.fixture(sn)["detail"])
+        detail["deviceSN"] = sn
+        return detail
+
+    async def device_detail(self, request: web.Request) -> web.Response:
+        sn = request.query.get("sn")
+        if not sn:
+            return reply(ERRNO_BAD_BODY)
+        fixture = self.fixture(sn)
+        if "detail_errno" in fixture:
+            return reply(fixture["detail_errno"])
+        return reply(result=self._detail(sn))
+
+    async def device_list(self, request: web.Request) -> web.Response:
+        body = await self._body(request)
+        if body is None:
+            return reply(ERRNO_BAD_BODY)
+        sns = body.get("sns") or [f"mock-{self.scenario}-1"]
+        keys = ("deviceSN", "moduleSN", "stationID", "stationName", "deviceType",
+                "productType", "status", "hasBattery", "hasPV")
+        data = [{key: self._detail(sn)[key] for key in keys} for sn in sns]
+        return reply(result={"currentPage": 1, "pageSize": 10, "total": len(data), "data": data})
+
+    async def battery_soc(self, request: web.Request) -> web.Response:
+        fixture = self.fixture(request.query.get("sn"))
+        if "battery" not in fixture:
+            return reply(ERRNO_BAD_BODY, msg="no battery")
+        return reply(result=fixture["battery"])
+
+    def _time(self) -> str:
+        now = datetime.now().astimezone(self.tz)
+        return f"{now:%Y-%m-%d %H:%M:%S} GMT{now:%z}"
+
+    def _realtime(self, sn: str, names) -> dict:
+        fixture = self.fixture(sn)
+        units = fixture.get("units", {})
+        variables = fixture["variables"]
+        if names is not None:
+            variables = {name: variables[name] for name in names if name in variables}
+        datas = [
+            {"variable": name, "name": name, "unit": units.get(name, ""), "value": value}
+            for name, value in variables.items()
+        ]
+        return {"datas": datas, "time": self._time(), "deviceSN": sn}
+
+    async def real_query_v0(self, request: web.Request) -> web.Response:
+        body = await self._body(request)
+        if not body or "sn" not in body:
+            return reply(ERRNO_BAD_BODY)
+        fixture = self.fixture(body["sn"])
+        if "realtime_errno" in fixture:
+            return reply(fixture["realtime_errno"])
+        return reply(result=[self._realtime(body["sn"], body.get("variables"))])
+
+    async def real_query_v1(self, request: web.Request) -> web.Response:
+        body = await self._body(request)
+        if not body or not body.get("sns"):
+            return reply(ERRNO_BAD_BODY)
+        result = []
+        for sn in body["sns"]:
+            fixture = self.fixture(sn)
+            if "realtime_errno" in fixture:
+                if len(body["sns"]) == 1:
+                    return reply(fixture["realtime_errno"])
+                continue  # a batch leaves the failing inverter out
+            result.append(self._realtime(sn, body.get("variables")))
+        return reply(result=result)
+
+    async def report(self, request: web.Request) -> web.Response:
+        body = await self._body(request)
+        if not body or "sn" not in body or body.get("dimension") not in ("year", "month", "day"):
+            return reply(ERRNO_BAD_BODY)
+        totals = self.fixture(body["sn"])["report"]
+        now = datetime.now()
+        if body["dimension"] == "month":
+            size = calendar.monthrange(int(body.get("year", now.year)), int(body.get("month", now.month)))[1]
+        elif body["dimension"] == "year":
+            size = 12
+        else:
+            size = 24
+        names = body.get("variables") or list(totals)
+        # the fixture totals are per day, a day report spreads them over its hours
+        share = 24 if body["dimension"] == "day" else 1
+        result = [
+            {"variable": name, "unit": "kWh", "values": [round(totals.get(name, 0.0) / share, 3)] * size}
+            for name in names
+        ]
+        return reply(result=result)
+
+    async def generation(self, request: web.Request) -> web.Response:
+        sn = request.query.get("sn")
+        if not sn:
+            return reply(ERRNO_BAD_BODY)
+        return reply(result=self.fixture(sn)["generation"])
+
+    async def stats(self, request: web.Request) -> web.Response:
+        """Call counts, not part of the OpenAPI."""
+        return web.json_response({"calls": self.calls, "paths": self.paths})
+
+    def app(self) -> web.Application:
+        app = web.Application(middlewares=[self.middleware])
+        app.add_routes(
+            [
+                web.get("/op/v0/device/detail", self.device_detail),
+                web.get("/op/v1/device/detail", self.device_detail),
+                web.post("/op/v0/device/list", self.device_list),
+                web.get("/op/v0/device/battery/soc/get", self.battery_soc),
+                web.post("/op/v0/device/real/query", self.real_query_v0),
+                web.post("/op/v1/device/real/query", self.real_query_v1),
+                web.post("/op/v0/device/report/query", self.report),
+                web.get("/op/v0/device/generation", self.generation),
+            ]
+        )
+        app.router.add_get(STATS_PATH, self.stats)
+        return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--scenario", default=DEFAULT_SCENARIO)
+    parser.add_argument("--fixtures", type=Path, default=FIXTURES)
+    parser.add_argument("--api-key", help="only accept this apiKey")
+    parser.add_argument("--budget", type=int, help="calls per apiKey before errno 40400")
+    parser.add_argument("--min-interval", type=float, default=0.0,
+                        help="seconds between calls per apiKey before errno 40400")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every reply")
+    parser.add_argument("--utc-offset", type=float,
+                        help="hours from UTC for the realtime time field, default local time")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    fixtures = load_fixtures(args.fixtures)
+    if args.scenario not in fixtures:
+        parser.error(f"unknown scenario {args.scenario}, have {', '.join(fixtures)}")
+    tz = None if args.utc_offset is None else timezone(timedelta(hours=args.utc_offset))
+    cloud = MockCloud(fixtures, args.scenario, args.api_key, args.budget,
+                      args.min_interval, args.latency, tz)
+    web.run_app(cloud.app(), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()